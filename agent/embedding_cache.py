@@ -0,0 +1,225 @@
+# agent/embedding_cache.py
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "./.cache/embeddings")
+EMBEDDING_CACHE_MAX_ENTRIES = int(
+    os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+EMBEDDING_CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float16")
+
+# Fraction of the capacity freed in one go once the cache is full, so that we
+# do not run an eviction query for every single new chunk.
+_EVICT_FRACTION = 0.05
+_SQL_BATCH = 500
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed store of embedding vectors for one model.
+
+    Vectors live in a preallocated memory-mapped matrix (`vectors.bin`), one
+    row per slot. A small sqlite index maps sha256(text) to its slot and the
+    last time it was used, which drives LRU eviction once `max_entries` is hit.
+    """
+
+    def __init__(self, model_name, cache_dir=None, max_entries=None, dtype=None):
+        self.model_name = model_name
+        self.max_entries = max_entries or EMBEDDING_CACHE_MAX_ENTRIES
+        self.dtype = np.dtype(dtype or EMBEDDING_CACHE_DTYPE)
+
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.path = os.path.join(cache_dir or EMBEDDING_CACHE_DIR, slug)
+        os.makedirs(self.path, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(self.path, "index.sqlite"),
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries "
+            "(key BLOB PRIMARY KEY, slot INTEGER NOT NULL, last_used REAL NOT NULL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._db.commit()
+
+        self._matrix = None
+        self._dim = None
+        self._free_slots = []
+        self._next_slot = self._db.execute(
+            "SELECT COALESCE(MAX(slot) + 1, 0) FROM entries").fetchone()[0]
+
+        meta = dict(self._db.execute("SELECT name, value FROM meta"))
+        if "dim" in meta:
+            if (meta.get("dtype") != self.dtype.name
+                    or int(meta["capacity"]) != self.max_entries):
+                # Layout changed since the cache was written: start over
+                self._reset()
+            else:
+                self._open_matrix(int(meta["dim"]))
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # -- storage -----------------------------------------------------------
+
+    def _reset(self):
+        self._db.execute("DELETE FROM entries")
+        self._db.execute("DELETE FROM meta")
+        self._db.commit()
+        self._next_slot = 0
+        vectors = os.path.join(self.path, "vectors.bin")
+        if os.path.exists(vectors):
+            os.remove(vectors)
+
+    def _open_matrix(self, dim):
+        vectors = os.path.join(self.path, "vectors.bin")
+        size = self.max_entries * dim * self.dtype.itemsize
+        # truncate() gives a sparse file: disk is only used for written rows
+        with open(vectors, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self._matrix = np.memmap(vectors, dtype=self.dtype, mode="r+",
+                                 shape=(self.max_entries, dim))
+        self._dim = dim
+
+    def _ensure_matrix(self, dim):
+        if self._matrix is not None:
+            return
+        self._db.executemany(
+            "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+            [("dim", str(dim)), ("dtype", self.dtype.name),
+             ("capacity", str(self.max_entries))])
+        self._db.commit()
+        self._open_matrix(dim)
+
+    def _allocate_slot(self):
+        if self._free_slots:
+            return self._free_slots.pop()
+        if self._next_slot < self.max_entries:
+            slot = self._next_slot
+            self._next_slot += 1
+            return slot
+        self._evict(max(1, int(self.max_entries * _EVICT_FRACTION)))
+        return self._free_slots.pop()
+
+    def _evict(self, count):
+        rows = self._db.execute(
+            "SELECT key, slot FROM entries ORDER BY last_used LIMIT ?",
+            (count,)).fetchall()
+        self._db.executemany("DELETE FROM entries WHERE key = ?",
+                             [(key,) for key, _ in rows])
+        self._free_slots.extend(slot for _, slot in rows)
+        self.evictions += len(rows)
+
+    # -- public API --------------------------------------------------------
+
+    def get_many(self, keys):
+        """Returns {key: vector} for the keys present in the cache."""
+        found = {}
+        if self._matrix is None or not keys:
+            return found
+        now = time.time()
+        with self._lock:
+            unique = list(dict.fromkeys(keys))
+            for i in range(0, len(unique), _SQL_BATCH):
+                batch = unique[i:i + _SQL_BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = self._db.execute(
+                    f"SELECT key, slot FROM entries WHERE key IN ({marks})",
+                    batch).fetchall()
+                for key, slot in rows:
+                    found[key] = np.asarray(self._matrix[slot], dtype=np.float32)
+                self._db.executemany(
+                    "UPDATE entries SET last_used = ? WHERE key = ?",
+                    [(now, key) for key, _ in rows])
+            self._db.commit()
+        return found
+
+    def put_many(self, items):
+        """Stores (key, vector) pairs, evicting least recently used rows if full."""
+        items = list(items)
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._ensure_matrix(len(items[0][1]))
+            for key, vector in items:
+                row = self._db.execute(
+                    "SELECT slot FROM entries WHERE key = ?", (key,)).fetchone()
+                slot = row[0] if row else self._allocate_slot()
+                self._matrix[slot] = np.asarray(vector, dtype=self.dtype)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries (key, slot, last_used) "
+                    "VALUES (?, ?, ?)", (key, slot, now))
+            self._matrix.flush()
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            entries = self._db.execute(
+                "SELECT COUNT(*) FROM entries").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "entries": entries,
+            "capacity": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings model so that embed_documents() only sends texts the
+    cache has not seen before to the model. Queries go straight to the model.
+    """
+
+    def __init__(self, embeddings, model_name, cache=None):
+        self.embeddings = embeddings
+        self.cache = cache or EmbeddingCache(model_name)
+
+    def embed_documents(self, texts):
+        keys = [text_hash(text) for text in texts]
+        found = self.cache.get_many(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        misses = sum(1 for key in keys if key not in found)
+        # Embeds run concurrently; stats() reads these under the same lock
+        with self.cache._lock:
+            self.cache.misses += misses
+            self.cache.hits += len(keys) - misses
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            stored = [(key, np.asarray(vec, dtype=self.cache.dtype))
+                      for key, vec in zip(missing.keys(), vectors)]
+            self.cache.put_many(stored)
+            # Hand back the stored precision so hits and misses are identical
+            found.update((key, vec.astype(np.float32)) for key, vec in stored)
+
+        return [found[key].tolist() for key in keys]
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+    def stats(self):
+        return self.cache.stats()
@@ -0,0 +1,116 @@
+# agent/embedding_pool.py
+
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_WORKERS = int(os.getenv(
+    "EMBEDDING_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+
+# Set in each worker process by _init_worker
+_worker_model = None
+_worker_normalize = False
+
+
+def _init_worker(model_name, device, normalize, threads):
+    global _worker_model, _worker_normalize
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    # Each worker gets its own slice of the cores instead of every process
+    # spawning a full-size intra-op thread pool and fighting over them.
+    torch.set_num_threads(threads)
+    _worker_model = SentenceTransformer(
+        model_name, device=None if device == "auto" else device)
+    _worker_normalize = normalize
+
+
+def _encode(texts):
+    vectors = _worker_model.encode(
+        texts, batch_size=len(texts), normalize_embeddings=_worker_normalize,
+        convert_to_numpy=True, show_progress_bar=False)
+    return vectors.tolist()
+
+
+def length_bucketed_batches(texts, batch_size):
+    """
+    Groups text indices into batches of similar length. The transformer pads
+    every sequence in a batch to the longest one, so sorting by length first
+    avoids spending most of the compute on padding tokens.
+    """
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+class ProcessPoolEmbeddings(Embeddings):
+    """
+    Embeddings backend that shards bulk embed_documents batches across worker
+    processes, each of which loads the sentence-transformers model once.
+    Output order always matches input order regardless of which worker
+    finished first. Single queries stay in this process: an IPC round trip
+    per question would cost more than the encode itself. The pool is started
+    on the first bulk call and shut down at interpreter exit.
+    """
+
+    def __init__(self, model_name, device="cpu", normalize=False,
+                 workers=None, batch_size=None):
+        self.model_name = model_name
+        self.device = device
+        self.normalize = normalize
+        self.workers = workers or EMBEDDING_WORKERS
+        self.batch_size = batch_size or EMBEDDING_BATCH_SIZE
+        self._pool = None
+        self._query_model = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                threads = max(1, (os.cpu_count() or 1) // self.workers)
+                # spawn: forking a parent that already initialised torch can deadlock
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.model_name, self.device, self.normalize, threads),
+                )
+                atexit.register(self.close)
+            return self._pool
+
+    def _get_query_model(self):
+        with self._lock:
+            if self._query_model is None:
+                from agent.embeddings import build_local_embeddings
+                self._query_model = build_local_embeddings(
+                    self.model_name, self.device, self.normalize)
+            return self._query_model
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+        pool = self._get_pool()
+        batches = length_bucketed_batches(texts, self.batch_size)
+        futures = [pool.submit(_encode, [texts[i] for i in batch])
+                   for batch in batches]
+
+        results = [None] * len(texts)
+        for batch, future in zip(batches, futures):
+            for index, vector in zip(batch, future.result()):
+                results[index] = vector
+        return results
+
+    def embed_query(self, text):
+        return self._get_query_model().embed_query(text)
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            atexit.unregister(self.close)
+            pool.shutdown(wait=True)
@@ -0,0 +1,174 @@
+# agent/embeddings.py
+
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+DEFAULT_EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "auto")
+DEFAULT_NORMALIZE = os.getenv(
+    "EMBEDDING_NORMALIZE", "false").lower() in ("1", "true", "yes")
+# "local" runs the model in this process; "process_pool" shards bulk
+# embed_documents batches over worker processes (see agent/embedding_pool.py)
+# for large ingests, while queries are still embedded in this process.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "local").lower()
+EMBEDDING_CACHE_ENABLED = os.getenv(
+    "EMBEDDING_CACHE", "true").lower() in ("1", "true", "yes")
+
+# One embedding model per (model name, device, normalization) for the whole
+# process. Every entry point (Gradio chat, uploads, codebase ingestion) goes
+# through get_embeddings() so the sentence-transformers weights load once.
+_registry = {}
+_registry_stats = {}
+_cached_registry = {}
+_registry_lock = threading.Lock()
+_key_locks = {}
+
+
+def _rss_bytes():
+    """Current resident set size of this process, in bytes (best effort)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _parameter_bytes(embeddings):
+    """Size of the model weights held by a HuggingFaceEmbeddings instance."""
+    client = getattr(embeddings, "_client", None) or getattr(
+        embeddings, "client", None)
+    if client is None or not hasattr(client, "parameters"):
+        return None
+    return sum(p.numel() * p.element_size() for p in client.parameters())
+
+
+def _registry_key(model_name, device, normalize):
+    return (
+        model_name or DEFAULT_EMBEDDING_MODEL,
+        device or DEFAULT_EMBEDDING_DEVICE,
+        DEFAULT_NORMALIZE if normalize is None else bool(normalize),
+    )
+
+
+def _build_embeddings(model_name, device, normalize):
+    if EMBEDDING_BACKEND == "process_pool":
+        from agent.embedding_pool import ProcessPoolEmbeddings
+        return ProcessPoolEmbeddings(model_name, device=device, normalize=normalize)
+    if EMBEDDING_BACKEND != "local":
+        raise ValueError(f"Invalid EMBEDDING_BACKEND '{EMBEDDING_BACKEND}' specified in .env")
+    return build_local_embeddings(model_name, device, normalize)
+
+
+def build_local_embeddings(model_name, device, normalize):
+    """A new in-process HuggingFaceEmbeddings model (not shared; use get_embeddings)."""
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    # "auto" leaves device selection to sentence-transformers (CUDA if present)
+    model_kwargs = {} if device == "auto" else {"device": device}
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs=model_kwargs,
+        encode_kwargs={"normalize_embeddings": normalize},
+    )
+
+
+def get_embeddings(model_name=None, device=None, normalize=None, cached=False):
+    """
+    Returns the shared embedding model for the given settings, loading it on
+    first use. Safe to call concurrently: only one thread loads a given model
+    while the others wait for it.
+
+    With cached=True the model is wrapped in the on-disk embedding cache so
+    re-ingesting unchanged chunks skips the model (see agent/embedding_cache.py).
+    """
+    key = _registry_key(model_name, device, normalize)
+    if cached and EMBEDDING_CACHE_ENABLED:
+        return _get_cached_embeddings(key)
+
+    embeddings = _registry.get(key)
+    if embeddings is not None:
+        return embeddings
+
+    with _registry_lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+        embeddings = _registry.get(key)
+        if embeddings is not None:
+            return embeddings
+
+        print(f"[INFO] Loading embedding model: {key[0]} ({key[1]}, {EMBEDDING_BACKEND})")
+        rss_before = _rss_bytes()
+        started = time.perf_counter()
+        embeddings = _build_embeddings(*key)
+
+        _registry_stats[key] = {
+            "load_seconds": round(time.perf_counter() - started, 3),
+            "rss_delta_bytes": max(_rss_bytes() - rss_before, 0),
+            "parameter_bytes": _parameter_bytes(embeddings),
+        }
+        _registry[key] = embeddings
+        return embeddings
+
+
+def _get_cached_embeddings(key):
+    from agent.embedding_cache import CachedEmbeddings
+
+    with _registry_lock:
+        wrapper = _cached_registry.get(key)
+    if wrapper is not None:
+        return wrapper
+
+    base = get_embeddings(*key)
+    with _registry_lock:
+        # The normalization flag changes the vectors, so it is part of the
+        # cache namespace alongside the model name.
+        cache_name = f"{key[0]}-normalized" if key[2] else key[0]
+        wrapper = _cached_registry.setdefault(
+            key, CachedEmbeddings(base, cache_name))
+    return wrapper
+
+
+def cache_stats():
+    """Hit/miss counters for every embedding cache opened in this process."""
+    with _registry_lock:
+        wrappers = list(_cached_registry.values())
+    return [wrapper.stats() for wrapper in wrappers]
+
+
+def warm_up(model_name=None, device=None, normalize=None):
+    """
+    Loads the model and runs one tiny encode so the first real request does
+    not pay for weight loading or lazy kernel initialisation.
+    """
+    embeddings = get_embeddings(model_name, device, normalize)
+    embeddings.embed_query("warm up")
+    return embeddings
+
+
+def memory_stats():
+    """Per-model load time and memory accounting for the loaded models."""
+    with _registry_lock:
+        stats = {
+            f"{name}|{device}|normalize={normalize}": dict(info)
+            for (name, device, normalize), info in _registry_stats.items()
+        }
+    total = sum(info["rss_delta_bytes"] for info in stats.values())
+    return {"models": stats, "total_rss_delta_bytes": total,
+            "process_rss_bytes": _rss_bytes()}
+
+
+def clear_registry():
+    """Drops every loaded model (mainly for tests and long-running workers)."""
+    with _registry_lock:
+        _registry.clear()
+        _registry_stats.clear()
+        _cached_registry.clear()
+        _key_locks.clear()
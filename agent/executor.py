@@ -1,4 +1,4 @@
-from llm_manager import get_llm
+from agent.llm_manager import get_llm
 
 llm = get_llm()
 response = llm.invoke("Hello, how are you?")
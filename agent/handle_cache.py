@@ -0,0 +1,147 @@
+# agent/handle_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class _KeySlot:
+    """Build lock for one key, with the number of threads holding or waiting
+    on it and the key's generation (bumped by invalidate)."""
+
+    __slots__ = ("lock", "waiters", "generation")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waiters = 0
+        self.generation = 0
+
+
+class HandleCache:
+    """
+    Thread-safe LRU cache for expensive, reusable objects (open vector stores,
+    retrievers, chains, clients). Entries are dropped when the cache is full
+    (least recently used first) or when they have not been used for
+    `idle_timeout` seconds. Each key is built at most once at a time, even
+    when several threads ask for it concurrently, and a handle whose build
+    overlapped an invalidate() of its key is rebuilt instead of cached.
+    """
+
+    def __init__(self, name, max_size=64, idle_timeout=None, on_evict=None):
+        self.name = name
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.on_evict = on_evict
+
+        self._entries = OrderedDict()   # key -> (value, last_used)
+        self._lock = threading.Lock()
+        self._slots = {}                # key -> _KeySlot, while a build is pending
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _evict_locked(self, key):
+        value, _ = self._entries.pop(key)
+        self.evictions += 1
+        return value
+
+    def _expire_locked(self, now):
+        expired = []
+        if self.idle_timeout is not None:
+            for key, (_, last_used) in list(self._entries.items()):
+                if now - last_used > self.idle_timeout:
+                    expired.append(self._evict_locked(key))
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            expired.append(self._evict_locked(oldest))
+        return expired
+
+    def _close(self, values):
+        if self.on_evict is None:
+            return
+        for value in values:
+            try:
+                self.on_evict(value)
+            except Exception as e:
+                print(f"[WARN] {self.name}: error while evicting handle: {e}")
+
+    def _release_slot(self, key, slot):
+        with self._lock:
+            slot.waiters -= 1
+            if slot.waiters == 0 and self._slots.get(key) is slot:
+                del self._slots[key]
+
+    def get_or_create(self, key, factory):
+        now = time.monotonic()
+        with self._lock:
+            expired = self._expire_locked(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (entry[0], now)
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                slot = self._slots.setdefault(key, _KeySlot())
+                slot.waiters += 1
+        self._close(expired)
+        if entry is not None:
+            return entry[0]
+
+        try:
+            with slot.lock:
+                while True:
+                    with self._lock:
+                        entry = self._entries.get(key)
+                        if entry is not None:
+                            self.hits += 1
+                            return entry[0]
+                        self.misses += 1
+                        generation = slot.generation
+
+                    value = factory()
+
+                    with self._lock:
+                        if slot.generation == generation:
+                            self._entries[key] = (value, time.monotonic())
+                            self._entries.move_to_end(key)
+                            expired = self._expire_locked(time.monotonic())
+                            break
+                    # Invalidated while building: the handle may already be stale
+                    self._close([value])
+        finally:
+            self._release_slot(key, slot)
+        self._close(expired)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            value = self._evict_locked(key) if key in self._entries else None
+            if key in self._slots:
+                self._slots[key].generation += 1
+        if value is not None:
+            self._close([value])
+
+    def clear(self):
+        with self._lock:
+            values = [value for value, _ in self._entries.values()]
+            self._entries.clear()
+            for slot in self._slots.values():
+                slot.generation += 1
+        self._close(values)
+
+    def stats(self):
+        with self._lock:
+            expired = self._expire_locked(time.monotonic())
+        self._close(expired)
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "open_handles": len(self._entries),
+                "max_size": self.max_size,
+                "idle_timeout": self.idle_timeout,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,72 @@
+# agent/hub_prompts.py
+
+import json
+import os
+
+from langchain_core.load import dumpd, load
+from langchain_core.prompts import ChatPromptTemplate
+
+# Pulled prompts are stored here so later runs work offline and skip the
+# network round trip.
+HUB_PROMPT_CACHE_DIR = os.getenv("HUB_PROMPT_CACHE_DIR", "./.cache/hub_prompts")
+
+# Prompts the agents use, vendored from LangChain Hub so startup never needs
+# the network.
+VENDORED = {
+    "hwchase17/xml-agent-convo": ChatPromptTemplate.from_template(
+        """You are a helpful assistant. Help the user answer any questions.
+
+You have access to the following tools:
+
+{tools}
+
+In order to use a tool, you can use <tool></tool> and <tool_input></tool_input> tags. You will then get back a response in the form <observation></observation>
+For example, if you have a tool called 'search' that could run a google search, in order to search for the weather in SF you would respond:
+
+<tool>search</tool><tool_input>weather in SF</tool_input>
+<observation>64 degrees</observation>
+
+When you are done, respond with a final answer between <final_answer></final_answer>. For example:
+
+<final_answer>The weather in SF is 64 degrees</final_answer>
+
+Begin!
+
+Previous Conversation:
+{chat_history}
+
+Question: {input}
+{agent_scratchpad}"""
+    ),
+}
+
+_loaded = {}
+
+
+def _cache_path(name):
+    return os.path.join(HUB_PROMPT_CACHE_DIR, name.replace("/", "__") + ".json")
+
+
+def get_hub_prompt(name):
+    """
+    A LangChain Hub prompt by "owner/name", without network access when
+    possible: the vendored copy first, then the on-disk cache, and only then
+    hub.pull (whose result is cached for next time).
+    """
+    if name in _loaded:
+        return _loaded[name]
+    if name in VENDORED:
+        prompt = VENDORED[name]
+    elif os.path.exists(_cache_path(name)):
+        with open(_cache_path(name), encoding="utf-8") as f:
+            prompt = load(json.load(f))
+    else:
+        from langchain import hub
+
+        print(f"[INFO] Pulling prompt '{name}' from LangChain Hub")
+        prompt = hub.pull(name)
+        os.makedirs(HUB_PROMPT_CACHE_DIR, exist_ok=True)
+        with open(_cache_path(name), "w", encoding="utf-8") as f:
+            json.dump(dumpd(prompt), f)
+    _loaded[name] = prompt
+    return prompt
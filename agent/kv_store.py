@@ -0,0 +1,83 @@
+# agent/kv_store.py
+
+import os
+import sqlite3
+import threading
+import time
+
+
+def connect_sqlite(path):
+    """
+    sqlite connection for a cache file, creating its directory. The
+    connection is shared between threads, so every user guards it with its
+    own lock; WAL lets other processes read while one writes.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    return db
+
+
+class TTLStore:
+    """
+    Persistent key -> text store whose entries expire `ttl` seconds after
+    they were written (ttl 0 keeps them forever). Beyond `max_entries` the
+    oldest entries are dropped. Thread-safe; counts hits, misses and expiries.
+    """
+
+    def __init__(self, path, table="entries", ttl=0, max_entries=None):
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = connect_sqlite(path)
+        self._db.execute(f"CREATE TABLE IF NOT EXISTS {table} ("
+                         f"key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)")
+        self._db.commit()
+        self.counters = {"hits": 0, "misses": 0, "expired": 0}
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute(f"SELECT value, created FROM {self.table} WHERE key = ?",
+                                   (key,)).fetchone()
+            if row is not None and self.ttl and time.time() - row[1] > self.ttl:
+                self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._db.commit()
+                self.counters["expired"] += 1
+                row = None
+            self.counters["hits" if row is not None else "misses"] += 1
+        return row[0] if row is not None else None
+
+    def put(self, key, value):
+        with self._lock:
+            self._db.execute(f"INSERT OR REPLACE INTO {self.table} (key, value, created) "
+                             f"VALUES (?, ?, ?)", (key, value, time.time()))
+            if self.max_entries:
+                self._db.execute(f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM "
+                                 f"{self.table} ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                                 (self.max_entries,))
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute(f"DELETE FROM {self.table}")
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            entries = self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            return {"entries": entries, "ttl": self.ttl, **self.counters}
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared(name, factory):
+    """One instance per name for the whole process, built by `factory` on
+    first use (the process-wide caches)."""
+    with _shared_lock:
+        if name not in _shared:
+            _shared[name] = factory()
+        return _shared[name]
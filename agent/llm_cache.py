@@ -0,0 +1,316 @@
+# agent/llm_cache.py
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import warnings
+from collections import deque
+
+from langchain_core.caches import BaseCache
+from langchain_core.language_models import BaseChatModel
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, Generation
+
+from agent.kv_store import connect_sqlite, shared
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./.cache/llm_responses.sqlite")
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+LLM_CACHE_SEMANTIC = os.getenv("LLM_CACHE_SEMANTIC", "false").lower() in ("1", "true", "yes")
+LLM_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("LLM_CACHE_SEMANTIC_THRESHOLD", "0.95"))
+# Semantic lookups only compare against this many recent prompts per model
+LLM_CACHE_SEMANTIC_WINDOW = int(os.getenv("LLM_CACHE_SEMANTIC_WINDOW", "512"))
+
+
+def normalize_prompt(prompt, collapse_whitespace=True):
+    """
+    Canonical text of a prompt. Chat models hand the cache a JSON dump of the
+    message list, so that is reduced to "role: content" lines first; then
+    whitespace is collapsed so formatting-only differences share an entry.
+    Code prompts keep their whitespace: indentation changes what code means.
+    """
+    try:
+        messages = json.loads(prompt)
+    except ValueError:
+        messages = None
+
+    if isinstance(messages, list):
+        lines = []
+        for message in messages:
+            kwargs = message.get("kwargs", {}) if isinstance(message, dict) else {}
+            role = kwargs.get("type") or (message.get("id") or ["message"])[-1]
+            lines.append(f"{role}: {kwargs.get('content', '')}")
+        prompt = "\n".join(lines)
+
+    if not collapse_whitespace:
+        return prompt
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+class ResponseCache(BaseCache):
+    """
+    Persistent LLM response cache plugged into LangChain's per-model `cache`
+    field. Exact mode keys on sha256(llm_string + normalized prompt), where
+    llm_string already encodes the model name and temperature. Semantic mode
+    additionally returns the answer of a recent prompt for the same model
+    whose embedding has cosine similarity >= threshold. Entries expire after
+    `ttl` seconds and the least recently used ones are evicted beyond
+    `max_entries`.
+
+    Callers that must not share answers (one user's documents) get a view()
+    with their own namespace; the namespace is part of every key and of the
+    pool searched for semantic matches.
+    """
+
+    def __init__(self, path=None, ttl=None, max_entries=None, semantic=None,
+                 threshold=None, semantic_window=None):
+        self.path = path or LLM_CACHE_PATH
+        self.ttl = LLM_CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or LLM_CACHE_MAX_ENTRIES
+        self.semantic = LLM_CACHE_SEMANTIC if semantic is None else semantic
+        self.threshold = threshold or LLM_CACHE_SEMANTIC_THRESHOLD
+        self.semantic_window = semantic_window or LLM_CACHE_SEMANTIC_WINDOW
+
+        self._lock = threading.Lock()
+        self._db = connect_sqlite(self.path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, llm_string TEXT NOT NULL, value TEXT NOT NULL, "
+            "embedding BLOB, created REAL NOT NULL, last_used REAL NOT NULL)")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._db.commit()
+
+        # llm_string -> deque of (key, unit vector), newest last
+        self._recent = {}
+        self.counters = {"exact_hits": 0, "semantic_hits": 0, "misses": 0,
+                         "expired": 0, "evictions": 0}
+
+    # -- helpers -------------------------------------------------------------
+
+    @staticmethod
+    def _scope(llm_string, namespace):
+        return f"{namespace}\x1f{llm_string}" if namespace else llm_string
+
+    @staticmethod
+    def _key(prompt_text, llm_string):
+        return hashlib.sha256(f"{llm_string}\0{prompt_text}".encode("utf-8")).hexdigest()
+
+    def _embed(self, text):
+        import numpy as np
+        from agent.embeddings import get_embeddings
+
+        vector = np.asarray(get_embeddings().embed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _recent_for(self, llm_string):
+        recent = self._recent.get(llm_string)
+        if recent is None:
+            import numpy as np
+
+            # Seed from disk so semantic hits survive restarts
+            recent = deque(maxlen=self.semantic_window)
+            rows = self._db.execute(
+                "SELECT key, embedding FROM responses WHERE llm_string = ? "
+                "AND embedding IS NOT NULL ORDER BY last_used DESC LIMIT ?",
+                (llm_string, self.semantic_window)).fetchall()
+            for key, blob in reversed(rows):
+                recent.append((key, np.frombuffer(blob, dtype=np.float32)))
+            self._recent[llm_string] = recent
+        return recent
+
+    def _load_row(self, key, now):
+        row = self._db.execute(
+            "SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, created = row
+        if self.ttl and now - created > self.ttl:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._db.commit()
+            self.counters["expired"] += 1
+            return None
+        self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        self._db.commit()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            return [loads(gen) for gen in json.loads(value)]
+
+    # -- BaseCache -----------------------------------------------------------
+
+    def lookup(self, prompt, llm_string, namespace=None, semantic=True,
+               collapse_whitespace=True):
+        llm_string = self._scope(llm_string, namespace)
+        text = normalize_prompt(prompt, collapse_whitespace)
+        key = self._key(text, llm_string)
+        now = time.time()
+
+        with self._lock:
+            generations = self._load_row(key, now)
+            if generations is not None:
+                self.counters["exact_hits"] += 1
+                return generations
+            recent = self._recent_for(llm_string) if self.semantic and semantic else None
+
+        if recent:
+            import numpy as np
+
+            query = self._embed(text)
+            with self._lock:
+                keys = [k for k, _ in recent]
+                scores = np.stack([v for _, v in recent]) @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    generations = self._load_row(keys[best], now)
+                    if generations is not None:
+                        self.counters["semantic_hits"] += 1
+                        return generations
+
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    def update(self, prompt, llm_string, return_val, namespace=None, semantic=True,
+               collapse_whitespace=True):
+        llm_string = self._scope(llm_string, namespace)
+        text = normalize_prompt(prompt, collapse_whitespace)
+        key = self._key(text, llm_string)
+        value = json.dumps([dumps(gen) for gen in return_val])
+        vector = self._embed(text) if self.semantic and semantic else None
+        now = time.time()
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, llm_string, value, embedding, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, llm_string, value,
+                 vector.tobytes() if vector is not None else None, now, now))
+            if vector is not None:
+                self._recent_for(llm_string).append((key, vector))
+
+            count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                excess = count - self.max_entries
+                self._db.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                    "ORDER BY last_used LIMIT ?)", (excess,))
+                self.counters["evictions"] += excess
+            self._db.commit()
+
+    def clear(self, namespace=None, **kwargs):
+        with self._lock:
+            if namespace:
+                prefix = f"{namespace}\x1f"
+                self._db.execute("DELETE FROM responses WHERE substr(llm_string, 1, ?) = ?",
+                                 (len(prefix), prefix))
+                for llm_string in [k for k in self._recent if k.startswith(prefix)]:
+                    del self._recent[llm_string]
+            else:
+                self._db.execute("DELETE FROM responses")
+                self._recent.clear()
+            self._db.commit()
+
+    def view(self, namespace=None, semantic=True, collapse_whitespace=True):
+        """This cache as seen by one kind of caller (see CacheView)."""
+        return CacheView(self, namespace, semantic, collapse_whitespace)
+
+    def stats(self):
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            counters = dict(self.counters)
+        lookups = counters["exact_hits"] + counters["semantic_hits"] + counters["misses"]
+        hits = counters["exact_hits"] + counters["semantic_hits"]
+        return {"entries": entries, "semantic": self.semantic, **counters,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0}
+
+
+class CacheView(BaseCache):
+    """
+    A ResponseCache restricted to one namespace, optionally without semantic
+    matching (answers grounded in private documents must only be reused for
+    the same prompt) or whitespace collapsing (code prompts).
+    """
+
+    def __init__(self, store, namespace=None, semantic=True, collapse_whitespace=True):
+        self.store = store
+        self.options = {"namespace": namespace, "semantic": semantic,
+                        "collapse_whitespace": collapse_whitespace}
+
+    def lookup(self, prompt, llm_string):
+        return self.store.lookup(prompt, llm_string, **self.options)
+
+    def update(self, prompt, llm_string, return_val):
+        self.store.update(prompt, llm_string, return_val, **self.options)
+
+    def clear(self, **kwargs):
+        self.store.clear(namespace=self.options["namespace"])
+
+    def stats(self):
+        return self.store.stats()
+
+
+# LangChain's .stream() bypasses a model's response cache. Streaming callers
+# look answers up and store them through these helpers, which use the same
+# key the model's invoke() does, so streamed and invoked answers share entries
+# (test_llm_cache.py checks that they stay in step with langchain-core).
+
+def _cache_slot(model, prompt_value):
+    """(cache, prompt key, llm_string) that model.invoke(prompt_value) uses, or
+    None if the model has no response cache."""
+    cache = getattr(model, "cache", None)
+    if not isinstance(cache, BaseCache):
+        return None
+    if isinstance(model, BaseChatModel):
+        return cache, dumps(prompt_value.to_messages()), model._get_llm_string()
+    params = model.dict()
+    params["stop"] = None
+    return cache, prompt_value.to_string(), str(sorted(params.items()))
+
+
+def _generations(model, text):
+    if isinstance(model, BaseChatModel):
+        return [ChatGeneration(message=AIMessage(content=text))]
+    return [Generation(text=text)]
+
+
+def lookup_cached(model, prompt_value):
+    """The cached answer text for `prompt_value`, or None."""
+    slot = _cache_slot(model, prompt_value)
+    hit = slot[0].lookup(slot[1], slot[2]) if slot else None
+    return "".join(getattr(g, "text", "") for g in hit) if hit else None
+
+
+def update_cached(model, prompt_value, text):
+    """Stores a streamed answer where model.invoke(prompt_value) would find it."""
+    slot = _cache_slot(model, prompt_value)
+    if slot:
+        slot[0].update(slot[1], slot[2], _generations(model, text))
+
+
+async def alookup_cached(model, prompt_value):
+    slot = _cache_slot(model, prompt_value)
+    hit = await slot[0].alookup(slot[1], slot[2]) if slot else None
+    return "".join(getattr(g, "text", "") for g in hit) if hit else None
+
+
+async def aupdate_cached(model, prompt_value, text):
+    slot = _cache_slot(model, prompt_value)
+    if slot:
+        await slot[0].aupdate(slot[1], slot[2], _generations(model, text))
+
+
+def get_response_cache(namespace=None, semantic=True, collapse_whitespace=True):
+    """
+    The process-wide ResponseCache, opened on first use, or a view of it for
+    a namespace / without semantic matching / keeping whitespace.
+    """
+    store = shared("llm_responses", ResponseCache)
+    if namespace is None and semantic and collapse_whitespace:
+        return store
+    return store.view(namespace, semantic, collapse_whitespace)
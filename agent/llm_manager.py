@@ -1,35 +1,112 @@
 # agent/llm_manager.py
 
 import os
+import threading
 from dotenv import load_dotenv
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_community.llms import HuggingFaceHub, Together
-from langchain_community.chat_models import ChatOllama
-from langchain_openai import ChatOpenAI as OpenRouterLLM
 from langsmith.run_helpers import traceable
 
+from agent.handle_cache import HandleCache
+
 
 load_dotenv()
 
+# Shared HTTP transport settings for every LLM client
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "32"))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "16"))
+LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "60"))
+LLM_HTTP_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "120"))
+LLM_HTTP_CONNECT_TIMEOUT = float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "10"))
+LLM_CLIENT_CACHE_SIZE = int(os.getenv("LLM_CLIENT_CACHE_SIZE", "32"))
+# Response caching (agent/llm_cache.py); sampled calls (temperature > 0) only
+# use it when the caller opts in with use_cache=True.
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "true").lower() in ("1", "true", "yes")
+
+_clients = HandleCache("llm_clients", max_size=LLM_CLIENT_CACHE_SIZE)
+_transport_lock = threading.Lock()
+_transports = {}
+
+
+def _httpx_settings():
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=LLM_HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(LLM_HTTP_TIMEOUT, connect=LLM_HTTP_CONNECT_TIMEOUT)
+    return limits, timeout
+
+
+def get_http_client():
+    """Process-wide keep-alive httpx client (OpenAI-compatible providers)."""
+    with _transport_lock:
+        if "httpx" not in _transports:
+            import httpx
+            limits, timeout = _httpx_settings()
+            _transports["httpx"] = httpx.Client(limits=limits, timeout=timeout)
+        return _transports["httpx"]
 
-@traceable(name="LLM Provider Selector")
-def get_llm(model_name=None, temperature=0.7):
-    provider = os.getenv("AI_PROVIDER", "OLLAMA").upper()
 
+def get_async_http_client():
+    with _transport_lock:
+        if "httpx_async" not in _transports:
+            import httpx
+            limits, timeout = _httpx_settings()
+            _transports["httpx_async"] = httpx.AsyncClient(limits=limits, timeout=timeout)
+        return _transports["httpx_async"]
+
+
+def get_requests_session():
+    """
+    Process-wide pooled requests.Session for Ollama. langchain_community's
+    client posts through the module-level `requests.post`, which opens a
+    fresh connection every call; PooledChatOllama posts through this
+    session instead, so calls reuse keep-alive connections.
+    """
+    with _transport_lock:
+        if "requests" not in _transports:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=LLM_HTTP_MAX_KEEPALIVE,
+                                  pool_maxsize=LLM_HTTP_MAX_CONNECTIONS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _transports["requests"] = session
+        return _transports["requests"]
+
+
+def _cache_key(provider, model, temperature, cached, cache_namespace, semantic, code, options):
+    return (provider, model, temperature, cached, cache_namespace, semantic, code,
+            tuple(sorted((k, repr(v)) for k, v in options.items())))
+
+
+def _create_llm(provider, model_name, temperature, options):
+    # Provider SDKs are imported only for the backend actually selected: they
+    # are slow to import and most deployments have just one of them installed.
     if provider == "OLLAMA":
+        from agent.ollama_client import PooledChatOllama
         model = model_name or os.getenv("OLLAMA_MODEL", "mistral")
         print(f"[🔗] Using Ollama model: {model}")
-        return ChatOllama(model=model, temperature=temperature)
+        return PooledChatOllama(model=model, temperature=temperature,
+                                timeout=int(LLM_HTTP_TIMEOUT),
+                                session=get_requests_session(), **options)
 
     elif provider == "OPENROUTER":
+        from langchain_openai import ChatOpenAI as OpenRouterLLM
         api_key = os.getenv("OPENROUTER_API_KEY")
         if not api_key:
             raise ValueError("Missing OPENROUTER_API_KEY in .env")
         print(f"[🔐] Using OpenRouter LLM")
-        return OpenRouterLLM(api_key=api_key, temperature=temperature, base_url="https://openrouter.ai/api/v1")
+        return OpenRouterLLM(api_key=api_key, temperature=temperature, base_url="https://openrouter.ai/api/v1",
+                             http_client=get_http_client(),
+                             http_async_client=get_async_http_client(), **options)
 
     elif provider == "GOOGLE":
+        from langchain_google_genai import ChatGoogleGenerativeAI
         print("[🔐] Using Google Gemini via langchain_google_genai")
         return ChatGoogleGenerativeAI(
             google_api_key=os.getenv("GOOGLE_API_KEY"),
@@ -37,20 +114,24 @@ def get_llm(model_name=None, temperature=0.7):
             temperature=temperature,
             max_tokens=None,
             max_retries=2,
-            timeout=None
+            timeout=None,
+            **options
         )
 
     elif provider == "HUGGINGFACE":
+        from langchain_community.llms import HuggingFaceHub
         token = os.getenv("HUGGINGFACEHUB_API_TOKEN")
         if not token:
             raise ValueError("Missing HUGGINGFACEHUB_API_TOKEN in .env")
         print(f"[🔐] Using HuggingFace Hub LLM")
         return HuggingFaceHub(
             repo_id="tiiuae/falcon-7b-instruct",
-            huggingfacehub_api_token=token
+            huggingfacehub_api_token=token,
+            **options
         )
 
     elif provider == "TOGETHER":
+        from langchain_community.llms import Together
         api_key = os.getenv("TOGETHER_API_KEY")
         if not api_key:
             raise ValueError("Missing TOGETHER_API_KEY in .env")
@@ -58,8 +139,120 @@ def get_llm(model_name=None, temperature=0.7):
         return Together(
             model="mistralai/Mistral-7B-Instruct-v0.1",
             together_api_key=api_key,
-            temperature=temperature
+            temperature=temperature,
+            **options
         )
 
+    elif provider == "STUB":
+        # Offline stand-in with simulated latency/failures (see agent/router.py)
+        from agent.router import SimulatedChatModel
+        print(f"[🧪] Using simulated LLM")
+        return SimulatedChatModel(
+            name=model_name or "stub",
+            latency_ms=float(os.getenv("STUB_LATENCY_MS", "50")),
+            jitter_ms=float(os.getenv("STUB_JITTER_MS", "10")),
+            failure_rate=float(os.getenv("STUB_FAILURE_RATE", "0")),
+            **options
+        )
+
+    elif provider == "ROUTER":
+        # Several backends behind one latency-aware, hedging router
+        from agent.router import LatencyRouter
+        names = [p.strip().upper() for p in os.getenv("AI_PROVIDERS", "").split(",") if p.strip()]
+        if not names:
+            raise ValueError("AI_PROVIDER=ROUTER needs AI_PROVIDERS, e.g. OLLAMA,OPENROUTER")
+        if "ROUTER" in names:
+            raise ValueError("AI_PROVIDERS cannot include ROUTER itself")
+        print(f"[🔀] Routing between providers: {', '.join(names)}")
+        return LatencyRouter({
+            name: get_llm(model_name, temperature, provider=name, **options)
+            for name in names
+        })
+
     else:
         raise ValueError(f"Invalid AI_PROVIDER '{provider}' specified in .env")
+
+
+@traceable(name="LLM Provider Selector")
+def get_llm(model_name=None, temperature=0.7, use_cache=None, provider=None,
+            cache_namespace=None, code=False, semantic=None, **options):
+    """
+    Returns the LLM client for the configured AI_PROVIDER. Clients are cached
+    per (provider, model, temperature, options) and share pooled keep-alive
+    HTTP connections, so calling this per request is cheap.
+
+    use_cache controls the response cache: None caches only deterministic
+    calls (temperature 0), True opts a sampled call in, False disables it.
+    Answers grounded in one user's documents pass cache_namespace (their
+    store directory): they are only reused for that namespace and never
+    matched semantically. semantic=False makes other calls exact-match only
+    too (prompts sharing a long template must not stand in for each other).
+    code=True keeps prompt whitespace in cache keys.
+    .stream() skips the cache; streaming callers read and fill the same
+    entries with agent.llm_cache.lookup_cached / update_cached.
+    `provider` overrides AI_PROVIDER for this call.
+    """
+    provider = (provider or os.getenv("AI_PROVIDER", "OLLAMA")).upper()
+    if use_cache is None:
+        use_cache = temperature == 0
+    cached = bool(use_cache) and LLM_CACHE_ENABLED
+    if semantic is None:
+        semantic = cache_namespace is None
+
+    key = _cache_key(provider, model_name, temperature, cached, cache_namespace, semantic,
+                     code, options)
+
+    def create():
+        client_options = dict(options)
+        if provider == "ROUTER":
+            # The routed backends carry their own response cache
+            client_options.update(use_cache=use_cache, cache_namespace=cache_namespace,
+                                  semantic=semantic, code=code)
+        elif cached:
+            from agent.llm_cache import get_response_cache
+            client_options["cache"] = get_response_cache(
+                namespace=cache_namespace, semantic=semantic,
+                collapse_whitespace=not code)
+        return _create_llm(provider, model_name, temperature, client_options)
+
+    return _clients.get_or_create(key, create)
+
+
+def pool_stats():
+    """Client cache and HTTP connection pool statistics."""
+    stats = {"clients": _clients.stats()}
+    if LLM_CACHE_ENABLED:
+        from agent.llm_cache import get_response_cache
+        stats["response_cache"] = get_response_cache().stats()
+
+    with _transport_lock:
+        client = _transports.get("httpx")
+        session = _transports.get("requests")
+
+    if client is not None:
+        # httpcore keeps its connection list on the transport's pool
+        pool = getattr(getattr(client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        stats["httpx"] = {
+            "max_connections": LLM_HTTP_MAX_CONNECTIONS,
+            "max_keepalive": LLM_HTTP_MAX_KEEPALIVE,
+            "open_connections": len(connections),
+            "idle_connections": sum(1 for c in connections if c.is_idle()),
+        }
+
+    if session is not None:
+        pools = []
+        for adapter in set(session.adapters.values()):
+            manager = getattr(adapter, "poolmanager", None)
+            if manager is None:
+                continue
+            for pool_key in manager.pools.keys():
+                pool = manager.pools[pool_key]
+                pools.append({
+                    "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+                    "connections_created": pool.num_connections,
+                    "requests": pool.num_requests,
+                })
+        stats["requests"] = {"max_per_host": LLM_HTTP_MAX_CONNECTIONS, "pools": pools}
+
+    return stats
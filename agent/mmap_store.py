@@ -0,0 +1,599 @@
+# agent/mmap_store.py
+
+import json
+import math
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Any, Iterable, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within one process
+    fcntl = None
+
+# Below this many rows every search is an exact scan; above it an IVF index
+# (k-means centroids + inverted lists) is trained and only `nprobe` lists
+# are scanned per query.
+MMAP_IVF_MIN_ROWS = int(os.getenv("MMAP_IVF_MIN_ROWS", "4096"))
+# Number of IVF lists; 0 picks sqrt(rows)
+MMAP_IVF_LISTS = int(os.getenv("MMAP_IVF_LISTS", "0"))
+MMAP_IVF_NPROBE = int(os.getenv("MMAP_IVF_NPROBE", "8"))
+# Retrain the centroids once the store has grown by this factor
+MMAP_IVF_RETRAIN_GROWTH = float(os.getenv("MMAP_IVF_RETRAIN_GROWTH", "4"))
+# "none", "int8" (per-row scaled codes, 1 byte/dim) or "binary" (sign bits,
+# 1 bit/dim). Recorded in the store when it is created; pass quantization=
+# to open_vectorstore / MmapVectorStore to change it for one store.
+MMAP_QUANTIZATION = os.getenv("MMAP_QUANTIZATION", "none").lower()
+# Quantized scans keep k * this many candidates for exact re-scoring; 0 uses
+# a per-mode default (sign bits lose more, so binary keeps more)
+MMAP_RERANK_FACTOR = int(os.getenv("MMAP_RERANK_FACTOR", "0"))
+
+_DTYPE = np.dtype(np.float16)
+_SCAN_BLOCK = 65536
+_TRAIN_SAMPLE = 50000
+_SQL_BATCH = 500
+_QUANTIZATIONS = ("none", "int8", "binary")
+_DEFAULT_RERANK = {"int8": 10, "binary": 40}
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class _DirectoryLock:
+    """
+    Write lock for one store directory, shared by every MmapVectorStore on
+    it in this process (re-entrant), and held across processes with flock on
+    `write.lock` while any thread here is writing.
+    """
+
+    def __init__(self, path):
+        self._path = os.path.join(path, "write.lock")
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        try:
+            if self._depth == 0 and fcntl is not None:
+                self._file = open(self._path, "a")
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+        except BaseException:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._lock.release()
+            raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self._depth -= 1
+        if self._depth == 0 and self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._lock.release()
+
+
+_directory_locks = {}
+_directory_locks_guard = threading.Lock()
+
+
+def _directory_lock(path):
+    path = os.path.realpath(path)
+    with _directory_locks_guard:
+        if path not in _directory_locks:
+            _directory_locks[path] = _DirectoryLock(path)
+        return _directory_locks[path]
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def quantize(vectors, mode):
+    """
+    (codes, scales) for unit vectors. int8 scales each row by its largest
+    component so the full code range is used; binary keeps only the signs.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if mode == "int8":
+        peak = np.abs(vectors).max(axis=1)
+        peak[peak == 0] = 1
+        codes = np.round(vectors / peak[:, None] * 127).astype(np.int8)
+        return codes, (peak / 127).astype(np.float32)
+    return np.packbits(vectors > 0, axis=1), None
+
+
+def _nearest(vectors, centroids):
+    """Index of the closest centroid for each row, computed in blocks."""
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), _SCAN_BLOCK // 8):
+        block = np.asarray(vectors[start:start + _SCAN_BLOCK // 8], dtype=np.float32)
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def _kmeans(sample, n_lists, iterations=10, seed=0):
+    """Spherical k-means: unit-length centroids maximising dot product."""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _nearest(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        empty = np.flatnonzero(np.bincount(labels, minlength=n_lists) == 0)
+        # Re-seed empty lists with random points so no centroid goes unused
+        sums[empty] = sample[rng.choice(len(sample), len(empty), replace=False)]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class MmapVectorStore(VectorStore):
+    """
+    Local vector store whose vectors live in an append-only, memory-mapped
+    float16 matrix (`vectors.f16`), with chunk text / metadata in sqlite and
+    an IVF index (`centroids.npy` + `assign.i32`) on top.
+
+    Readers map the files read-only, so every process opening the same
+    directory shares one page-cached copy and opening is just an mmap.
+    Rows appended by a writer become visible to readers on their next
+    search; rows not yet assigned to an IVF list are scanned exactly.
+    Updates and deletes only tombstone rows in sqlite. Writes to one
+    directory are serialized, between stores in this process and (where
+    flock exists) between processes, so concurrent appends never claim the
+    same row numbers.
+    """
+
+    def __init__(self, persist_directory, embedding_function, nprobe=None,
+                 min_ivf_rows=None, n_lists=None, quantization=None, rerank_factor=None):
+        self.path = persist_directory
+        self._embedding = embedding_function
+        self.nprobe = nprobe or MMAP_IVF_NPROBE
+        self.min_ivf_rows = MMAP_IVF_MIN_ROWS if min_ivf_rows is None else min_ivf_rows
+        self.n_lists = MMAP_IVF_LISTS if n_lists is None else n_lists
+        os.makedirs(self.path, exist_ok=True)
+
+        self._vectors_path = os.path.join(self.path, "vectors.f16")
+        self._assign_path = os.path.join(self.path, "assign.i32")
+        self._centroids_path = os.path.join(self.path, "centroids.npy")
+
+        self._lock = threading.RLock()
+        self._write_lock = _directory_lock(self.path)
+        self._db = sqlite3.connect(os.path.join(self.path, "store.sqlite"),
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (row INTEGER PRIMARY KEY, id TEXT NOT NULL, "
+            "text TEXT NOT NULL, metadata TEXT, deleted INTEGER NOT NULL DEFAULT 0)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS chunks_id ON chunks (id)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._db.commit()
+
+        self._dim = None
+        self._rows = 0
+        self._matrix = None
+        self._centroids = None
+        self._centroids_stamp = None
+        self._assigned = 0
+        self._order = None
+        self._bounds = None
+        self._codes = None
+        self._scales = None
+        self._coded = 0
+
+        stored = self._meta("quantization")
+        self.quantization = (quantization or stored or MMAP_QUANTIZATION).lower()
+        if self.quantization not in _QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{self.quantization}' "
+                             f"(expected one of {', '.join(_QUANTIZATIONS)})")
+        self.rerank_factor = (rerank_factor or MMAP_RERANK_FACTOR
+                              or _DEFAULT_RERANK.get(self.quantization, 10))
+        if stored != self.quantization:
+            self._set_quantization(stored)
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    @property
+    def _codes_path(self):
+        return os.path.join(self.path, f"codes.{self.quantization}")
+
+    @property
+    def _scales_path(self):
+        return os.path.join(self.path, "scales.f32")
+
+    def _code_bytes(self):
+        return self._dim if self.quantization == "int8" else (self._dim + 7) // 8
+
+    def _set_quantization(self, previous):
+        with self._writing():
+            if previous and previous != "none":
+                for path in (os.path.join(self.path, f"codes.{previous}"), self._scales_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+            self._db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('quantization', ?)",
+                             (self.quantization,))
+            self._db.commit()
+            self._refresh()
+            if self._rows and self.quantization != "none":
+                print(f"[INFO] Encoding {self._rows} vectors as {self.quantization} codes")
+                self._encode_tail()
+
+    @contextmanager
+    def _writing(self):
+        # Directory lock first, then this store's lock: always in that order
+        with self._write_lock, self._lock:
+            yield
+
+    # -- reading -------------------------------------------------------------
+
+    def _meta(self, name):
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _refresh(self):
+        """Remaps the files if another process (or this one) appended to them."""
+        with self._lock:
+            if self._dim is None:
+                dim = self._meta("dim")
+                if dim is None:
+                    return
+                self._dim = int(dim)
+
+            size = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+            rows = size // (self._dim * _DTYPE.itemsize)
+            if rows != self._rows:
+                self._matrix = (np.memmap(self._vectors_path, dtype=_DTYPE, mode="r",
+                                          shape=(rows, self._dim)) if rows else None)
+                self._rows = rows
+
+            # Retraining replaces the file, so (mtime, inode) changes
+            stamp = None
+            if os.path.exists(self._centroids_path):
+                info = os.stat(self._centroids_path)
+                stamp = (info.st_mtime_ns, info.st_ino)
+            assigned = (os.path.getsize(self._assign_path) // 4
+                        if stamp is not None and os.path.exists(self._assign_path) else 0)
+            if stamp != self._centroids_stamp or assigned != self._assigned:
+                self._load_ivf(stamp, min(assigned, rows))
+
+            if self.quantization != "none" and os.path.exists(self._codes_path):
+                coded = min(rows, os.path.getsize(self._codes_path) // self._code_bytes())
+                if self.quantization == "int8":
+                    scaled = (os.path.getsize(self._scales_path) // 4
+                              if os.path.exists(self._scales_path) else 0)
+                    coded = min(coded, scaled)
+                if coded != self._coded:
+                    self._map_codes(coded)
+
+    def _load_ivf(self, stamp, assigned):
+        if stamp is None or not assigned:
+            self._centroids, self._order, self._bounds = None, None, None
+        else:
+            if self._centroids is None or stamp != self._centroids_stamp:
+                self._centroids = np.load(self._centroids_path)
+            labels = np.fromfile(self._assign_path, dtype=np.int32, count=assigned)
+            # Rows grouped by list: list l is order[bounds[l]:bounds[l + 1]]
+            self._order = np.argsort(labels, kind="stable").astype(np.int64)
+            self._bounds = np.searchsorted(labels[self._order],
+                                           np.arange(len(self._centroids) + 1))
+        self._centroids_stamp = stamp
+        self._assigned = assigned if self._centroids is not None else 0
+
+    def _map_codes(self, coded):
+        if not coded:
+            self._codes, self._scales, self._coded = None, None, 0
+            return
+        self._codes = np.memmap(self._codes_path, dtype=np.int8 if self.quantization == "int8"
+                                else np.uint8, mode="r", shape=(coded, self._code_bytes()))
+        self._scales = (np.memmap(self._scales_path, dtype=np.float32, mode="r", shape=(coded,))
+                        if self.quantization == "int8" else None)
+        self._coded = coded
+
+    def _snapshot(self):
+        # Mapped arrays are replaced, never mutated, on refresh: a search can
+        # use a consistent snapshot without holding the lock.
+        with self._lock:
+            return (self._matrix, self._rows, self._centroids, self._order,
+                    self._bounds, self._assigned, self._codes, self._scales, self._coded)
+
+    def _approx(self, query, codes, scales, rows):
+        """Quantized scores (higher is better) for `rows`, or every coded row."""
+        if self.quantization == "int8":
+            query = query.astype(np.float32)
+            if rows is None:
+                out = np.empty(len(codes), dtype=np.float32)
+                for start in range(0, len(codes), _SCAN_BLOCK):
+                    block = codes[start:start + _SCAN_BLOCK].astype(np.float32)
+                    out[start:start + len(block)] = block @ query
+                return out * scales
+            return (codes[rows].astype(np.float32) @ query) * scales[rows]
+
+        # Binary: negative Hamming distance between sign patterns
+        bits = np.packbits(query > 0)
+        if rows is None:
+            out = np.empty(len(codes), dtype=np.float32)
+            for start in range(0, len(codes), _SCAN_BLOCK):
+                block = codes[start:start + _SCAN_BLOCK]
+                out[start:start + len(block)] = -_POPCOUNT[block ^ bits].sum(axis=1, dtype=np.int32)
+            return out
+        return -_POPCOUNT[codes[rows] ^ bits].sum(axis=1, dtype=np.int32).astype(np.float32)
+
+    def _score(self, query, k):
+        """
+        (rows, exact scores) for the probed IVF lists + unassigned tail, or
+        all rows. With quantization the candidates are first ranked on their
+        codes and only the best k * rerank_factor are re-scored exactly.
+        """
+        (matrix, n_rows, centroids, order, bounds, assigned,
+         codes, scales, coded) = self._snapshot()
+        if centroids is None:
+            rows = None
+        else:
+            lists = np.argsort(-(centroids @ query))[:self.nprobe]
+            parts = [order[bounds[l]:bounds[l + 1]] for l in lists]
+            parts.append(np.arange(assigned, n_rows, dtype=np.int64))
+            rows = np.sort(np.concatenate(parts))  # sequential page access
+
+        if codes is not None:
+            keep = max(k * self.rerank_factor, k * 4 + 16)
+            if rows is None:
+                candidates, uncoded = None, np.arange(coded, n_rows, dtype=np.int64)
+            else:
+                candidates, uncoded = rows[rows < coded], rows[rows >= coded]
+            approx = self._approx(query, codes, scales, candidates)
+            if len(approx) > keep:
+                best = np.argpartition(-approx, keep - 1)[:keep]
+                best = candidates[best] if candidates is not None else best
+            else:
+                best = candidates if candidates is not None else np.arange(coded)
+            rows = np.sort(np.concatenate([best.astype(np.int64), uncoded]))
+
+        if rows is None:
+            # Exact scan in blocks so large stores never materialise in full
+            scores = np.empty(n_rows, dtype=np.float32)
+            for start in range(0, n_rows, _SCAN_BLOCK):
+                block = matrix[start:start + _SCAN_BLOCK]
+                scores[start:start + len(block)] = block.astype(np.float32) @ query
+            return np.arange(n_rows), scores
+        return rows, matrix[rows].astype(np.float32) @ query
+
+    def _search(self, vector, k, filter=None):
+        self._refresh()
+        if self._matrix is None:
+            return []
+        rows, scores = self._score(_normalize(vector), k)
+        if not len(scores):
+            return []
+
+        # Over-fetch to make up for tombstoned and filtered-out rows
+        fetch = k * 4 + 16
+        while True:
+            top = np.argpartition(-scores, min(fetch, len(scores)) - 1)[:fetch]
+            top = top[np.argsort(-scores[top])]
+            hits = self._live_rows([int(rows[i]) for i in top])
+            results = []
+            for i in top:
+                hit = hits.get(int(rows[i]))
+                if hit is None:
+                    continue
+                doc = Document(page_content=hit[0], metadata=hit[1])
+                if filter and any(doc.metadata.get(key) != value for key, value in filter.items()):
+                    continue
+                results.append((doc, float(scores[i])))
+                if len(results) == k:
+                    return results
+            if fetch >= len(scores):
+                return results
+            fetch *= 4
+
+    def _live_rows(self, rows):
+        found = {}
+        with self._lock:
+            for start in range(0, len(rows), _SQL_BATCH):
+                batch = rows[start:start + _SQL_BATCH]
+                marks = ",".join("?" * len(batch))
+                for row, text, metadata in self._db.execute(
+                        f"SELECT row, text, metadata FROM chunks "
+                        f"WHERE row IN ({marks}) AND deleted = 0", batch):
+                    found[row] = (text, json.loads(metadata) if metadata else {})
+        return found
+
+    # -- writing -------------------------------------------------------------
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        vectors = self._embedding.embed_documents(texts)
+        return self.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+
+    def add_embeddings(self, text_embeddings, metadatas=None, ids=None, **kwargs):
+        """Appends precomputed (text, vector) pairs; existing ids are replaced."""
+        text_embeddings = list(text_embeddings)
+        if not text_embeddings:
+            return []
+        texts = [text for text, _ in text_embeddings]
+        vectors = _normalize([vector for _, vector in text_embeddings])
+        metadatas = metadatas or [{}] * len(texts)
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+
+        with self._writing():
+            self._refresh()
+            if self._dim is None:
+                self._dim = vectors.shape[1]
+                self._db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('dim', ?)",
+                                 (str(self._dim),))
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(f"Vector size {vectors.shape[1]} does not match store ({self._dim})")
+
+            self._tombstone(ids)
+            with open(self._vectors_path, "ab") as f:
+                start = f.tell() // (self._dim * _DTYPE.itemsize)
+                f.write(vectors.astype(_DTYPE).tobytes())
+            self._db.executemany(
+                "INSERT OR REPLACE INTO chunks (row, id, text, metadata, deleted) "
+                "VALUES (?, ?, ?, ?, 0)",
+                [(start + i, chunk_id, text, json.dumps(metadata or {}, default=str))
+                 for i, (chunk_id, text, metadata) in enumerate(zip(ids, texts, metadatas))])
+            self._db.commit()
+
+            self._refresh()
+            if self.quantization != "none":
+                self._encode_tail()
+            if self._centroids is not None and self._rows < MMAP_IVF_RETRAIN_GROWTH * self._trained_rows():
+                self._assign_tail()
+            elif self._rows >= self.min_ivf_rows:
+                self.train()
+        return ids
+
+    def _tombstone(self, ids):
+        for start in range(0, len(ids), _SQL_BATCH):
+            batch = ids[start:start + _SQL_BATCH]
+            marks = ",".join("?" * len(batch))
+            self._db.execute(
+                f"UPDATE chunks SET deleted = 1 WHERE id IN ({marks}) AND deleted = 0", batch)
+
+    def _trained_rows(self):
+        return int(self._meta("trained_rows") or 0)
+
+    def _encode_tail(self):
+        """Appends quantized codes for rows added since the last encoding."""
+        for start in range(self._coded, self._rows, _SCAN_BLOCK):
+            block = self._matrix[start:min(self._rows, start + _SCAN_BLOCK)]
+            codes, scales = quantize(block, self.quantization)
+            # Scales first: readers only count rows that have both
+            if scales is not None:
+                with open(self._scales_path, "ab") as f:
+                    f.write(scales.tobytes())
+            with open(self._codes_path, "ab") as f:
+                f.write(codes.tobytes())
+        self._refresh()
+
+    def _assign_tail(self):
+        """Appends IVF list numbers for rows added since the last assignment."""
+        assigned = os.path.getsize(self._assign_path) // 4
+        with open(self._assign_path, "ab") as f:
+            f.write(_nearest(self._matrix[assigned:self._rows], self._centroids).tobytes())
+        self._refresh()
+
+    def train(self):
+        """(Re)builds the IVF centroids from a sample and reassigns every row."""
+        with self._writing():
+            self._refresh()
+            rows = self._rows
+            n_lists = self.n_lists or int(math.sqrt(rows))
+            n_lists = max(1, min(n_lists, rows // 8 or 1))
+            print(f"[INFO] Training IVF index over {rows} vectors ({n_lists} lists)")
+
+            rng = np.random.default_rng(rows)
+            sample_size = min(rows, max(n_lists * 32, _TRAIN_SAMPLE))
+            sample_rows = np.sort(rng.choice(rows, sample_size, replace=False))
+            centroids = _kmeans(self._matrix[sample_rows].astype(np.float32), n_lists)
+
+            tmp_assign = self._assign_path + ".tmp"
+            with open(tmp_assign, "wb") as f:
+                f.write(_nearest(self._matrix[:rows], centroids).tobytes())
+            tmp_centroids = self._centroids_path + ".tmp.npy"
+            np.save(tmp_centroids, centroids.astype(np.float32))
+            # Readers reload the lists when the centroids file changes
+            os.replace(tmp_assign, self._assign_path)
+            os.replace(tmp_centroids, self._centroids_path)
+            self._db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('trained_rows', ?)",
+                             (str(rows),))
+            self._db.commit()
+            self._refresh()
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        with self._writing():
+            self._tombstone(list(ids))
+            self._db.commit()
+        return True
+
+    def delete_collection(self):
+        """Removes every chunk and vector (same call as Chroma's)."""
+        with self._writing():
+            self._db.execute("DELETE FROM chunks")
+            self._db.execute("DELETE FROM meta")
+            self._db.commit()
+            for path in (self._vectors_path, self._assign_path, self._centroids_path,
+                         self._codes_path, self._scales_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._db.execute("INSERT INTO meta (name, value) VALUES ('quantization', ?)",
+                             (self.quantization,))
+            self._db.commit()
+            self._dim, self._rows, self._matrix = None, 0, None
+            self._load_ivf(None, 0)
+            self._codes, self._scales, self._coded = None, None, 0
+
+    # -- listing (used to keep the BM25 index in sync) ------------------------
+
+    def list_ids(self):
+        with self._lock:
+            return {row[0] for row in self._db.execute("SELECT id FROM chunks WHERE deleted = 0")}
+
+    def get_chunks(self, ids):
+        """(ids, texts, metadatas) for the given live ids."""
+        found = {}
+        with self._lock:
+            for start in range(0, len(ids), _SQL_BATCH):
+                batch = ids[start:start + _SQL_BATCH]
+                marks = ",".join("?" * len(batch))
+                for chunk_id, text, metadata in self._db.execute(
+                        f"SELECT id, text, metadata FROM chunks "
+                        f"WHERE id IN ({marks}) AND deleted = 0", batch):
+                    found[chunk_id] = (text, json.loads(metadata) if metadata else {})
+        ids = [i for i in ids if i in found]
+        return ids, [found[i][0] for i in ids], [found[i][1] for i in ids]
+
+    # -- VectorStore search API ----------------------------------------------
+
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        return self._search(self._embedding.embed_query(query), k, filter)
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self._search(embedding, k, filter)]
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are cosine similarities in [-1, 1]
+        return lambda score: (score + 1) / 2
+
+    def stats(self):
+        self._refresh()
+        with self._lock:
+            live, total = self._db.execute(
+                "SELECT COALESCE(SUM(deleted = 0), 0), COUNT(*) FROM chunks").fetchone()
+        code_bytes = (self._coded * (self._code_bytes() + (4 if self.quantization == "int8" else 0))
+                      if self._coded else 0)
+        return {"rows": self._rows, "live": live, "tombstoned": total - live,
+                "dim": self._dim, "ivf_lists": len(self._centroids) if self._centroids is not None else 0,
+                "assigned": self._assigned, "nprobe": self.nprobe,
+                "quantization": self.quantization, "coded": self._coded,
+                # What a search scans vs. the float16 rows kept for re-scoring
+                "scan_bytes": code_bytes if self._codes is not None
+                else self._rows * (self._dim or 0) * _DTYPE.itemsize,
+                "vector_bytes": self._rows * (self._dim or 0) * _DTYPE.itemsize}
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, persist_directory: str = "./mmap_store",
+                   **kwargs: Any) -> "MmapVectorStore":
+        store = cls(persist_directory, embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
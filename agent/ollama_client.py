@@ -0,0 +1,61 @@
+# agent/ollama_client.py
+
+from typing import Any, Iterator, List, Optional
+
+from langchain_community.chat_models import ChatOllama
+from langchain_community.llms.ollama import OllamaEndpointNotFoundError
+
+
+class PooledChatOllama(ChatOllama):
+    """
+    ChatOllama that posts through a requests.Session we own instead of the
+    module-level `requests.post`, which opens a fresh connection per call.
+    The request is built the same way as in langchain_community's
+    _OllamaCommon._create_stream.
+    """
+
+    session: Any = None
+
+    def _create_stream(self, api_url: str, payload: Any, stop: Optional[List[str]] = None,
+                       **kwargs: Any) -> Iterator[str]:
+        if self.session is None:
+            return super()._create_stream(api_url, payload, stop, **kwargs)
+        if self.stop is not None and stop is not None:
+            raise ValueError("`stop` found in both the input and default params.")
+        stop = self.stop if self.stop is not None else stop
+
+        params = self._default_params
+        for key in self._default_params:
+            if key in kwargs:
+                params[key] = kwargs[key]
+        if "options" in kwargs:
+            params["options"] = kwargs["options"]
+        else:
+            params["options"] = {
+                **params["options"], "stop": stop,
+                **{k: v for k, v in kwargs.items() if k not in self._default_params},
+            }
+
+        if payload.get("messages"):
+            request_payload = {"messages": payload.get("messages", []), **params}
+        else:
+            request_payload = {"prompt": payload.get("prompt"),
+                               "images": payload.get("images", []), **params}
+
+        response = self.session.post(
+            url=api_url,
+            headers={"Content-Type": "application/json",
+                     **(self.headers if isinstance(self.headers, dict) else {})},
+            json=request_payload,
+            stream=True,
+            timeout=self.timeout,
+        )
+        response.encoding = "utf-8"
+        if response.status_code == 404:
+            raise OllamaEndpointNotFoundError(
+                "Ollama call failed with status code 404. Maybe your model is not found "
+                f"and you should pull the model with `ollama pull {self.model}`.")
+        if response.status_code != 200:
+            raise ValueError(f"Ollama call failed with status code {response.status_code}."
+                             f" Details: {response.text}")
+        return response.iter_lines(decode_unicode=True)
@@ -0,0 +1,326 @@
+# agent/retriever.py
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from heapq import nlargest
+from typing import Any, List, Optional
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+# "hybrid" fuses BM25 with dense search, "dense" is plain similarity search
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+# Candidates taken from each side before fusion
+RETRIEVAL_FETCH_K = int(os.getenv("RETRIEVAL_FETCH_K", "20"))
+# Reciprocal rank fusion constant: higher flattens the rank contribution
+RETRIEVAL_RRF_K = int(os.getenv("RETRIEVAL_RRF_K", "60"))
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "8"))
+BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+_IDENT_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by do does for from how i in is it of on or the "
+    "this that to what when where which who why with".split())
+
+# Vector and keyword searches of concurrent queries share this pool
+_pool = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retriever")
+
+
+def tokenize(text):
+    """
+    Code-aware terms: every identifier lowercased, plus its snake_case and
+    camelCase parts, so `getUserName` matches both "getusername" and "user".
+    """
+    terms = []
+    for token in _IDENT_RE.findall(text):
+        lower = token.lower()
+        if lower in _STOPWORDS:
+            continue
+        terms.append(lower)
+        parts = [p.lower() for piece in token.split("_") for p in _CAMEL_RE.findall(piece)]
+        if len(parts) > 1:
+            terms.extend(p for p in parts if len(p) > 1 and p not in _STOPWORDS)
+    return terms
+
+
+def doc_key(doc):
+    """
+    Identity used to merge the two result lists. Stores do not hand back
+    their ids with search results, so chunks are matched by source + text.
+    """
+    source = str(doc.metadata.get("source", ""))
+    return hashlib.sha1(f"{source}\0{doc.page_content}".encode("utf-8")).hexdigest()
+
+
+class BM25Index:
+    """
+    Incremental in-memory inverted index with Okapi BM25 scoring. Chunks are
+    added and removed by id, so it can follow a vector store without a
+    rebuild, and the whole index is saved as one JSON file (plain data, so
+    a file in a writable store directory cannot execute code when loaded).
+    """
+
+    def __init__(self, k1=None, b=None):
+        self.k1 = BM25_K1 if k1 is None else k1
+        self.b = BM25_B if b is None else b
+        self.postings = defaultdict(dict)   # term -> {id: term frequency}
+        self.lengths = {}                   # id -> number of terms
+        self.docs = {}                      # id -> (text, metadata)
+        self.total_length = 0
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.docs)
+
+    def ids(self):
+        with self.lock:
+            return set(self.docs)
+
+    def add(self, ids, texts, metadatas=None):
+        metadatas = metadatas or [{}] * len(ids)
+        with self.lock:
+            for doc_id, text, metadata in zip(ids, texts, metadatas):
+                if doc_id in self.docs:
+                    self._remove(doc_id)
+                counts = Counter(tokenize(text))
+                for term, tf in counts.items():
+                    self.postings[term][doc_id] = tf
+                length = sum(counts.values())
+                self.lengths[doc_id] = length
+                self.total_length += length
+                self.docs[doc_id] = (text, metadata or {})
+
+    def remove(self, ids):
+        with self.lock:
+            for doc_id in ids:
+                if doc_id in self.docs:
+                    self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        text, _ = self.docs.pop(doc_id)
+        for term in set(tokenize(text)):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= self.lengths.pop(doc_id)
+
+    def search(self, query, k=5):
+        """[(id, score)] best first."""
+        with self.lock:
+            n = len(self.docs)
+            if not n:
+                return []
+            avgdl = self.total_length / n or 1.0
+            scores = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_id] / avgdl)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+            return nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def documents(self, ids):
+        with self.lock:
+            return [Document(page_content=self.docs[i][0], metadata=dict(self.docs[i][1]))
+                    for i in ids if i in self.docs]
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with self.lock, open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "docs": self.docs, "lengths": self.lengths,
+                       "postings": self.postings}, f, separators=(",", ":"), default=str)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        index = cls()
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    state = json.load(f)
+                index.k1, index.b = state["k1"], state["b"]
+                index.docs = {doc_id: tuple(doc) for doc_id, doc in state["docs"].items()}
+                index.lengths = state["lengths"]
+                index.total_length = sum(index.lengths.values())
+                index.postings = defaultdict(dict, state["postings"])
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"[WARN] Rebuilding unreadable BM25 index {path}: {e}")
+                index = cls()
+        return index
+
+
+def _store_ids(vectorstore):
+    """All chunk ids in the store, or None when the store cannot list them."""
+    if hasattr(vectorstore, "list_ids"):
+        return vectorstore.list_ids()
+    collection = getattr(vectorstore, "_collection", None)
+    if collection is not None:
+        return set(collection.get(include=[])["ids"])
+    return None
+
+
+def _store_chunks(vectorstore, ids, batch_size=2000):
+    for start in range(0, len(ids), batch_size):
+        if hasattr(vectorstore, "get_chunks"):
+            yield vectorstore.get_chunks(ids[start:start + batch_size])
+            continue
+        batch = vectorstore._collection.get(ids=ids[start:start + batch_size],
+                                            include=["documents", "metadatas"])
+        yield batch["ids"], batch["documents"], batch["metadatas"]
+
+
+def sync_index(index, vectorstore):
+    """
+    Brings `index` in line with the chunks currently in `vectorstore`: new
+    ids are fetched and indexed, ids no longer present are dropped. Returns
+    (added, removed), or None if the store cannot be enumerated.
+    """
+    current = _store_ids(vectorstore)
+    if current is None:
+        return None
+    known = index.ids()
+    stale = known - current
+    new = sorted(current - known)
+    index.remove(stale)
+    for ids, texts, metadatas in _store_chunks(vectorstore, new):
+        index.add(ids, [t or "" for t in texts], metadatas)
+    return len(new), len(stale)
+
+
+def _store_fingerprint(persist_dir):
+    """
+    Cheap change marker for the store in `persist_dir`: name, size and mtime
+    of the files directly in it. Every store here commits to a file at the
+    top of its directory (chroma.sqlite3, store.sqlite / vectors.f16), so
+    any write by this or another process changes it.
+    """
+    try:
+        # sqlite's -shm file and the mmap store's write.lock change on reads
+        entries = [e for e in os.scandir(persist_dir)
+                   if e.is_file() and not e.name.startswith("bm25_index")
+                   and not e.name.endswith(("-shm", ".lock"))]
+        return tuple(sorted((e.name, e.stat().st_size, e.stat().st_mtime_ns) for e in entries))
+    except OSError:
+        return None
+
+
+class _IndexState:
+    def __init__(self, index):
+        self.index = index
+        self.fingerprint = None
+        self.lock = threading.Lock()
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_bm25_index(vectorstore, persist_dir):
+    """
+    The BM25 index for the store persisted in `persist_dir`, loaded from
+    `<persist_dir>/bm25_index.json` and synced with the store. Only chunks
+    added or deleted since the last sync are (re)indexed, and the sync is
+    skipped while the store's files are unchanged, so calling this before
+    every query is cheap.
+    """
+    path = os.path.join(persist_dir, "bm25_index.json")
+    fingerprint = _store_fingerprint(persist_dir)
+    with _indexes_lock:
+        state = _indexes.get(path)
+        if state is None:
+            state = _indexes[path] = _IndexState(BM25Index.load(path))
+    if fingerprint is not None and fingerprint == state.fingerprint:
+        return state.index
+
+    with state.lock:
+        if fingerprint is not None and fingerprint == state.fingerprint:
+            return state.index
+        synced = sync_index(state.index, vectorstore)
+        if synced is None:
+            return None
+        added, removed = synced
+        if added or removed:
+            print(f"[INFO] BM25 index {path}: +{added} / -{removed} chunks "
+                  f"({len(state.index)} total)")
+            state.index.save(path)
+        # Taken before the sync: a write during it triggers another one
+        state.fingerprint = fingerprint
+    return state.index
+
+
+def reciprocal_rank_fusion(result_lists, k=None, weights=None):
+    """
+    Merges ranked Document lists: each document scores
+    sum(weight / (k + rank)) over the lists it appears in.
+    """
+    k = RETRIEVAL_RRF_K if k is None else k
+    weights = weights or [1.0] * len(result_lists)
+    scores, docs = defaultdict(float), {}
+    for weight, results in zip(weights, result_lists):
+        for rank, doc in enumerate(results, start=1):
+            key = doc_key(doc)
+            scores[key] += weight / (k + rank)
+            docs.setdefault(key, doc)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Runs BM25 keyword search and dense vector search concurrently and fuses
+    the two rankings with reciprocal rank fusion. Exact identifiers in a
+    question are found by BM25 even when the embedding misses them. With
+    `persist_dir` set, the index is re-synced before a query whenever the
+    store has changed, so chunks ingested later are found too.
+    """
+
+    vectorstore: Any
+    index: Any
+    persist_dir: Optional[str] = None
+    k: int = 5
+    fetch_k: int = RETRIEVAL_FETCH_K
+    rrf_k: int = RETRIEVAL_RRF_K
+    weights: List[float] = [1.0, 1.0]  # (keyword, dense)
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _keyword(self, query):
+        hits = self.index.search(query, self.fetch_k)
+        return self.index.documents([doc_id for doc_id, _ in hits])
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        if self.persist_dir:
+            self.index = get_bm25_index(self.vectorstore, self.persist_dir) or self.index
+        keyword = _pool.submit(self._keyword, query)
+        dense = _pool.submit(self.vectorstore.similarity_search, query, k=self.fetch_k)
+        fused = reciprocal_rank_fusion([keyword.result(), dense.result()],
+                                       k=self.rrf_k, weights=self.weights)
+        return fused[:self.k]
+
+
+def build_retriever(vectorstore, persist_dir, k=5):
+    """
+    Retriever for a vector store: hybrid BM25 + dense when RETRIEVAL_MODE is
+    "hybrid" and the store can be enumerated, plain similarity otherwise.
+    """
+    if RETRIEVAL_MODE == "hybrid":
+        index = get_bm25_index(vectorstore, persist_dir)
+        if index is not None:
+            return HybridRetriever(vectorstore=vectorstore, index=index, k=k,
+                                   persist_dir=persist_dir)
+        print("[WARN] Vector store cannot list its chunks; using dense retrieval only")
+    return vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": k})
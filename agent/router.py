@@ -0,0 +1,327 @@
+# agent/router.py
+
+import copy
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+
+from agent.scheduler import INTERACTIVE, SchedulerBusy, ScheduledModel, get_scheduler
+
+ROUTER_WINDOW = int(os.getenv("ROUTER_WINDOW", "100"))
+# 0 disables hedging; otherwise a second provider is tried when the first has
+# not answered after this many milliseconds
+ROUTER_HEDGE_AFTER_MS = float(os.getenv("ROUTER_HEDGE_AFTER_MS", "0"))
+ROUTER_FAILURE_THRESHOLD = int(os.getenv("ROUTER_FAILURE_THRESHOLD", "3"))
+ROUTER_COOLDOWN_SECONDS = float(os.getenv("ROUTER_COOLDOWN_SECONDS", "30"))
+ROUTER_MAX_ERROR_RATE = float(os.getenv("ROUTER_MAX_ERROR_RATE", "0.5"))
+
+
+class AllProvidersFailed(RuntimeError):
+    pass
+
+
+class ProviderHealth:
+    """
+    Rolling latency / error window and circuit breaker for one provider.
+    The circuit opens after `failure_threshold` consecutive failures and
+    lets a single trial request through once `cooldown` has elapsed.
+    """
+
+    def __init__(self, name, window=None, failure_threshold=None, cooldown=None):
+        self.name = name
+        self.latencies = deque(maxlen=window or ROUTER_WINDOW)
+        self.outcomes = deque(maxlen=window or ROUTER_WINDOW)
+        self.failure_threshold = failure_threshold or ROUTER_FAILURE_THRESHOLD
+        self.cooldown = ROUTER_COOLDOWN_SECONDS if cooldown is None else cooldown
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def percentile(self, q):
+        with self.lock:
+            ordered = sorted(self.latencies)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def error_rate(self):
+        with self.lock:
+            return (self.outcomes.count(False) / len(self.outcomes)) if self.outcomes else 0.0
+
+    def state(self):
+        with self.lock:
+            if self.open_until == 0.0:
+                return "closed"
+            return "open" if time.monotonic() < self.open_until else "half_open"
+
+    def acquire(self):
+        """True if a request may be sent now (closed, or the half-open trial)."""
+        with self.lock:
+            if self.open_until == 0.0:
+                return True
+            if time.monotonic() < self.open_until or self.trial_in_flight:
+                return False
+            self.trial_in_flight = True
+            return True
+
+    def release(self):
+        """Gives back an acquire() whose request never ran (cancelled or rejected)."""
+        with self.lock:
+            self.trial_in_flight = False
+
+    def record(self, ok, latency):
+        with self.lock:
+            self.outcomes.append(ok)
+            self.trial_in_flight = False
+            if ok:
+                self.latencies.append(latency)
+                self.consecutive_failures = 0
+                self.open_until = 0.0
+            else:
+                self.consecutive_failures += 1
+                if (self.consecutive_failures >= self.failure_threshold
+                        or self.open_until != 0.0):
+                    self.open_until = time.monotonic() + self.cooldown
+
+    def stats(self):
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        with self.lock:
+            samples = len(self.outcomes)
+        return {"state": self.state(), "samples": samples,
+                "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                "error_rate": round(self.error_rate(), 3),
+                "consecutive_failures": self.consecutive_failures}
+
+
+class LatencyRouter(Runnable):
+    """
+    Runnable that spreads calls over several providers: it sends each call to
+    the healthy provider with the lowest rolling p50 (providers without
+    samples are tried first so every backend gets measured), optionally
+    fires a hedged request at the next-best provider when the first one is
+    slow, and fails over when a provider errors.
+
+    Every backend call goes through that backend's own scheduler lane
+    (agent/scheduler.py), so LLM_MAX_CONCURRENCY_<PROVIDER> still caps each
+    real provider, hedges included; a losing hedge that is still queued is
+    cancelled. Latencies are measured from submission, so a saturated lane
+    ranks as slow.
+    """
+
+    # scheduled() hands this model its priority instead of wrapping it in a
+    # lane of its own
+    schedules_own_calls = True
+
+    def __init__(self, models, hedge_after_ms=None, priority=INTERACTIVE, scheduler=None):
+        self.models = dict(models)
+        self.health = {name: ProviderHealth(name) for name in self.models}
+        self.hedge_after_ms = ROUTER_HEDGE_AFTER_MS if hedge_after_ms is None else hedge_after_ms
+        self.priority = priority
+        self.scheduler = scheduler or get_scheduler()
+        # Updated from the caller threads of concurrent invokes
+        self._counters_lock = threading.Lock()
+        self.hedges_fired = 0
+        self.hedges_won = 0
+
+    def ranked(self):
+        """Provider names ordered best-first; unhealthy ones are left out."""
+        candidates = []
+        for name, health in self.health.items():
+            if health.state() == "open":
+                continue
+            if health.error_rate() > ROUTER_MAX_ERROR_RATE and health.state() == "closed" \
+                    and len(health.outcomes) >= 10:
+                continue
+            p50 = health.percentile(0.5)
+            candidates.append((p50 is not None, p50 or 0.0, name))
+        return [name for _, _, name in sorted(candidates)]
+
+    def with_priority(self, priority):
+        """This router (same providers, health and counters) at another priority."""
+        routed = copy.copy(self)
+        routed.priority = priority
+        return routed
+
+    def _backend(self, name):
+        return ScheduledModel(self.models[name], name, self.priority, self.scheduler)
+
+    def _submit(self, name, input, config, kwargs):
+        health = self.health[name]
+        started = time.perf_counter()
+        future = self.scheduler.submit(name, self.models[name], input, config,
+                                       self.priority, **kwargs)
+
+        def done(f):
+            if f.cancelled():
+                health.release()
+            else:
+                health.record(f.exception() is None, time.perf_counter() - started)
+
+        future.add_done_callback(done)
+        return future
+
+    def invoke(self, input, config=None, **kwargs):
+        errors = []
+        pending = {}
+        remaining = self.ranked()
+        launched = []
+        hedged = False
+
+        def launch():
+            # Next provider whose circuit lets a request through
+            while remaining:
+                name = remaining.pop(0)
+                if not self.health[name].acquire():
+                    continue
+                try:
+                    future = self._submit(name, input, config, kwargs)
+                except SchedulerBusy as e:
+                    self.health[name].release()
+                    errors.append(f"{name}: {e}")
+                    continue
+                launched.append(name)
+                pending[future] = name
+                return True
+            return False
+
+        if not launch():
+            raise AllProvidersFailed("No healthy LLM provider available")
+        while pending:
+            timeout = None
+            if self.hedge_after_ms and remaining and len(pending) == 1 and not errors:
+                timeout = self.hedge_after_ms / 1000
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # Primary is slow: race it against the next-best provider
+                if launch():
+                    hedged = True
+                    with self._counters_lock:
+                        self.hedges_fired += 1
+                continue
+
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append(f"{name}: {e}")
+                    print(f"[WARN] Provider {name} failed: {e}")
+                    if remaining and not pending:
+                        launch()
+                    continue
+                if hedged and name != launched[0]:
+                    with self._counters_lock:
+                        self.hedges_won += 1
+                for loser in pending:
+                    # Only possible while it is still queued in its lane
+                    loser.cancel()
+                return result
+
+        raise AllProvidersFailed("All LLM providers failed: " + "; ".join(errors))
+
+    def stream(self, input, config=None, **kwargs):
+        """Streams from the best provider, failing over to the next one only
+        while nothing has been yielded yet (no hedging)."""
+        errors = []
+        for name in self.ranked():
+            health = self.health[name]
+            if not health.acquire():
+                continue
+            started = time.perf_counter()
+            yielded = False
+            try:
+                for chunk in self._backend(name).stream(input, config, **kwargs):
+                    yielded = True
+                    yield chunk
+            except Exception as e:
+                health.record(False, time.perf_counter() - started)
+                if yielded:
+                    raise
+                errors.append(f"{name}: {e}")
+                continue
+            health.record(True, time.perf_counter() - started)
+            return
+        raise AllProvidersFailed("All LLM providers failed: " + "; ".join(errors))
+
+    async def astream(self, input, config=None, **kwargs):
+        errors = []
+        for name in self.ranked():
+            health = self.health[name]
+            if not health.acquire():
+                continue
+            started = time.perf_counter()
+            yielded = False
+            try:
+                async for chunk in self._backend(name).astream(input, config, **kwargs):
+                    yielded = True
+                    yield chunk
+            except Exception as e:
+                health.record(False, time.perf_counter() - started)
+                if yielded:
+                    raise
+                errors.append(f"{name}: {e}")
+                continue
+            health.record(True, time.perf_counter() - started)
+            return
+        raise AllProvidersFailed("All LLM providers failed: " + "; ".join(errors))
+
+    def stats(self):
+        with self._counters_lock:
+            fired, won = self.hedges_fired, self.hedges_won
+        return {"providers": {name: h.stats() for name, h in self.health.items()},
+                "ranking": self.ranked(), "hedges_fired": fired, "hedges_won": won}
+
+
+class SimulatedChatModel(BaseChatModel):
+    """
+    Offline stand-in provider: answers after `latency_ms` (+/- jitter) and
+    fails with probability `failure_rate`. Used for AI_PROVIDER=STUB and for
+    exercising the router without network access.
+    """
+
+    name: str = "stub"
+    latency_ms: float = 50.0
+    jitter_ms: float = 10.0
+    failure_rate: float = 0.0
+    reply: str = "This is a simulated answer."
+
+    @property
+    def _llm_type(self) -> str:
+        return "simulated-chat"
+
+    def _wait(self):
+        delay = max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms))
+        time.sleep(delay / 1000)
+        if random.random() < self.failure_rate:
+            raise RuntimeError(f"simulated failure from {self.name}")
+
+    def _generate(self, messages: List[Any], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        self._wait()
+        message = AIMessage(content=f"[{self.name}] {self.reply}")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[Any], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        # Latency until the first token, then one word at a time
+        self._wait()
+        words = f"[{self.name}] {self.reply}".split(" ")
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.latency_ms / 1000 / len(words))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=(" " if i else "") + word))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
@@ -0,0 +1,411 @@
+# agent/scheduler.py
+
+import asyncio
+import heapq
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from langchain_core.runnables import Runnable
+
+# Lower value = served first
+INTERACTIVE = 0
+BATCH = 10
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "64"))
+# Providers whose clients can answer several prompts in one call, e.g.
+# "TOGETHER,HUGGINGFACE". Requests for the same model are then grouped.
+LLM_BATCH_PROVIDERS = {p.strip().upper() for p in os.getenv(
+    "LLM_BATCH_PROVIDERS", "").split(",") if p.strip()}
+LLM_MAX_BATCH = int(os.getenv("LLM_MAX_BATCH", "8"))
+LLM_BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", "10"))
+# Chunks a stream may run ahead of its consumer before the producer waits
+LLM_STREAM_BUFFER = int(os.getenv("LLM_STREAM_BUFFER", "256"))
+
+_STREAM_END = object()
+_POLL_SECONDS = 0.1
+
+
+class SchedulerBusy(RuntimeError):
+    """Raised immediately when a provider's queue is full."""
+
+
+class _Job:
+    __slots__ = ("model", "input", "config", "kwargs", "future", "stream_queue",
+                 "cancelled", "enqueued")
+
+    def __init__(self, model, input, config, kwargs, stream=False):
+        self.model = model
+        self.input = input
+        self.config = config
+        self.kwargs = kwargs
+        self.future = Future()
+        self.stream_queue = queue.Queue(maxsize=LLM_STREAM_BUFFER) if stream else None
+        # Set when a stream's consumer goes away: the producer stops
+        self.cancelled = threading.Event()
+        self.enqueued = time.perf_counter()
+
+
+class _LoopQueue:
+    """
+    Bounded hand-off from a lane worker to a stream consumed on an asyncio
+    loop: chunks are delivered with call_soon_threadsafe, so the consumer
+    awaits them without holding an executor thread for the whole stream.
+    """
+
+    def __init__(self, loop, maxsize, cancelled):
+        self.loop = loop
+        self.items = asyncio.Queue()
+        self.slots = threading.Semaphore(maxsize)
+        self.cancelled = cancelled
+
+    def put(self, item, timeout=None):
+        if not self.slots.acquire(timeout=timeout):
+            raise queue.Full
+        try:
+            self.loop.call_soon_threadsafe(self.items.put_nowait, item)
+        except RuntimeError:
+            # The consumer's loop is closed: nobody will read this stream
+            self.cancelled.set()
+            raise queue.Full
+
+    async def get(self):
+        item = await self.items.get()
+        self.slots.release()
+        return item
+
+
+def _put_stream(job, item):
+    """Hands `item` to the stream's consumer; False once it has gone away."""
+    while not job.cancelled.is_set():
+        try:
+            job.stream_queue.put(item, timeout=_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+class _Samples:
+    """Recent latency samples with mean / p50 / p95."""
+
+    def __init__(self, size=1000):
+        self.values = deque(maxlen=size)
+
+    def add(self, value):
+        self.values.append(value)
+
+    def summary(self):
+        if not self.values:
+            return {"count": 0}
+        ordered = sorted(self.values)
+        pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+        return {"count": len(ordered),
+                "mean_ms": round(1000 * sum(ordered) / len(ordered), 1),
+                "p50_ms": round(1000 * pick(0.50), 1),
+                "p95_ms": round(1000 * pick(0.95), 1)}
+
+
+class _ProviderLane:
+    """Priority queue plus a fixed number of worker threads for one provider."""
+
+    def __init__(self, provider, concurrency, max_queue):
+        self.provider = provider
+        self.concurrency = concurrency
+        self.queue = queue.PriorityQueue(maxsize=max_queue)
+        # Items taken out while collecting a batch that did not fit back into
+        # the (refilled) queue; served before the queue
+        self._held = []
+        self.batching = provider in LLM_BATCH_PROVIDERS and LLM_MAX_BATCH > 1
+        self.lock = threading.Lock()
+        self.counters = {"submitted": 0, "rejected": 0, "completed": 0,
+                         "failed": 0, "cancelled": 0, "batches": 0, "in_flight": 0}
+        self.queue_wait = _Samples()
+        self.service_time = _Samples()
+        for i in range(concurrency):
+            threading.Thread(target=self._work, name=f"llm-{provider}-{i}",
+                             daemon=True).start()
+
+    def submit(self, priority, seq, job):
+        try:
+            self.queue.put_nowait((priority, seq, job))
+        except queue.Full:
+            with self.lock:
+                self.counters["rejected"] += 1
+            raise SchedulerBusy(
+                f"LLM queue for {self.provider} is full ({self.queue.maxsize} waiting)")
+        with self.lock:
+            self.counters["submitted"] += 1
+
+    def _collect_batch(self, first):
+        """Pulls further queued plain (non-stream) jobs for the same model."""
+        priority, _, job = first
+        batch = [job]
+        if not self.batching or job.stream_queue is not None:
+            return batch
+
+        deadline = time.perf_counter() + LLM_BATCH_WINDOW_MS / 1000
+        put_back = []
+        while len(batch) < LLM_MAX_BATCH:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            other = item[2]
+            if (other.model is job.model and other.stream_queue is None
+                    and other.kwargs == job.kwargs):
+                batch.append(other)
+            else:
+                put_back.append(item)
+        for item in put_back:
+            # Never block here: producers may have refilled the queue, and
+            # this worker is the one that would have to drain it
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                with self.lock:
+                    heapq.heappush(self._held, item)
+        return batch
+
+    def _next(self):
+        with self.lock:
+            if self._held:
+                return heapq.heappop(self._held)
+        return self.queue.get()
+
+    def _work(self):
+        while True:
+            batch = self._collect_batch(self._next())
+            runnable = []
+            for job in batch:
+                if job.cancelled.is_set():
+                    # A stream whose consumer left while it was queued
+                    job.future.cancel()
+                # False when the caller cancelled the future (e.g. a losing hedge)
+                if job.future.set_running_or_notify_cancel():
+                    runnable.append(job)
+            if len(runnable) < len(batch):
+                with self.lock:
+                    self.counters["cancelled"] += len(batch) - len(runnable)
+                batch = runnable
+                if not batch:
+                    continue
+            started = time.perf_counter()
+            for job in batch:
+                self.queue_wait.add(started - job.enqueued)
+            with self.lock:
+                self.counters["in_flight"] += len(batch)
+                self.counters["batches"] += len(batch) > 1
+
+            failed = False
+            try:
+                self._run(batch)
+            except Exception as e:
+                failed = True
+                for job in batch:
+                    if job.stream_queue is not None:
+                        _put_stream(job, e)
+                    if not job.future.done():
+                        job.future.set_exception(e)
+
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.counters["in_flight"] -= len(batch)
+                self.counters["failed" if failed else "completed"] += len(batch)
+            for _ in batch:
+                self.service_time.add(elapsed)
+
+    @staticmethod
+    def _run(batch):
+        job = batch[0]
+        if job.stream_queue is not None:
+            chunks = job.model.stream(job.input, job.config, **job.kwargs)
+            try:
+                for chunk in chunks:
+                    if not _put_stream(job, chunk):
+                        break  # consumer gone: stop generating
+                else:
+                    _put_stream(job, _STREAM_END)
+            finally:
+                if hasattr(chunks, "close"):
+                    chunks.close()
+            job.future.set_result(None)
+        elif len(batch) == 1:
+            job.future.set_result(job.model.invoke(job.input, job.config, **job.kwargs))
+        else:
+            results = job.model.batch([j.input for j in batch],
+                                      [j.config for j in batch], **job.kwargs)
+            for j, result in zip(batch, results):
+                j.future.set_result(result)
+
+    def stats(self):
+        with self.lock:
+            counters = dict(self.counters)
+        return {"concurrency": self.concurrency, "queued": self.queue.qsize(),
+                "max_queue": self.queue.maxsize, "micro_batching": self.batching,
+                **counters, "queue_wait": self.queue_wait.summary(),
+                "service_time": self.service_time.summary()}
+
+
+class LLMScheduler:
+    """
+    Routes every LLM call through per-provider lanes: at most N calls run
+    against a provider at once (LLM_MAX_CONCURRENCY, or
+    LLM_MAX_CONCURRENCY_<PROVIDER>), interactive requests are served before
+    batch work, and callers are rejected straight away with SchedulerBusy
+    when the lane's queue is full instead of piling up behind a saturated
+    backend.
+    """
+
+    def __init__(self):
+        self._lanes = {}
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+
+    def _lane(self, provider):
+        with self._lock:
+            lane = self._lanes.get(provider)
+            if lane is None:
+                concurrency = int(os.getenv(
+                    f"LLM_MAX_CONCURRENCY_{provider}", str(LLM_MAX_CONCURRENCY)))
+                lane = _ProviderLane(provider, concurrency, LLM_MAX_QUEUE)
+                self._lanes[provider] = lane
+            return lane
+
+    def submit(self, provider, model, input, config=None, priority=INTERACTIVE, **kwargs):
+        job = _Job(model, input, config, kwargs)
+        self._lane(provider).submit(priority, next(self._seq), job)
+        return job.future
+
+    def open_stream(self, provider, model, input, config=None, priority=INTERACTIVE,
+                    loop=None, **kwargs):
+        """Queues a streaming call; read it with next_chunk() (or await
+        job.stream_queue.get() when `loop` is given) and set job.cancelled if
+        the caller stops early."""
+        job = _Job(model, input, config, kwargs, stream=True)
+        if loop is not None:
+            job.stream_queue = _LoopQueue(loop, LLM_STREAM_BUFFER, job.cancelled)
+        self._lane(provider).submit(priority, next(self._seq), job)
+        return job
+
+    @staticmethod
+    def next_chunk(job):
+        """The next chunk of a stream, or _STREAM_END when it is finished or cancelled."""
+        while not job.cancelled.is_set():
+            try:
+                chunk = job.stream_queue.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+            if isinstance(chunk, Exception):
+                raise chunk
+            return chunk
+        return _STREAM_END
+
+    def stream(self, provider, model, input, config=None, priority=INTERACTIVE, **kwargs):
+        job = self.open_stream(provider, model, input, config, priority, **kwargs)
+        try:
+            while True:
+                chunk = self.next_chunk(job)
+                if chunk is _STREAM_END:
+                    return
+                yield chunk
+        finally:
+            # Also reached when the consumer abandons the generator
+            job.cancelled.set()
+
+    def stats(self):
+        with self._lock:
+            lanes = dict(self._lanes)
+        return {provider: lane.stats() for provider, lane in lanes.items()}
+
+
+_scheduler = LLMScheduler()
+
+
+def get_scheduler():
+    return _scheduler
+
+
+class ScheduledModel(Runnable):
+    """
+    Drop-in Runnable wrapper around a chat model / LLM that sends invoke,
+    batch and stream calls through the shared scheduler.
+    """
+
+    def __init__(self, model, provider, priority=INTERACTIVE, scheduler=None):
+        self.model = model
+        self.provider = provider
+        self.priority = priority
+        self.scheduler = scheduler or _scheduler
+
+    @property
+    def InputType(self):
+        return self.model.InputType
+
+    @property
+    def OutputType(self):
+        return self.model.OutputType
+
+    def invoke(self, input, config=None, **kwargs):
+        return self.scheduler.submit(self.provider, self.model, input, config,
+                                     self.priority, **kwargs).result()
+
+    def batch(self, inputs, config=None, *, return_exceptions=False, **kwargs):
+        configs = config if isinstance(config, list) else [config] * len(inputs)
+        futures = [self.scheduler.submit(self.provider, self.model, i, c,
+                                         self.priority, **kwargs)
+                   for i, c in zip(inputs, configs)]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+
+    def stream(self, input, config=None, **kwargs):
+        yield from self.scheduler.stream(self.provider, self.model, input, config,
+                                         self.priority, **kwargs)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        return await asyncio.wrap_future(self.scheduler.submit(
+            self.provider, self.model, input, config, self.priority, **kwargs))
+
+    async def astream(self, input, config=None, **kwargs):
+        job = self.scheduler.open_stream(self.provider, self.model, input, config,
+                                         self.priority, loop=asyncio.get_running_loop(),
+                                         **kwargs)
+        try:
+            while True:
+                chunk = await job.stream_queue.get()
+                if isinstance(chunk, Exception):
+                    raise chunk
+                if chunk is _STREAM_END:
+                    return
+                yield chunk
+        finally:
+            job.cancelled.set()
+
+
+def scheduled(model, priority=INTERACTIVE, provider=None):
+    """Wraps `model` so its calls go through the scheduler lane for `provider`
+    (default: the configured AI_PROVIDER)."""
+    if getattr(model, "schedules_own_calls", False):
+        # e.g. the LatencyRouter: each backend call already uses its own lane
+        return model.with_priority(priority)
+    provider = (provider or os.getenv("AI_PROVIDER", "OLLAMA")).upper()
+    return ScheduledModel(model, provider, priority)
+
+
+def scheduler_stats():
+    return _scheduler.stats()
@@ -0,0 +1,26 @@
+# agent/vectorstore.py
+
+import os
+
+# "chroma" (default) or "mmap" (agent/mmap_store.py). Pinecone is only
+# supported by ingest/embedder.py.
+VECTOR_STORE = os.getenv("VECTOR_STORE", "chroma").lower()
+
+
+def open_vectorstore(persist_dir, embeddings=None, quantization=None):
+    """
+    The configured local vector store persisted in `persist_dir`.
+    `quantization` ("none", "int8", "binary") applies to the mmap store only;
+    by default the store keeps whatever it was created with.
+    """
+    if embeddings is None:
+        from agent.embeddings import get_embeddings
+        embeddings = get_embeddings()
+
+    if VECTOR_STORE == "mmap":
+        from agent.mmap_store import MmapVectorStore
+        return MmapVectorStore(persist_directory=persist_dir, embedding_function=embeddings,
+                               quantization=quantization)
+
+    from langchain_community.vectorstores import Chroma
+    return Chroma(persist_directory=persist_dir, embedding_function=embeddings)
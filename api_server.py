@@ -0,0 +1,249 @@
+# api_server.py
+#
+# Async HTTP API for ingestion, document Q&A, code Q&A and web search.
+# Run with:  uvicorn api_server:app --workers 1
+
+import asyncio
+import json
+import os
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, File, Form, Header, HTTPException, UploadFile
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+from agent.scheduler import SchedulerBusy
+from ingest.jobs import JobQueueFull, get_job_queue, new_job_id
+
+# Blocking work (file parsing, embedding, sync LLM clients) runs on this pool
+API_WORKER_THREADS = int(os.getenv("API_WORKER_THREADS", "16"))
+# How many LLM generations may run at the same time (ingestion concurrency is
+# set by INGEST_JOB_WORKERS, see ingest/jobs.py)
+API_MAX_CONCURRENT_LLM = int(os.getenv("API_MAX_CONCURRENT_LLM", "8"))
+# Seconds a request may wait for a slot before getting a 503
+API_QUEUE_TIMEOUT = float(os.getenv("API_QUEUE_TIMEOUT", "30"))
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
+
+_USER_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+_executor = ThreadPoolExecutor(max_workers=API_WORKER_THREADS,
+                               thread_name_prefix="api-worker")
+_llm_slots = asyncio.Semaphore(API_MAX_CONCURRENT_LLM)
+
+
+@asynccontextmanager
+async def _lifespan(app):
+    yield
+    _executor.shutdown(wait=False)
+    get_job_queue().shutdown()
+
+
+app = FastAPI(title="Multi-model AI API", lifespan=_lifespan)
+
+
+@app.exception_handler(SchedulerBusy)
+async def _scheduler_busy(request, exc):
+    # The LLM scheduler's queue for this provider is full: shed load early
+    return JSONResponse({"detail": str(exc)}, status_code=503)
+
+
+@app.exception_handler(JobQueueFull)
+async def _ingest_queue_full(request, exc):
+    return JSONResponse({"detail": str(exc)}, status_code=503)
+
+
+class AskRequest(BaseModel):
+    question: str
+    user_id: str | None = None
+
+
+class SearchRequest(BaseModel):
+    query: str
+    max_results: int = 5
+
+
+def _resolve_user_id(body_user_id, header_user_id):
+    user_id = body_user_id or header_user_id
+    if not user_id:
+        raise HTTPException(400, "user_id is required (body field or X-User-Id header)")
+    # The user id becomes part of a filesystem path, so keep it boring
+    if not _USER_ID_RE.match(user_id):
+        raise HTTPException(400, "user_id may only contain letters, digits, '_' and '-'")
+    return user_id
+
+
+async def run_blocking(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+
+
+class _Slot:
+    """async with _Slot(sem): waits up to API_QUEUE_TIMEOUT, then 503."""
+
+    def __init__(self, semaphore):
+        self.semaphore = semaphore
+
+    async def __aenter__(self):
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), API_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HTTPException(503, "Server is busy, try again shortly")
+
+    async def __aexit__(self, *exc):
+        self.semaphore.release()
+
+
+def _sse(tokens):
+    """Wraps an async iterator of text tokens as a server-sent event stream."""
+    async def events():
+        try:
+            async for token in tokens:
+                if token:
+                    yield f"data: {json.dumps({'token': token})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+async def _limited(tokens, semaphore):
+    # Hold an LLM slot for the whole generation, not just the first token
+    async with _Slot(semaphore):
+        async for token in tokens:
+            yield token
+
+
+_code_chain = None
+
+
+async def _get_code_chain():
+    global _code_chain
+    if _code_chain is None:
+        # Building the chain loads the model and vector store: keep it off
+        # the event loop.
+        from code_assistant import get_chain
+        _code_chain = await run_blocking(get_chain)
+    return _code_chain
+
+
+# --- Ingestion --------------------------------------------------------------
+
+@app.post("/ingest", status_code=202)
+async def ingest(file: UploadFile = File(...), user_id: str | None = Form(None),
+                 x_user_id: str | None = Header(None)):
+    """Saves the upload and queues its ingestion; poll /ingest/{job_id}."""
+    user_id = _resolve_user_id(user_id, x_user_id)
+    filename = os.path.basename(file.filename or "")
+    if not filename.endswith((".pdf", ".txt")):
+        raise HTTPException(400, "Only .pdf and .txt files are supported")
+
+    # Saved per job, so concurrent uploads of the same name cannot overwrite
+    # each other before their ingestion runs
+    job_id = new_job_id()
+    user_dir = os.path.join(UPLOAD_DIR, user_id)
+    os.makedirs(user_dir, exist_ok=True)
+    path = os.path.join(user_dir, f"{job_id}_{filename}")
+    await run_blocking(_save_upload, file.file, path)
+
+    from tools.upload_and_ingest import submit_ingest_file
+    try:
+        job = submit_ingest_file(path, user_id, job_id=job_id)
+    except JobQueueFull:
+        os.remove(path)
+        raise
+    return {"user_id": user_id, "file": filename, **job.status()}
+
+
+@app.get("/ingest/{job_id}")
+async def ingest_status(job_id: str):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(404, "Unknown ingestion job")
+    return job.status()
+
+
+@app.delete("/ingest/{job_id}")
+async def ingest_cancel(job_id: str):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(404, "Unknown ingestion job")
+    if not get_job_queue().cancel(job_id):
+        raise HTTPException(409, "Job is already finished")
+    return job.status()
+
+
+def _save_upload(source, path):
+    with open(path, "wb") as out:
+        shutil.copyfileobj(source, out)
+
+
+# --- Document Q&A -----------------------------------------------------------
+
+@app.post("/ask/doc")
+async def ask_doc(request: AskRequest, x_user_id: str | None = Header(None)):
+    user_id = _resolve_user_id(request.user_id, x_user_id)
+    from tools.chat_with_uploaded_docs import ask_question_from_uploaded_doc
+
+    async with _Slot(_llm_slots):
+        answer = await run_blocking(ask_question_from_uploaded_doc, request.question, user_id)
+    return {"user_id": user_id, "answer": answer}
+
+
+@app.post("/ask/doc/stream")
+async def ask_doc_stream(request: AskRequest, x_user_id: str | None = Header(None)):
+    user_id = _resolve_user_id(request.user_id, x_user_id)
+    from tools.chat_with_uploaded_docs import astream_answer
+
+    # Looks up / fills the response cache, which .astream() alone skips
+    return _sse(_limited(astream_answer(request.question, user_id), _llm_slots))
+
+
+# --- Code Q&A ---------------------------------------------------------------
+
+@app.post("/ask/code")
+async def ask_code(request: AskRequest):
+    chain = await _get_code_chain()
+    async with _Slot(_llm_slots):
+        answer = await chain.ainvoke(request.question)
+    return {"answer": answer}
+
+
+@app.post("/ask/code/stream")
+async def ask_code_stream(request: AskRequest):
+    chain = await _get_code_chain()
+    return _sse(_limited(chain.astream(request.question), _llm_slots))
+
+
+# --- Web search + summarize -------------------------------------------------
+
+@app.post("/search")
+async def search(request: SearchRequest):
+    from tools.web_search import duckduckgo_search
+    from tools.refine_with_llm import summarize_search_results
+
+    results = await run_blocking(duckduckgo_search, request.query, request.max_results)
+    async with _Slot(_llm_slots):
+        answer = await run_blocking(summarize_search_results, results, request.query)
+    return {"query": request.query, "answer": answer}
+
+
+@app.post("/search/stream")
+async def search_stream(request: SearchRequest):
+    from tools.web_search import duckduckgo_search
+    from tools.refine_with_llm import astream_summary
+
+    results = await run_blocking(duckduckgo_search, request.query, request.max_results)
+    return _sse(_limited(astream_summary(results, request.query), _llm_slots))
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host=os.getenv("API_HOST", "127.0.0.1"), port=int(os.getenv("API_PORT", "8000")))
@@ -0,0 +1,83 @@
+# benchmarks/bench_discovery.py
+#
+# Compares the old per-extension DirectoryLoader-style globbing against the
+# single-pass walker in ingest/discovery.py on a synthetic tree.
+#
+#   python -m benchmarks.bench_discovery --files 100000
+
+import argparse
+import glob
+import os
+import shutil
+import tempfile
+import time
+
+from ingest.discovery import IgnoreMatcher, iter_documents, walk_files
+
+EXTENSIONS = (".py", ".txt", ".md", ".ipynb")
+IGNORE_PATTERNS = ["venv/", "__pycache__/", ".git/", "node_modules/", "*.pyc"]
+
+
+def build_tree(root, n_files, files_per_dir=50):
+    """Creates n_files small files spread over nested directories, plus some
+    ignored directories that a correct walker must not descend into."""
+    exts = EXTENSIONS[:3] + (".pyc", ".json")
+    for i in range(n_files):
+        d = os.path.join(root, f"pkg{i // (files_per_dir * 20)}",
+                         f"mod{(i // files_per_dir) % 20}")
+        if i % files_per_dir == 0:
+            os.makedirs(d, exist_ok=True)
+        with open(os.path.join(d, f"f{i}{exts[i % len(exts)]}"), "w") as f:
+            f.write(f"# file {i}\nvalue = {i}\n")
+
+    for ignored in ("venv/lib", "node_modules/x", "pkg0/__pycache__"):
+        d = os.path.join(root, ignored)
+        os.makedirs(d, exist_ok=True)
+        for i in range(200):
+            with open(os.path.join(d, f"junk{i}.py"), "w") as f:
+                f.write("x = 1\n")
+
+
+def old_discovery(root):
+    # DirectoryLoader does one recursive glob per extension
+    found = []
+    for ext in EXTENSIONS:
+        found.extend(glob.glob(os.path.join(root, f"**/*{ext}"), recursive=True))
+    return found
+
+
+def timed(label, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<40} {elapsed:8.2f}s  ({len(result)} items)")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--keep", action="store_true",
+                        help="keep the synthetic tree instead of deleting it")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench_discovery_")
+    try:
+        print(f"[INFO] Building synthetic tree with {args.files} files in {root}...")
+        build_tree(root, args.files)
+
+        ignore = IgnoreMatcher(IGNORE_PATTERNS)
+        timed("4x recursive glob (old)", lambda: old_discovery(root))
+        timed("single-pass walk_files", lambda: list(walk_files(root, EXTENSIONS, ignore)))
+        timed("iter_documents, 1 worker",
+              lambda: list(iter_documents(root, EXTENSIONS, ignore, max_workers=1)))
+        timed(f"iter_documents, {args.workers or 'default'} workers",
+              lambda: list(iter_documents(root, EXTENSIONS, ignore, max_workers=args.workers)))
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_file_editor.py
+#
+# Output tokens an agent has to generate for a one-line change, per edit
+# primitive, on copies of this repo's Python files:
+#
+#   write_file   the whole new file
+#   edit_file    search/replace with one line of context on each side
+#   apply_patch  a unified diff with three lines of context
+#
+# Every edit is applied to a temp copy and checked against the expected
+# result, so the numbers only count edits that actually work.
+#
+#   python -m benchmarks.bench_file_editor --edits 200
+
+import argparse
+import difflib
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from agent.prompt_builder import estimate_tokens
+from tools import file_editor
+from tools.file_editor import apply_patch, replace_in_file, write_text
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--edits", type=int, default=200)
+    args = parser.parse_args()
+
+    sources = [os.path.join(d, f) for d in (".", "agent", "tools", "ingest")
+               for f in os.listdir(d) if f.endswith(".py")]
+    rng = random.Random(0)
+    workdir = tempfile.mkdtemp(prefix="bench_edit_")
+    file_editor.EDIT_JOURNAL_DIR = os.path.join(workdir, ".journal")
+    tokens = {"write_file": [], "edit_file": [], "apply_patch": []}
+    elapsed = {name: 0.0 for name in tokens}
+    try:
+        for _ in range(args.edits):
+            source = rng.choice(sources)
+            with open(source, encoding="utf-8") as f:
+                lines = f.read().splitlines(keepends=True)
+            candidates = [i for i in range(1, len(lines) - 1) if lines[i].strip()]
+            if not candidates:
+                continue
+            i = rng.choice(candidates)
+            edited = list(lines)
+            edited[i] = lines[i].rstrip("\n") + "  # edited\n"
+            before, after = "".join(lines), "".join(edited)
+            path = os.path.join(workdir, "file.py")
+
+            search, replace = "".join(lines[i - 1:i + 2]), "".join(edited[i - 1:i + 2])
+            diff = "".join(difflib.unified_diff(lines, edited, "a/file.py", "b/file.py"))
+            for name, arguments, apply in (
+                    ("write_file", after, lambda: write_text(path, after)),
+                    ("edit_file", search + replace,
+                     lambda: replace_in_file(path, search, replace, replace_all=True)),
+                    ("apply_patch", diff, lambda: apply_patch(diff, root=workdir))):
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(before)
+                started = time.perf_counter()
+                apply()
+                elapsed[name] += time.perf_counter() - started
+                with open(path, encoding="utf-8") as f:
+                    assert f.read() == after, f"{name} produced the wrong file"
+                tokens[name].append(estimate_tokens(arguments))
+    finally:
+        shutil.rmtree(workdir)
+
+    print(f"{len(tokens['write_file'])} one-line edits on {len(sources)} files\n")
+    for name, values in tokens.items():
+        print(f"{name:<12} mean {statistics.mean(values):7.0f} output tokens   "
+              f"p95 {sorted(values)[int(0.95 * len(values))]:6d}   "
+              f"apply {1000 * elapsed[name] / len(values):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/bench_file_tools.py
+#
+# Tokens the agent file tools put into the scratchpad for a scripted agent
+# task, before and after ranged/cached reads and bounded listings. The task
+# replays what tool-calling agents typically do on this repo: list the
+# tree, read the largest modules, come back to one of them, then read a
+# specific region of it.
+#
+#   python -m benchmarks.bench_file_tools --files 4 --revisits 2
+
+import argparse
+import os
+import time
+
+from agent.prompt_builder import estimate_tokens
+from tools.file_access import list_tree, read_session, read_text
+
+
+def old_list(directory):
+    return "\n".join(os.listdir(directory))
+
+
+def old_read(path, start_line=None, end_line=None):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def new_list(directory):
+    return list_tree(directory, depth=2)
+
+
+def new_read(path, start_line=None, end_line=None):
+    return read_text(path, start_line=start_line, end_line=end_line)
+
+
+def task(list_fn, read_fn, files, revisits):
+    outputs = [list_fn("."), list_fn("agent")]
+    for path in files:
+        outputs.append(read_fn(path))
+    for _ in range(revisits):
+        outputs.append(read_fn(files[0]))
+        outputs.append(read_fn(files[0], start_line=40, end_line=80))
+    return outputs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--revisits", type=int, default=2)
+    args = parser.parse_args()
+
+    sources = [os.path.join(d, f) for d in (".", "agent", "tools", "ingest")
+               for f in os.listdir(d) if f.endswith(".py")]
+    files = sorted(sources, key=os.path.getsize, reverse=True)[:args.files]
+    print(f"files: {', '.join(files)}\n")
+
+    for label, list_fn, read_fn in (("before", old_list, old_read), ("after", new_list, new_read)):
+        started = time.perf_counter()
+        with read_session(label):
+            outputs = task(list_fn, read_fn, files, args.revisits)
+        elapsed = time.perf_counter() - started
+        tokens = sum(estimate_tokens(o) for o in outputs)
+        largest = max(estimate_tokens(o) for o in outputs)
+        print(f"{label:<7} {tokens:7d} tokens per task   largest result {largest:6d}   "
+              f"{1000 * elapsed:.1f} ms\n")
+
+
+if __name__ == "__main__":
+    main()
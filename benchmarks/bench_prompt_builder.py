@@ -0,0 +1,76 @@
+# benchmarks/bench_prompt_builder.py
+#
+# Prompt context size before and after agent/prompt_builder on this repo's
+# own code. The tree is chunked both ways ingest_codebase.py can (AST chunks
+# and 1000/100 overlapping text splits), BM25 retrieves the top k chunks
+# for "explain <symbol>" questions, and the context is rendered three ways:
+#
+#   repr    str(list of Documents), what the code chain used to send
+#   joined  page_content joined with blank lines, what the doc chain sent
+#   packed  build_context: deduplicated, merged, budgeted
+#
+#   python -m benchmarks.bench_prompt_builder --k 8 --budget 3000
+
+import argparse
+import random
+import statistics
+import time
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from agent.prompt_builder import estimate_tokens, pack_context
+from agent.retriever import BM25Index
+from ingest.code_chunker import chunk_python
+from ingest_codebase import discover_files, load_file
+
+
+def chunks(mode):
+    splitter = RecursiveCharacterTextSplitter.from_language(
+        language="python", chunk_size=1000, chunk_overlap=100)
+    docs = []
+    for file_path in discover_files():
+        if not file_path.endswith(".py"):
+            continue
+        documents = load_file(file_path)
+        split = chunk_python(documents[0].page_content, file_path) if mode == "ast" else None
+        docs.extend(split if split is not None else splitter.split_documents(documents))
+    return docs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--budget", type=int, default=3000)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    for mode in ("ast", "text"):
+        docs = chunks(mode)
+        index = BM25Index()
+        index.add([str(i) for i in range(len(docs))], [d.page_content for d in docs],
+                  [d.metadata for d in docs])
+        names = sorted({d.metadata["qualname"] for d in chunks("ast") if "qualname" in d.metadata})
+        queries = [f"explain {name}" for name in random.Random(0).sample(names, min(args.queries, len(names)))]
+
+        sizes = {"repr": [], "joined": [], "packed": []}
+        blocks, elapsed = [], 0.0
+        for query in queries:
+            results = index.documents([i for i, _ in index.search(query, args.k)])
+            sizes["repr"].append(estimate_tokens(str(results)))
+            sizes["joined"].append(estimate_tokens("\n\n".join(d.page_content for d in results)))
+            started = time.perf_counter()
+            context, stats = pack_context(results, budget=args.budget)
+            elapsed += time.perf_counter() - started
+            sizes["packed"].append(stats["tokens"])
+            blocks.append(stats["blocks"] / max(1, stats["chunks"]))
+
+        print(f"{mode} chunks ({len(docs)}), top {args.k}, budget {args.budget}:")
+        for label, values in sizes.items():
+            print(f"  {label:<7} mean {statistics.mean(values):7.0f} tokens   "
+                  f"max {max(values):6d}")
+        print(f"  merge   {statistics.mean(blocks):.0%} blocks per chunk, "
+              f"{1000 * elapsed / len(queries):.2f} ms per context\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/bench_quantization.py
+#
+# Builds the memory-mapped store with each quantization mode over the same
+# synthetic clustered embeddings and reports the bytes a search has to scan,
+# recall@k against exact float32 search, and query latency.
+#
+#   python -m benchmarks.bench_quantization --vectors 100000 --dim 384
+
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.embeddings import FakeEmbeddings
+
+from agent.mmap_store import MmapVectorStore
+
+
+def clustered(n, dim, clusters, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    data = centers[rng.integers(0, clusters, n)] + 0.6 * rng.normal(size=(n, dim))
+    data = data.astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+
+def run(mode, data, queries, truth, k, args):
+    path = tempfile.mkdtemp(prefix=f"bench_quant_{mode}_")
+    try:
+        store = MmapVectorStore(path, FakeEmbeddings(size=data.shape[1]), quantization=mode,
+                                nprobe=args.nprobe, min_ivf_rows=args.ivf_min_rows,
+                                rerank_factor=args.rerank_factor or None)
+        started = time.perf_counter()
+        for start in range(0, len(data), 5000):
+            block = data[start:start + 5000]
+            store.add_embeddings([(str(start + i), v) for i, v in enumerate(block)],
+                                 ids=[str(start + i) for i in range(len(block))])
+        build = time.perf_counter() - started
+
+        latencies, hits = [], 0
+        for query, expected in zip(queries, truth):
+            started = time.perf_counter()
+            found = store.similarity_search_by_vector(query, k=k)
+            latencies.append(time.perf_counter() - started)
+            hits += len(expected & {int(doc.page_content) for doc in found})
+
+        stats = store.stats()
+        ordered = sorted(latencies)
+        float32_bytes = stats["rows"] * data.shape[1] * 4
+        rerank = f"x{store.rerank_factor}" if mode != "none" else "-"
+        print(f"{mode:<7} rerank {rerank:<4} scan {stats['scan_bytes'] / 2**20:8.1f} MiB "
+              f"({float32_bytes / stats['scan_bytes']:5.1f}x smaller than float32)   "
+              f"recall@{k} {hits / (k * len(queries)):6.1%}   "
+              f"p50 {1000 * ordered[len(ordered) // 2]:6.2f} ms   "
+              f"p95 {1000 * ordered[int(0.95 * len(ordered))]:6.2f} ms   build {build:5.1f}s")
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--rerank-factor", type=int, default=0,
+                        help="0: the store's per-mode default")
+    parser.add_argument("--ivf-min-rows", type=int, default=10**12,
+                        help="default: exact scan, to isolate the effect of quantization")
+    args = parser.parse_args()
+
+    data = clustered(args.vectors, args.dim, clusters=max(16, args.vectors // 500))
+    rng = np.random.default_rng(1)
+    queries = data[rng.integers(0, len(data), args.queries)] + 0.05 * rng.normal(
+        size=(args.queries, args.dim)).astype(np.float32)
+    truth = [set(np.argsort(-(data @ q))[:args.k].tolist()) for q in queries]
+
+    print(f"{args.vectors} vectors x {args.dim} dims, k={args.k}\n")
+    for mode in ("none", "int8", "binary"):
+        run(mode, data, queries, truth, args.k, args)
+
+
+if __name__ == "__main__":
+    main()
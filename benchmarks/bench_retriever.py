@@ -0,0 +1,148 @@
+# benchmarks/bench_retriever.py
+#
+# Dense-only vs hybrid (BM25 + dense, RRF) retrieval on a synthetic code
+# corpus. Each query names one function by identifier, e.g. "where is
+# load_user_cache_42 defined?", and recall@k counts how often that
+# function's chunk comes back.
+#
+# Without --real-embeddings the dense side uses hashed character trigrams,
+# which needs no model download; with it, the configured embedding model is
+# used (EMBEDDING_MODEL).
+#
+#   python -m benchmarks.bench_retriever --chunks 20000 --queries 200
+
+import argparse
+import random
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from agent.retriever import BM25Index, HybridRetriever
+
+VERBS = ["load", "save", "parse", "build", "fetch", "update", "delete", "render",
+         "validate", "compute", "merge", "split", "encode", "decode", "sync"]
+NOUNS = ["user", "config", "cache", "session", "index", "token", "chunk", "report",
+         "payload", "schema", "route", "job", "model", "prompt", "vector"]
+
+
+class TrigramEmbeddings(Embeddings):
+    """Offline stand-in for a dense model: hashed character trigram counts."""
+
+    def __init__(self, size=256):
+        self.size = size
+
+    def _embed(self, text):
+        vector = np.zeros(self.size, dtype=np.float32)
+        text = text.lower()
+        for i in range(len(text) - 2):
+            vector[hash(text[i:i + 3]) % self.size] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class MatrixStore(VectorStore):
+    """Brute-force cosine search over an in-memory matrix."""
+
+    def __init__(self, embedding, docs=()):
+        self.embedding = embedding
+        self.docs = []
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.add_documents(list(docs))
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        vectors = np.asarray(self.embedding.embed_documents(texts), dtype=np.float32)
+        self.matrix = np.vstack([self.matrix, vectors]) if len(self.docs) else vectors
+        self.docs += [Document(page_content=t, metadata=m) for t, m in zip(texts, metadatas)]
+        return [str(i) for i in range(len(self.docs) - len(texts), len(self.docs))]
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        store = cls(embedding)
+        store.add_texts(texts, metadatas)
+        return store
+
+    def similarity_search(self, query, k=4, **kwargs):
+        scores = self.matrix @ np.asarray(self.embedding.embed_query(query), dtype=np.float32)
+        top = np.argpartition(-scores, min(k, len(scores) - 1))[:k]
+        return [self.docs[i] for i in top[np.argsort(-scores[top])]]
+
+
+def corpus(n, seed=0):
+    rng = random.Random(seed)
+    docs = []
+    for i in range(n):
+        verb, noun, other = rng.choice(VERBS), rng.choice(NOUNS), rng.choice(NOUNS)
+        name = f"{verb}_{noun}_{other}_{i}"
+        body = (f"def {name}(self, {noun}, {other}=None):\n"
+                f"    \"\"\"{verb.capitalize()} the {noun} using the {other}.\"\"\"\n"
+                f"    result = self.{rng.choice(VERBS)}_{noun}({noun})\n"
+                f"    return self.{rng.choice(VERBS)}_{other}(result)\n")
+        docs.append(Document(page_content=body, metadata={"source": f"mod_{i % 97}.py",
+                                                          "name": name}))
+    return docs
+
+
+def evaluate(label, retrieve, queries):
+    hits, latencies = 0, []
+    for query, name in queries:
+        started = time.perf_counter()
+        results = retrieve(query)
+        latencies.append(time.perf_counter() - started)
+        hits += any(d.metadata.get("name") == name for d in results)
+    ordered = sorted(latencies)
+    pick = lambda q: 1000 * ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    print(f"{label:<12} recall@k {hits / len(queries):6.1%}   "
+          f"p50 {pick(0.5):7.2f} ms   p95 {pick(0.95):7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--real-embeddings", action="store_true")
+    args = parser.parse_args()
+
+    if args.real_embeddings:
+        from agent.embeddings import get_embeddings
+        embedding = get_embeddings()
+    else:
+        embedding = TrigramEmbeddings()
+
+    docs = corpus(args.chunks)
+    started = time.perf_counter()
+    store = MatrixStore(embedding, docs)
+    print(f"embedded {len(docs)} chunks in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    index = BM25Index()
+    index.add([str(i) for i in range(len(docs))], [d.page_content for d in docs],
+              [d.metadata for d in docs])
+    print(f"built BM25 index in {time.perf_counter() - started:.2f}s\n")
+
+    rng = random.Random(1)
+    templates = ["where is {} defined?", "what does {} do", "explain {}"]
+    queries = []
+    for doc in rng.sample(docs, args.queries):
+        name = doc.metadata["name"]
+        queries.append((rng.choice(templates).format(name), name))
+
+    hybrid = HybridRetriever(vectorstore=store, index=index, k=args.k)
+    evaluate("dense", lambda q: store.similarity_search(q, k=args.k), queries)
+    evaluate("bm25", lambda q: index.documents([i for i, _ in index.search(q, args.k)]), queries)
+    evaluate("hybrid", hybrid.invoke, queries)
+
+
+if __name__ == "__main__":
+    main()
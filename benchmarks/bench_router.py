@@ -0,0 +1,84 @@
+# benchmarks/bench_router.py
+#
+# Offline exercise of the latency-aware router with simulated providers: a
+# fast one with a slow tail, a steady medium one and one that starts failing
+# half-way through. Prints where calls went and the latency with and without
+# hedging.
+#
+#   python -m benchmarks.bench_router --requests 300
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agent.router import LatencyRouter, SimulatedChatModel
+
+
+class TailLatencyModel(SimulatedChatModel):
+    """Usually fast, but every `tail_every`-th call takes `tail_ms`."""
+
+    tail_every: int = 10
+    tail_ms: float = 800.0
+    calls: int = 0
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        if self.calls % self.tail_every == 0:
+            time.sleep(self.tail_ms / 1000)
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+
+def providers():
+    return {
+        "FAST": TailLatencyModel(name="FAST", latency_ms=40, jitter_ms=10),
+        "MEDIUM": SimulatedChatModel(name="MEDIUM", latency_ms=120, jitter_ms=20),
+        "FLAKY": SimulatedChatModel(name="FLAKY", latency_ms=30, jitter_ms=5),
+    }
+
+
+def run(label, router, n, concurrency):
+    latencies, served = [], {}
+
+    def one(i):
+        if i == n // 2:
+            # The flaky backend goes down half-way through the run
+            router.models["FLAKY"].failure_rate = 1.0
+        started = time.perf_counter()
+        try:
+            answer = router.invoke(f"question {i}").content
+            name = answer.split("]")[0].strip("[")
+        except Exception:
+            name = "ERROR"
+        latencies.append(time.perf_counter() - started)
+        served[name] = served.get(name, 0) + 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(n)))
+
+    ordered = sorted(latencies)
+    pick = lambda q: 1000 * ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    print(f"\n== {label}")
+    print(f"p50 {pick(0.5):7.1f} ms   p95 {pick(0.95):7.1f} ms   p99 {pick(0.99):7.1f} ms")
+    print(f"served by: {served}")
+    stats = router.stats()
+    print(f"hedges fired/won: {stats['hedges_fired']}/{stats['hedges_won']}")
+    for name, health in stats["providers"].items():
+        print(f"  {name:<7} {health}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--hedge-after-ms", type=float, default=150)
+    args = parser.parse_args()
+
+    run("no hedging", LatencyRouter(providers(), hedge_after_ms=0),
+        args.requests, args.concurrency)
+    run(f"hedging after {args.hedge_after_ms:.0f} ms",
+        LatencyRouter(providers(), hedge_after_ms=args.hedge_after_ms),
+        args.requests, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
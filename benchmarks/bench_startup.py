@@ -0,0 +1,89 @@
+# benchmarks/bench_startup.py
+#
+# Starts cursor_devagent in a fresh interpreter, measures how long it takes
+# to show its input prompt and checks that no LLM client, embedding model or
+# vector store was loaded on the way. Exits non-zero when the budget is
+# exceeded or something heavy was imported.
+#
+#   python -m benchmarks.bench_startup --budget 2.0 --runs 5
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+# Modules that mean a model / client / store was initialized eagerly
+HEAVY_MODULES = [
+    "agent.llm_manager", "agent.embeddings", "code_assistant",
+    "tools.chat_with_uploaded_docs", "langchain.agents", "langchain.hub",
+    "chromadb", "sentence_transformers", "torch", "langchain_openai",
+    "langchain_google_genai", "langchain_huggingface",
+]
+
+PROMPT = "➡️  You:"
+
+# Runs inside the child: start the agent's main loop, then report what got
+# imported once it asks for input.
+_CHILD = """
+import builtins, json, sys
+def fake_input(prompt=""):
+    print(prompt, flush=True)
+    loaded = [m for m in {heavy!r} if m in sys.modules]
+    print("LOADED " + json.dumps(loaded), flush=True)
+    raise KeyboardInterrupt
+builtins.input = fake_input
+import cursor_devagent
+cursor_devagent.main()
+"""
+
+
+def start_once():
+    """Seconds until the prompt appears, and the heavy modules loaded by then."""
+    code = _CHILD.format(heavy=HEAVY_MODULES)
+    env = dict(os.environ, PYTHONIOENCODING="utf-8")
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL, text=True, encoding="utf-8",
+                            env=env)
+    elapsed, loaded = None, None
+    for line in proc.stdout:
+        if elapsed is None and PROMPT in line:
+            elapsed = time.perf_counter() - started
+        if line.startswith("LOADED "):
+            loaded = line[len("LOADED "):].strip()
+    proc.wait()
+    if elapsed is None:
+        raise RuntimeError("cursor_devagent never showed its prompt")
+    return elapsed, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget", type=float, default=2.0,
+                        help="max seconds until the prompt is shown")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    timings, failures = [], []
+    for i in range(args.runs):
+        elapsed, loaded = start_once()
+        timings.append(elapsed)
+        print(f"run {i + 1}: prompt after {elapsed:.3f}s, heavy modules loaded: {loaded}")
+        if loaded != "[]":
+            failures.append(f"run {i + 1} loaded {loaded}")
+
+    best, worst = min(timings), max(timings)
+    print(f"\nbest {best:.3f}s   median {sorted(timings)[len(timings) // 2]:.3f}s   "
+          f"worst {worst:.3f}s   budget {args.budget:.3f}s")
+    if worst > args.budget:
+        failures.append(f"startup took {worst:.3f}s (budget {args.budget:.3f}s)")
+
+    if failures:
+        print("[FAIL] " + "; ".join(failures))
+        sys.exit(1)
+    print("[✅] cursor_devagent starts within budget without loading any model")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# benchmarks/bench_summarize.py
+#
+# One stuffed prompt vs map-reduce summarization of a large search result
+# set, against a simulated model whose latency grows with the prompt
+# (prefill) and with every generated token (decode), and which has a fixed
+# context window:
+#
+#   stuffed     everything in one prompt (the old summarize_search_results)
+#   map-reduce  cold partial-summary cache
+#   warm        the same results for a different question: every partial
+#               summary comes from the LLM response cache, only the final
+#               answer runs
+#
+# Time to first token is measured on the streamed final answer.
+#
+#   python -m benchmarks.bench_summarize --results 40 --context 8000
+
+import argparse
+import os
+import tempfile
+import time
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from agent.llm_cache import ResponseCache
+from agent.prompt_builder import estimate_tokens
+from tools import refine_with_llm
+from tools.refine_with_llm import build_summary_prompt, summary_budgets
+
+
+class TimedModel(BaseChatModel):
+    """Sleeps prefill_ms per prompt token, then decode_ms per output token."""
+
+    prefill_ms: float = 0.5
+    decode_ms: float = 15.0
+    map_tokens: int = 80
+    answer_tokens: int = 250
+    context: int = 8000
+
+    @property
+    def _llm_type(self) -> str:
+        return "timed-simulation"
+
+    def _plan(self, messages):
+        prompt = "\n".join(str(m.content) for m in messages)
+        tokens = estimate_tokens(prompt)
+        if tokens > self.context:
+            raise ValueError(f"prompt of {tokens} tokens exceeds the {self.context} token context")
+        time.sleep(tokens * self.prefill_ms / 1000)
+        final = "Your answer:" in prompt
+        return self.answer_tokens if final else self.map_tokens
+
+    def _generate(self, messages: List[Any], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        count = self._plan(messages)
+        time.sleep(count * self.decode_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="- fact" * count))])
+
+    def _stream(self, messages: List[Any], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for _ in range(self._plan(messages)):
+            time.sleep(self.decode_ms / 1000)
+            yield ChatGenerationChunk(message=AIMessageChunk(content="- fact"))
+
+
+def search_results(n):
+    return "\n\n".join(
+        f"Title: Result {i}\nSnippet: " + " ".join(f"detail{j} of topic{i}" for j in range(100))
+        + f"\nURL: https://example.com/{i}" for i in range(n))
+
+
+def timed_stream(chunks):
+    started = time.perf_counter()
+    first = None
+    for _ in chunks:
+        if first is None:
+            first = time.perf_counter() - started
+    return first, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--results", type=int, default=40)
+    parser.add_argument("--context", type=int, default=8000)
+    parser.add_argument("--prefill-ms", type=float, default=0.5)
+    parser.add_argument("--decode-ms", type=float, default=15.0)
+    args = parser.parse_args()
+
+    workdir = tempfile.TemporaryDirectory()
+    cache = ResponseCache(path=os.path.join(workdir.name, "responses.sqlite"), semantic=False)
+    model = TimedModel(prefill_ms=args.prefill_ms, decode_ms=args.decode_ms, context=args.context,
+                       cache=cache)
+    refine_with_llm.get_llm = lambda **kwargs: model
+    text = search_results(args.results)
+    stuff_tokens, chunk_tokens = summary_budgets()
+    print(f"{args.results} results, {estimate_tokens(text)} tokens, {args.context} token context, "
+          f"{stuff_tokens}/{chunk_tokens} token stuff/chunk budget, "
+          f"{refine_with_llm.SUMMARY_MAX_CONCURRENCY} concurrent calls\n")
+
+    prompt = build_summary_prompt(text, "question")
+    try:
+        first, total = timed_stream(model.stream(prompt))
+        print(f"stuffed     first token {first:6.2f}s   total {total:6.2f}s")
+    except ValueError as e:
+        print(f"stuffed     fails: {e}")
+        # Same prompt if the window were big enough
+        model.context = 10 ** 9
+        first, total = timed_stream(model.stream(prompt))
+        model.context = args.context
+        print(f"            (with an unlimited window: first token {first:6.2f}s   total {total:6.2f}s)")
+
+    with workdir:
+        for label, question in (("map-reduce", "question"), ("warm", "another question")):
+            first, total = timed_stream(refine_with_llm.stream_summary(text, question))
+            print(f"{label:<11} first token {first:6.2f}s   total {total:6.2f}s")
+        print(f"\nresponse cache: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
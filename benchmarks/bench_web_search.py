@@ -0,0 +1,71 @@
+# benchmarks/bench_web_search.py
+#
+# Search latency per question against the offline stub backend (fixed
+# simulated latency per request, STUB_SEARCH_LATENCY_MS):
+#
+#   single       one query per question, no cache (the old duckduckgo_search)
+#   sequential   the expanded sub-queries issued one after another
+#   parallel     the same sub-queries on the bounded pool, cold cache
+#   cached       the same questions again, served from the TTL cache
+#
+#   python -m benchmarks.bench_web_search --latency-ms 300
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from tools import web_search
+from tools.web_search import SearchCache, expand_query, merge_results, search
+
+QUESTIONS = [
+    "What is the difference between AI and Machine Learning?",
+    "python vs java for backend services",
+    "How do vector databases work? When should I use one",
+    "difference between threads and processes in python",
+    "rust borrow checker explained",
+    "postgres vs sqlite for small apps",
+]
+
+
+def run(label, fn, max_results):
+    latencies, distinct = [], []
+    for question in QUESTIONS:
+        started = time.perf_counter()
+        results = fn(question, max_results)
+        latencies.append(time.perf_counter() - started)
+        distinct.append(len({r["href"] for r in results}))
+    print(f"{label:<11} mean {1000 * statistics.mean(latencies):7.1f} ms   "
+          f"max {1000 * max(latencies):7.1f} ms   distinct results {statistics.mean(distinct):.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--max-results", type=int, default=8)
+    args = parser.parse_args()
+
+    web_search.STUB_SEARCH_LATENCY_MS = args.latency_ms
+    web_search.WEB_SEARCH_BACKEND = "stub"
+    with tempfile.TemporaryDirectory() as workdir:
+        cache = SearchCache(path=os.path.join(workdir, "search.sqlite"))
+        web_search.get_search_cache = lambda: cache
+
+        def single(question, n):
+            return web_search._stub_backend(question, n)
+
+        def sequential(question, n):
+            return merge_results([web_search._stub_backend(q, n) for q in expand_query(question)], n)
+
+        print(f"{len(QUESTIONS)} questions, {args.latency_ms:.0f} ms per backend request, "
+              f"{web_search.WEB_SEARCH_WORKERS} workers\n")
+        run("single", single, args.max_results)
+        run("sequential", sequential, args.max_results)
+        run("parallel", lambda q, n: search(q, n, expand=True), args.max_results)
+        run("cached", lambda q, n: search(q, n, expand=True), args.max_results)
+        print(f"\ncache: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
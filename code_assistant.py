@@ -1,32 +1,19 @@
 # code_assistant.py
 
 import os
+import threading
 from langchain_core.prompts import PromptTemplate
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
-from langchain_community.vectorstores import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
-
-# Import your flexible LLM loader
-from agent.llm_manager import get_llm
 
 # --- SETUP ---
-# 1. Initialize the LLM using your manager
-# Make sure your .env file is configured for the AI_PROVIDER you want to use.
-llm = get_llm(temperature=0.1)
-
-# 2. Load the vector store you created in the ingestion step
+# Nothing heavy happens at import time: the LLM client, the embedding model
+# and the vector store are created on first use by the accessors below, so
+# tools that only import this module (e.g. cursor_devagent) start instantly.
 persist_dir = "./chroma_db_codebase"
-embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-vectorstore = Chroma(persist_directory=persist_dir,
-                     embedding_function=embeddings)
-
-# 3. Create a retriever
-retriever = vectorstore.as_retriever(
-    search_type="similarity", search_kwargs={"k": 5})
 
 # --- PROMPT & CHAIN ---
-# 4. Create a prompt template that instructs the LLM how to behave
+# 1. Create a prompt template that instructs the LLM how to behave
 template = """
 You are an expert AI programming assistant.
 Answer the user's question based *only* on the following context of source code files.
@@ -42,17 +29,79 @@ ANSWER:
 """
 prompt = PromptTemplate.from_template(template)
 
-# 5. Create the RAG chain using LangChain Expression Language (LCEL)
-chain = (
-    {"context": retriever, "question": RunnablePassthrough()}
-    | prompt
-    | llm
-    | StrOutputParser()
-)
+_lock = threading.RLock()
+_resources = {}
+
+
+def _lazy(name, factory):
+    with _lock:
+        if name not in _resources:
+            _resources[name] = factory()
+        return _resources[name]
+
+
+def get_llm():
+    """2. The LLM from your manager (configure AI_PROVIDER in .env)."""
+    def create():
+        from agent.llm_manager import get_llm as get_provider_llm
+        from agent.scheduler import scheduled
+        return scheduled(get_provider_llm(temperature=0.1, use_cache=True, code=True))
+    return _lazy("llm", create)
+
+
+def get_vectorstore():
+    """3. The vector store created in the ingestion step."""
+    def create():
+        from agent.vectorstore import open_vectorstore
+        return open_vectorstore(persist_dir)
+    return _lazy("vectorstore", create)
+
+
+def get_retriever():
+    """Hybrid keyword + vector retriever, so questions naming an exact
+    identifier find it (RETRIEVAL_MODE=dense for similarity only)."""
+    def create():
+        from agent.retriever import build_retriever
+        return build_retriever(get_vectorstore(), persist_dir, k=5)
+    return _lazy("retriever", create)
+
+
+def get_chain():
+    """4. The RAG chain, built with LangChain Expression Language (LCEL).
+    Retrieved chunks are merged and packed into the model's token budget."""
+    def create():
+        from agent.prompt_builder import build_context
+        return (
+            {"context": get_retriever() | build_context, "question": RunnablePassthrough()}
+            | prompt
+            | get_llm()
+            | StrOutputParser()
+        )
+    return _lazy("chain", create)
+
+
+def get_answer_chain():
+    """The same prompt and LLM without retrieval, for callers that already
+    have the exact context: {"context": str, "question": str} in, str out."""
+    return _lazy("answer_chain", lambda: prompt | get_llm() | StrOutputParser())
+
+
+_ACCESSORS = {"llm": get_llm, "vectorstore": get_vectorstore,
+              "retriever": get_retriever, "chain": get_chain,
+              "answer_chain": get_answer_chain}
+
+
+def __getattr__(name):
+    # Keeps `from code_assistant import chain` working, built on first access
+    if name in _ACCESSORS:
+        return _ACCESSORS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # --- INTERACTIVE CHAT ---
-# 6. Create a simple command-line interface
+# 5. Create a simple command-line interface
 if __name__ == "__main__":
+    chain = get_chain()
     print("🤖 AI Code Assistant is ready. Ask me anything about your codebase!")
     print("Type 'exit' to quit.")
 
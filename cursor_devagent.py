@@ -1,9 +1,9 @@
 import os
 import re
-from agent.llm_manager import get_llm
 from tools.agent_tools import list_files, read_file, write_file
-from tools.chat_with_uploaded_docs import ask_question_from_uploaded_doc
-from code_assistant import chain as code_chain
+
+# The code and document chains load an LLM client, the embedding model and a
+# vector store, so they are imported only when a query needs them.
 
 def display_welcome():
     print("""
@@ -56,6 +56,84 @@ def create_file_with_content(filename, content):
     except Exception as e:
         return f"❌ Error creating file: {e}"
 
+# Questions about a named symbol are answered from the symbol table that
+# ingest_codebase.py builds: "where is X defined" / "who calls X" need no LLM
+# at all, and "explain X" sends exactly X's definition as the context.
+DEFINITION_PATTERN = re.compile(r"\bwhere\b.*\bdefined\b|\bdefinition of\b|\bfind (?:the )?(?:function|class|method)\b", re.IGNORECASE)
+CALLERS_PATTERN = re.compile(r"\bwho calls\b|\bcallers of\b|\bwhere\b.*\b(?:called|used)\b|\busages? of\b", re.IGNORECASE)
+EXPLAIN_WORDS = ['explain', 'what does', 'how does', 'code', 'function', 'class']
+EDIT_WORDS = ['create', 'make', 'write', 'new file']
+MAX_LISTED = 20
+MAX_EXPLAINED = 3
+
+
+def _named_symbols(index, query):
+    """Symbols the query names. Plain lowercase words ("run", "main") only
+    count when written like code: `run`, run(), "function run" or "run function"."""
+    names = []
+    for name in index.find_in_text(query):
+        plain = name.isalpha() and name.islower()
+        if plain and not re.search(rf"`{re.escape(name)}`|\b{re.escape(name)}\(|"
+                                   rf"\b(?:function|class|method|def)\s+{re.escape(name)}\b|"
+                                   rf"\b{re.escape(name)}\s+(?:function|class|method)\b",
+                                   query, re.IGNORECASE):
+            continue
+        names.append(name)
+    return names
+
+
+def _describe_definition(symbol):
+    lines = [f"📍 `{symbol['qualname']}` ({symbol['kind']}) — "
+             f"{symbol['file']}:{symbol['start_line']}-{symbol['end_line']}",
+             f"    {symbol['signature']}"]
+    if symbol["docstring"]:
+        lines.append(f"    {symbol['docstring'].splitlines()[0]}")
+    return "\n".join(lines)
+
+
+def _describe_callers(index, name):
+    sites = index.callers(name)
+    if not sites:
+        return f"📞 No calls to `{name}` found in the indexed code."
+    lines = [f"📞 `{name}` is called from {len(sites)} place(s):"]
+    lines += [f"  • {site['caller']} ({site['file']}:{site['line']})" for site in sites[:MAX_LISTED]]
+    if len(sites) > MAX_LISTED:
+        lines.append(f"  … and {len(sites) - MAX_LISTED} more")
+    return "\n".join(lines)
+
+
+def answer_from_symbols(query):
+    """Answers a query about a known symbol, or returns None to fall through."""
+    from ingest.symbol_index import get_symbol_index
+    index = get_symbol_index()
+    if not len(index):
+        return None
+    names = _named_symbols(index, query)
+    if not names:
+        return None
+
+    if CALLERS_PATTERN.search(query):
+        return "\n\n".join(_describe_callers(index, name) for name in names)
+    if DEFINITION_PATTERN.search(query):
+        return "\n\n".join(_describe_definition(symbol)
+                            for name in names for symbol in index.lookup(name))
+
+    query_lower = query.lower()
+    if (any(word in query_lower for word in EXPLAIN_WORDS)
+            and not any(word in query_lower for word in EDIT_WORDS)):
+        symbols = [symbol for name in names for symbol in index.lookup(name)][:MAX_EXPLAINED]
+        sources = [index.source_of(s) for s in symbols]
+        if not symbols or None in sources:
+            return None  # index is older than the tree; let retrieval handle it
+        context = "\n\n".join(
+            f"# {s['file']} {s['qualname']} (lines {s['start_line']}-{s['end_line']})\n{source}"
+            for s, source in zip(symbols, sources))
+        from code_assistant import get_answer_chain
+        response = get_answer_chain().invoke({"context": context, "question": query})
+        return f"🤖 Code explanation:\n{response}"
+    return None
+
+
 def process_query(query):
     """Process user queries and execute appropriate actions"""
     query_lower = query.lower().strip()
@@ -64,6 +142,14 @@ def process_query(query):
     if any(word in query_lower for word in ['hi', 'hello', 'hey']) and len(query_lower.split()) <= 3:
         return "Hello! How can I help you with your code today?"
     
+    # Known symbol: definition / callers / explanation straight from the index
+    try:
+        response = answer_from_symbols(query)
+        if response is not None:
+            return response
+    except Exception as e:
+        print(f"[WARN] Symbol lookup failed, using the regular path: {e}")
+    
     # File listing
     if any(word in query_lower for word in ['list', 'show', 'files', 'directory', 'what files']):
         try:
@@ -117,7 +203,8 @@ def process_query(query):
     # Code explanation
     elif any(word in query_lower for word in ['explain', 'what does', 'how does', 'code', 'function', 'class']):
         try:
-            response = code_chain.invoke(query)
+            from code_assistant import get_chain
+            response = get_chain().invoke(query)
             return f"🤖 Code explanation:\n{response}"
         except Exception as e:
             return f"❌ Error explaining code: {e}"
@@ -125,6 +212,7 @@ def process_query(query):
     # Document Q&A
     elif any(word in query_lower for word in ['document', 'doc', 'ask', 'question about']):
         try:
+            from tools.chat_with_uploaded_docs import ask_question_from_uploaded_doc
             response = ask_question_from_uploaded_doc(query)
             return f"📚 Document answer:\n{response}"
         except Exception as e:
@@ -140,6 +228,7 @@ def process_query(query):
 • "create java file" - Create a Java HelloWorld program
 • "explain this code" - Ask about codebase
 • "what does this function do" - Explain specific code
+• "where is X defined" / "who calls X" - Look up a function or class
 • "help" - Show this help
 • "exit" - Quit
 
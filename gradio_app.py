@@ -2,31 +2,72 @@
 
 import os
 import gradio as gr
-from tools.upload_and_ingest import ingest_file
+from agent.embeddings import warm_up
+from ingest.jobs import CANCELLED, DONE, QUEUED, RUNNING, JobQueueFull, get_job_queue
+from tools.upload_and_ingest import submit_ingest_file
 from tools.chat_with_uploaded_docs import ask_question_from_uploaded_doc
 
 USER_ID = "user_001"
 uploaded_doc_path = ""
+ingest_job_id = None
 
 
 def upload_and_ingest(file):
-    global uploaded_doc_path
+    global uploaded_doc_path, ingest_job_id
     if file is None:
         return "⚠️ Please upload a file."
 
+    # Ingestion runs in the background; the status box is refreshed by a timer
+    try:
+        job = submit_ingest_file(file.name, user_id=USER_ID)
+    except JobQueueFull:
+        return "⚠️ Too many uploads are being ingested, please try again shortly."
+    ingest_job_id = job.id
     uploaded_doc_path = file.name
-    ingest_file(uploaded_doc_path, user_id=USER_ID)
-    return f"✅ File '{file.name}' ingested successfully!"
+    return f"⏳ Queued '{os.path.basename(file.name)}' (job {job.id})"
+
+
+def ingest_status():
+    job = get_job_queue().get(ingest_job_id) if ingest_job_id else None
+    if job is None:
+        return gr.update()
+
+    status = job.status()
+    name = os.path.basename(uploaded_doc_path)
+    progress = status["progress"]
+    if status["state"] == QUEUED:
+        return f"⏳ '{name}' is waiting for a free ingestion worker..."
+    if status["state"] == RUNNING:
+        return (f"⚙️ Ingesting '{name}': {progress['pages_loaded']} pages loaded, "
+                f"{progress['chunks_embedded']} chunks embedded, "
+                f"{progress['chunks_persisted']} persisted")
+    if status["state"] == DONE:
+        return (f"✅ File '{name}' ingested successfully! "
+                f"({progress['chunks_persisted']} chunks in {progress['elapsed_seconds']:.1f}s)")
+    if status["state"] == CANCELLED:
+        return f"🛑 Ingestion of '{name}' was cancelled."
+    return f"❌ Ingestion of '{name}' failed: {status['error']}"
+
+
+def cancel_ingest():
+    if ingest_job_id and get_job_queue().cancel(ingest_job_id):
+        return "🛑 Cancelling..."
+    return gr.update()
 
 
 def chat_with_doc(message, history):
     if not uploaded_doc_path:
-        return "⚠️ Please upload and ingest a document first."
+        yield "⚠️ Please upload and ingest a document first."
+        return
     if not message.strip():
-        return "⚠️ Please enter a valid question."
+        yield "⚠️ Please enter a valid question."
+        return
 
-    response = ask_question_from_uploaded_doc(message, user_id=USER_ID)
-    return response
+    # Render the answer as it is generated instead of all at once
+    response = ""
+    for token in ask_question_from_uploaded_doc(message, user_id=USER_ID, stream=True):
+        response += token
+        yield response
 
 
 with gr.Blocks(title="🧠 DocChat Agent") as demo:
@@ -38,10 +79,14 @@ with gr.Blocks(title="🧠 DocChat Agent") as demo:
             label="📄 Upload a TXT or PDF file", file_types=[".txt", ".pdf"]
         )
         upload_btn = gr.Button("📥 Upload & Ingest")
+        cancel_btn = gr.Button("🛑 Cancel")
         upload_output = gr.Textbox(label="Status", interactive=False)
 
     upload_btn.click(fn=upload_and_ingest, inputs=[
                      file_input], outputs=[upload_output])
+    cancel_btn.click(fn=cancel_ingest, outputs=[upload_output])
+    # Poll the background job so progress shows up without blocking a worker
+    gr.Timer(1.0).tick(fn=ingest_status, outputs=[upload_output])
 
     gr.ChatInterface(
         fn=chat_with_doc,
@@ -54,4 +99,6 @@ with gr.Blocks(title="🧠 DocChat Agent") as demo:
     )
 
 if __name__ == "__main__":
+    # Load the embedding model before the first upload/question arrives
+    warm_up()
     demo.launch()
@@ -0,0 +1,159 @@
+# ingest/code_chunker.py
+
+import ast
+import os
+
+from langchain_core.documents import Document
+
+# Functions / classes longer than this are split; everything else is one chunk
+CODE_CHUNK_MAX_CHARS = int(os.getenv("CODE_CHUNK_MAX_CHARS", "2000"))
+
+
+def _start_line(node):
+    # Decorators belong to the definition they decorate
+    decorators = getattr(node, "decorator_list", None) or []
+    return min([node.lineno] + [d.lineno for d in decorators])
+
+
+def _imports(tree, lines):
+    statements = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join("".join(lines[n.lineno - 1:n.end_lineno]).rstrip() for n in statements)
+
+
+class _Chunker:
+    def __init__(self, source, file_path, max_chars):
+        self.lines = source.splitlines(keepends=True)
+        self.file_path = file_path
+        self.max_chars = max_chars
+        self.chunks = []
+        self.imports = ""
+
+    def start_of(self, node):
+        """First line of a node, including its decorators and the comment
+        lines directly above it."""
+        start = _start_line(node)
+        while start > 1 and self.lines[start - 2].lstrip().startswith("#"):
+            start -= 1
+        return start
+
+    def text(self, start, end):
+        return "".join(self.lines[start - 1:end])
+
+    def emit(self, kind, qualname, start, end, text=None, part=None):
+        text = self.text(start, end) if text is None else text
+        if not text.strip():
+            return
+        # A location header gives both the embedding and the LLM the file
+        # and symbol the code belongs to. Line numbers stay in the metadata:
+        # in the text they would change the chunk whenever code above moves.
+        label = f"{qualname} (part {part})" if part else qualname
+        header = f"# {self.file_path} {label}\n"
+        metadata = {"source": self.file_path, "language": "python", "kind": kind,
+                    "name": qualname.rsplit(".", 1)[-1], "qualname": qualname,
+                    "start_line": start, "end_line": end, "imports": self.imports}
+        if part:
+            metadata["part"] = part
+        self.chunks.append(Document(page_content=header + text, metadata=metadata))
+
+    def block(self, nodes, prefix, parent_kind):
+        """Emits the definitions in `nodes`; runs of other statements are grouped."""
+        pending = []
+
+        def flush():
+            if pending:
+                start, end = self.start_of(pending[0]), pending[-1].end_lineno
+                qualname = prefix or "<module>"
+                kind = "module" if not prefix else parent_kind
+                self.split_lines(kind, qualname, start, end)
+                pending.clear()
+
+        for node in nodes:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                flush()
+                self.definition(node, prefix, parent_kind)
+            else:
+                pending.append(node)
+        flush()
+
+    def definition(self, node, prefix, parent_kind):
+        qualname = f"{prefix}.{node.name}" if prefix else node.name
+        start, end = self.start_of(node), node.end_lineno
+        if isinstance(node, ast.ClassDef):
+            if len(self.text(start, end)) <= self.max_chars:
+                self.emit("class", qualname, start, end)
+                return
+            # Oversized class: its header / class attributes, then each member
+            body_start = node.body[0].lineno if node.body else end + 1
+            members = [n for n in node.body
+                       if not isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))]
+            header = self.text(start, body_start - 1)
+            header += "".join(self.text(_start_line(n), n.end_lineno) for n in members)
+            self.emit("class", qualname, start, end, text=header)
+            self.block([n for n in node.body if n not in members], qualname, "class")
+            return
+
+        kind = "method" if parent_kind == "class" else "function"
+        self.split_function(node, kind, qualname, start, end)
+
+    def split_function(self, node, kind, qualname, start, end):
+        text = self.text(start, end)
+        if len(text) <= self.max_chars or not node.body:
+            self.emit(kind, qualname, start, end)
+            return
+        # Oversized body: cut at top-level statement boundaries and repeat the
+        # signature in every part so each chunk still says what it belongs to
+        signature = self.text(start, node.body[0].lineno - 1)
+        self._pack(kind, qualname, [(_start_line(n), n.end_lineno) for n in node.body],
+                   signature)
+
+    def split_lines(self, kind, qualname, start, end):
+        if len(self.text(start, end)) <= self.max_chars:
+            self.emit(kind, qualname, start, end)
+            return
+        self._pack(kind, qualname, [(i, i) for i in range(start, end + 1)], "")
+
+    def _pack(self, kind, qualname, spans, prefix_text):
+        """Greedily packs consecutive (start, end) line spans into parts."""
+        budget = self.max_chars - len(prefix_text)
+        # A single statement bigger than a part (e.g. a long if/elif chain)
+        # falls back to line boundaries
+        spans = [line for span in spans
+                 for line in ([span] if len(self.text(*span)) <= budget
+                              else [(i, i) for i in range(span[0], span[1] + 1)])]
+        parts, current = [], []
+        size = len(prefix_text)
+        for span in spans:
+            length = len(self.text(*span))
+            if current and size + length > self.max_chars:
+                parts.append(current)
+                current, size = [], len(prefix_text)
+            current.append(span)
+            size += length
+        if current:
+            parts.append(current)
+
+        for number, part in enumerate(parts, start=1):
+            first, last = part[0][0], part[-1][1]
+            if number == 1:
+                first -= prefix_text.count("\n")
+                text = self.text(first, last)
+            else:
+                text = prefix_text + self.text(first, last)
+            self.emit(kind, qualname, first, last, text=text, part=number)
+
+
+def chunk_python(source, file_path, max_chars=None):
+    """
+    Splits Python source into one Document per function, class or method
+    (module-level statements are grouped between them). Definitions longer
+    than `max_chars` are split at statement boundaries. Returns None when the
+    source does not parse, so the caller can fall back to a text splitter.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return None
+    chunker = _Chunker(source, file_path, max_chars or CODE_CHUNK_MAX_CHARS)
+    chunker.imports = _imports(tree, chunker.lines)
+    chunker.block(tree.body, "", "module")
+    return chunker.chunks
@@ -0,0 +1,161 @@
+# ingest/discovery.py
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from langchain_community.document_loaders import TextLoader, PythonLoader, NotebookLoader
+
+DISCOVERY_WORKERS = int(os.getenv("DISCOVERY_WORKERS", str(min(32, (os.cpu_count() or 1) * 4))))
+
+# Extension -> loader factory. Every loader gets the file path and returns a
+# list of Documents.
+LOADERS = {
+    ".py": PythonLoader,
+    ".txt": lambda path: TextLoader(path, encoding="utf-8"),
+    ".md": lambda path: TextLoader(path, encoding="utf-8"),
+    ".ipynb": NotebookLoader,
+}
+
+
+def _translate(pattern):
+    """Turns one gitignore-style glob into a regex over '/'-separated paths."""
+    anchored = pattern.startswith("/") or "/" in pattern.rstrip("/")
+    pattern = pattern.strip("/")
+
+    out, i = [], 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+
+    # Unanchored patterns ("__pycache__/", "*.pyc") match at any depth
+    return ("" if anchored else "(?:.*/)?") + "".join(out)
+
+
+class IgnoreMatcher:
+    """
+    Gitignore-style matcher compiled once into two regexes: one for patterns
+    that apply to any path and one for directory-only patterns (trailing '/').
+    Paths are relative to the walk root and use '/' as separator.
+    """
+
+    def __init__(self, patterns=()):
+        any_path, dir_only = [], []
+        for pattern in patterns:
+            pattern = pattern.strip()
+            if not pattern or pattern.startswith("#"):
+                continue
+            (dir_only if pattern.endswith("/") else any_path).append(_translate(pattern))
+
+        self._any = re.compile("^(?:%s)$" % "|".join(any_path)) if any_path else None
+        self._dirs = re.compile("^(?:%s)$" % "|".join(dir_only)) if dir_only else None
+
+    def matches(self, rel_path, is_dir=False):
+        if self._any is not None and self._any.match(rel_path):
+            return True
+        return is_dir and self._dirs is not None and bool(self._dirs.match(rel_path))
+
+
+def walk_files(root=".", extensions=None, ignore=None):
+    """
+    Single pass over the tree yielding the relative path of every file whose
+    extension is in `extensions` (all files if None). Ignored directories are
+    pruned before they are entered.
+    """
+    if not isinstance(ignore, IgnoreMatcher):
+        ignore = IgnoreMatcher(ignore or ())
+    extensions = tuple(extensions) if extensions else None
+
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            entries = os.scandir(os.path.join(root, rel_dir) if rel_dir else root)
+        except OSError as e:
+            print(f"[WARN] Cannot list {rel_dir or root}: {e}")
+            continue
+
+        subdirs = []
+        with entries:
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if ignore.matches(rel_path, is_dir):
+                    continue
+                if is_dir:
+                    subdirs.append(rel_path)
+                elif extensions is None or entry.name.endswith(extensions):
+                    yield os.path.normpath(os.path.join(root, rel_path))
+
+        # Reverse so directories come off the stack in listing order
+        stack.extend(reversed(subdirs))
+
+
+def parallel_map(fn, items, max_workers=None):
+    """
+    Runs fn(item) on a thread pool and yields (item, result, error) as soon as
+    each call finishes. At most a few calls per worker are in flight, so a
+    huge `items` generator is consumed lazily and memory stays bounded.
+    """
+    max_workers = max_workers or DISCOVERY_WORKERS
+    items = iter(items)
+    in_flight = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        def submit_next():
+            for item in items:
+                in_flight[pool.submit(fn, item)] = item
+                return True
+            return False
+
+        for _ in range(max_workers * 4):
+            if not submit_next():
+                break
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = in_flight.pop(future)
+                error = future.exception()
+                yield item, (None if error else future.result()), error
+                submit_next()
+
+
+def load_file(file_path, loaders=None):
+    loaders = loaders or LOADERS
+    ext = os.path.splitext(file_path)[1]
+    return loaders[ext](file_path).load()
+
+
+def iter_documents(root=".", extensions=None, ignore=None, loaders=None, max_workers=None):
+    """
+    Streams Documents for every matching file under `root`: one directory walk,
+    extension -> loader dispatch, and concurrent reading/decoding of files.
+    Files that fail to load are reported and skipped.
+    """
+    loaders = loaders or LOADERS
+    extensions = extensions or tuple(loaders)
+    paths = walk_files(root, extensions, ignore)
+
+    for file_path, docs, error in parallel_map(
+            lambda path: load_file(path, loaders), paths, max_workers):
+        if error is not None:
+            print(f"[WARN] Error loading file {file_path}: {error}")
+            continue
+        yield from docs
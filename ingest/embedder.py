@@ -4,7 +4,9 @@ from dotenv import load_dotenv
 
 from langchain_community.document_loaders import TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
+
+from agent.embeddings import get_embeddings
+from ingest.pipeline import run_pipeline
 
 from langsmith.run_helpers import traceable  # Keep this for LangSmith tracing
 
@@ -15,22 +17,24 @@ VECTOR_STORE = os.getenv("VECTOR_STORE", "chroma")
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "dev-agent")
 PINECONE_ENV = os.getenv("PINECONE_ENV", "us-west-2")
+# Kept apart from ./chroma_db, whose subdirectories are per-user upload stores
+MMAP_PERSIST_DIR = os.getenv("MMAP_PERSIST_DIR", "./mmap_db")
+# EMBEDDING_BACKEND=process_pool (with EMBEDDING_WORKERS / EMBEDDING_BATCH_SIZE)
+# spreads embedding over several processes; see agent/embeddings.py.
 
 
 @traceable(name="Document Ingestion")
 def ingest():
     print("[INFO] Loading documents...")
     loader = TextLoader("./docs/sample1.txt")
-    documents = loader.load()
 
-    print("[INFO] Splitting documents...")
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=500, chunk_overlap=20
     )
-    documents = text_splitter.split_documents(documents)
 
-    print("[INFO] Generating embeddings...")
-    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    # Loading, splitting, embedding and storing are streamed through the
+    # pipeline in bounded batches instead of materialising every chunk.
+    embeddings = get_embeddings(cached=True)
     if VECTOR_STORE == "pinecone":
         try:
             from pinecone import Pinecone, ServerlessSpec
@@ -47,29 +51,47 @@ def ingest():
                 )
 
             print("[INFO] Storing documents in Pinecone...")
-            vectorstore = PineconeVectorStore.from_documents(
-                documents,
+            vectorstore = PineconeVectorStore.from_existing_index(
+                PINECONE_INDEX_NAME,
                 embeddings,
-                index_name=PINECONE_INDEX_NAME,
                 namespace="default"
             )
+            stats = run_pipeline(loader.lazy_load(), embeddings, vectorstore,
+                                 split_fn=text_splitter.split_documents)
 
-            print(f"[INFO] Stored {len(documents)} docs in Pinecone.")
+            print(f"[INFO] Stored {stats.upsert.items} docs in Pinecone.")
+            print(f"[INFO] Pipeline stats: {stats.as_dict()}")
             return
 
         except Exception as e:
             print(f"[WARN] Pinecone failed: {e} — falling back to ChromaDB")
 
+    if VECTOR_STORE == "mmap":
+        from agent.mmap_store import MmapVectorStore
+
+        print("[INFO] Storing documents in the memory-mapped store...")
+        vectorstore = MmapVectorStore(persist_directory=MMAP_PERSIST_DIR,
+                                      embedding_function=embeddings)
+        stats = run_pipeline(loader.lazy_load(), embeddings, vectorstore,
+                             split_fn=text_splitter.split_documents)
+        print(f"[INFO] Stored {stats.upsert.items} docs ({vectorstore.stats()}).")
+        print(f"[INFO] Pipeline stats: {stats.as_dict()}")
+        return
+
     try:
         from langchain_community.vectorstores import Chroma
 
         print("[INFO] Storing documents in ChromaDB...")
-        vectorstore = Chroma.from_documents(
-            documents,
-            embeddings,
-            persist_directory="./chroma_db"
+        vectorstore = Chroma(
+            persist_directory="./chroma_db",
+            embedding_function=embeddings
         )
-        print(f"[INFO] Stored {len(documents)} docs in ChromaDB.")
+        stats = run_pipeline(loader.lazy_load(), embeddings, vectorstore,
+                             split_fn=text_splitter.split_documents)
+        print(f"[INFO] Stored {stats.upsert.items} docs in ChromaDB.")
+        print(f"[INFO] Pipeline stats: {stats.as_dict()}")
+        if hasattr(embeddings, "stats"):
+            print(f"[INFO] Embedding cache: {embeddings.stats()}")
 
     except Exception as e:
         print(f"[ERROR] Failed to store documents in ChromaDB: {e}")
@@ -1,21 +1,17 @@
 import os
 from langchain_core.documents import Document
-from langchain_community.document_loaders import TextLoader, PythonLoader, NotebookLoader, DirectoryLoader
+from langchain_community.document_loaders import TextLoader, PythonLoader, NotebookLoader
 
+from ingest.discovery import iter_documents
 
-def load_documents_from_directory(directory_path: str):
-    loaders = [
-        (".py", PythonLoader),
-        (".txt", TextLoader),
-        (".md", TextLoader),
-        (".ipynb", NotebookLoader),
-    ]
 
-    documents = []
-    for ext, LoaderClass in loaders:
-        loader = DirectoryLoader(
-            path=directory_path, glob=f"**/*{ext}", loader_cls=LoaderClass)
-        docs = loader.load()
-        documents.extend(docs)
+def load_documents_from_directory(directory_path: str):
+    loaders = {
+        ".py": PythonLoader,
+        ".txt": TextLoader,
+        ".md": TextLoader,
+        ".ipynb": NotebookLoader,
+    }
 
-    return documents
+    # One walk over the tree for all extensions, files read concurrently
+    return list(iter_documents(directory_path, loaders=loaders))
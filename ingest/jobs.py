@@ -0,0 +1,155 @@
+# ingest/jobs.py
+
+import itertools
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from ingest.pipeline import IngestCancelled, PipelineStats
+
+INGEST_JOB_WORKERS = int(os.getenv("INGEST_JOB_WORKERS", "2"))
+# Jobs that may wait for a worker before new submissions are refused
+INGEST_JOB_MAX_PENDING = int(os.getenv("INGEST_JOB_MAX_PENDING", "32"))
+# Finished jobs kept around so clients can still read their final status
+INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "200"))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+_FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when too many ingestion jobs are already waiting."""
+
+
+def new_job_id():
+    """Id for a job that is about to be submitted (e.g. to name its upload)."""
+    return uuid.uuid4().hex[:12]
+
+
+class IngestJob:
+    """One background ingestion: its state, live pipeline stats and cancel flag."""
+
+    def __init__(self, fn, args, kwargs, description="", job_id=None):
+        self.id = job_id or new_job_id()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.description = description
+        self.state = QUEUED
+        self.stats = PipelineStats()
+        self.cancel_event = threading.Event()
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+
+    def run(self):
+        if self.cancel_event.is_set():
+            self._finish(CANCELLED)
+            return
+        self.state = RUNNING
+        self.started = time.time()
+        # The pipeline's clock should start when work does, not at submission
+        self.stats.started = time.perf_counter()
+        try:
+            self.result = self.fn(*self.args, stats=self.stats,
+                                  cancel_event=self.cancel_event, **self.kwargs)
+        except IngestCancelled:
+            self._finish(CANCELLED)
+        except Exception as e:
+            self.error = str(e)
+            print(f"[ERROR] Ingestion job {self.id} failed: {e}")
+            self._finish(FAILED)
+        else:
+            self._finish(DONE)
+
+    def _finish(self, state):
+        self.state = state
+        self.finished = time.time()
+
+    def status(self):
+        progress = self.stats.as_dict() if self.started else None
+        if progress:
+            progress = {"pages_loaded": self.stats.load.items,
+                        "chunks_split": self.stats.split.items,
+                        "chunks_embedded": self.stats.embed.items,
+                        "chunks_persisted": self.stats.upsert.items,
+                        "elapsed_seconds": progress["elapsed_seconds"]}
+        return {"job_id": self.id, "state": self.state, "description": self.description,
+                "progress": progress, "result": self.result, "error": self.error,
+                "submitted": self.submitted, "started": self.started,
+                "finished": self.finished}
+
+
+class JobQueue:
+    """
+    Bounded pool of ingestion workers. Submitting returns at once with an
+    IngestJob whose status can be polled while the pipeline runs; at most
+    `max_pending` jobs may wait for a worker, after which JobQueueFull is
+    raised so callers can shed load.
+    """
+
+    def __init__(self, workers=None, max_pending=None, history=None):
+        self.workers = workers or INGEST_JOB_WORKERS
+        self.max_pending = max_pending or INGEST_JOB_MAX_PENDING
+        self.history = history or INGEST_JOB_HISTORY
+        self._pool = ThreadPoolExecutor(max_workers=self.workers,
+                                        thread_name_prefix="ingest-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, description="", job_id=None, **kwargs):
+        """Queues fn(*args, stats=..., cancel_event=..., **kwargs)."""
+        job = IngestJob(fn, args, kwargs, description, job_id)
+        with self._lock:
+            pending = sum(1 for j in self._jobs.values() if j.state == QUEUED)
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"{pending} ingestion jobs are already waiting")
+            self._jobs[job.id] = job
+            self._trim()
+        self._pool.submit(job.run)
+        print(f"[INFO] Queued ingestion job {job.id}: {description}")
+        return job
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.state in _FINISHED]
+        for job_id in itertools.islice(finished, max(0, len(finished) - self.history)):
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Requests cancellation; returns False for unknown or finished jobs."""
+        job = self.get(job_id)
+        if job is None or job.state in _FINISHED:
+            return False
+        job.cancel_event.set()
+        return True
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def shutdown(self):
+        for job in self.jobs():
+            job.cancel_event.set()
+        self._pool.shutdown(wait=False)
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """The process-wide ingestion JobQueue, created on first use."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue()
+        return _job_queue
@@ -0,0 +1,205 @@
+# ingest/pipeline.py
+
+import os
+import queue
+import threading
+import time
+import uuid
+
+EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "64"))
+QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "8"))
+UPSERT_WORKERS = int(os.getenv("INGEST_UPSERT_WORKERS", "2"))
+
+_DONE = object()
+
+
+class IngestCancelled(Exception):
+    pass
+
+
+class StageStats:
+    """Item count and busy time for one pipeline stage."""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+
+    def add(self, items, seconds):
+        self.items += items
+        self.busy_seconds += seconds
+
+    def as_dict(self):
+        rate = self.items / self.busy_seconds if self.busy_seconds else 0.0
+        return {"items": self.items, "busy_seconds": round(self.busy_seconds, 3),
+                "items_per_second": round(rate, 1)}
+
+
+class PipelineStats:
+    """
+    Live counters for a pipeline run. Safe to read from another thread while
+    the pipeline is running, e.g. to report progress.
+    """
+
+    def __init__(self):
+        self.load = StageStats("load")          # source documents / pages read
+        self.split = StageStats("split")        # chunks produced
+        self.embed = StageStats("embed")        # chunks embedded
+        self.upsert = StageStats("upsert")      # chunks persisted
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def as_dict(self):
+        end = self.finished or time.perf_counter()
+        return {
+            "elapsed_seconds": round(end - self.started, 3),
+            **{stage.name: stage.as_dict()
+               for stage in (self.load, self.split, self.embed, self.upsert)},
+        }
+
+
+def chunk_ids(chunks):
+    """IDs for a batch: a precomputed metadata['chunk_id'] wins, else a random one."""
+    return [chunk.metadata.get("chunk_id") or str(uuid.uuid4()) for chunk in chunks]
+
+
+def upsert_embeddings(vectorstore, texts, vectors, metadatas, ids):
+    """
+    Writes precomputed vectors to a LangChain vector store without embedding
+    the texts a second time.
+    """
+    if hasattr(vectorstore, "add_embeddings"):
+        vectorstore.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+    elif hasattr(vectorstore, "_collection"):
+        # Chroma rejects empty metadata dicts, but accepts None
+        vectorstore._collection.upsert(
+            ids=ids, embeddings=vectors, documents=texts,
+            metadatas=[m or None for m in metadatas])
+    elif hasattr(vectorstore, "_index") and hasattr(vectorstore, "_text_key"):
+        # Pinecone keeps the chunk text inside the metadata
+        vectorstore._index.upsert(
+            vectors=[(i, v, {**m, vectorstore._text_key: t})
+                     for i, v, m, t in zip(ids, vectors, metadatas, texts)],
+            namespace=vectorstore._namespace)
+    else:
+        vectorstore.add_texts(texts, metadatas=metadatas, ids=ids)
+
+
+def run_pipeline(documents, embeddings, vectorstore, split_fn=None,
+                 batch_size=None, queue_size=None, upsert_workers=None,
+                 stats=None, cancel_event=None):
+    """
+    Streams documents through load -> split -> embed -> upsert.
+
+    `documents` may be any iterable (ideally a generator, so loading happens
+    lazily). Each stage runs in its own thread with a bounded queue in
+    between, so only a few batches are in memory at any time, embedding
+    (CPU-bound) overlaps with the vector store writes (I/O-bound), and several
+    upsert batches can be in flight at once. Returns a PipelineStats.
+    """
+    batch_size = batch_size or EMBED_BATCH_SIZE
+    queue_size = queue_size or QUEUE_SIZE
+    upsert_workers = upsert_workers or UPSERT_WORKERS
+    stats = stats or PipelineStats()
+    cancel_event = cancel_event or threading.Event()
+
+    chunk_queue = queue.Queue(maxsize=queue_size * batch_size)
+    write_queue = queue.Queue(maxsize=queue_size)
+    errors = []
+
+    def put(q, item):
+        # Blocking put that gives up when another stage failed or we were cancelled
+        while not (errors or cancel_event.is_set()):
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(q):
+        while not (errors or cancel_event.is_set()):
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def produce():
+        try:
+            source = iter(documents)
+            while True:
+                started = time.perf_counter()
+                doc = next(source, _DONE)
+                if doc is _DONE:
+                    break
+                stats.load.add(1, time.perf_counter() - started)
+
+                started = time.perf_counter()
+                chunks = split_fn([doc]) if split_fn else [doc]
+                stats.split.add(len(chunks), time.perf_counter() - started)
+                for chunk in chunks:
+                    if not put(chunk_queue, chunk):
+                        return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            put(chunk_queue, _DONE)
+
+    def embed():
+        try:
+            done = False
+            while not done:
+                batch = []
+                while len(batch) < batch_size:
+                    chunk = get(chunk_queue)
+                    if chunk is _DONE:
+                        done = True
+                        break
+                    batch.append(chunk)
+                if not batch:
+                    continue
+
+                started = time.perf_counter()
+                texts = [chunk.page_content for chunk in batch]
+                vectors = embeddings.embed_documents(texts)
+                stats.embed.add(len(batch), time.perf_counter() - started)
+                item = (texts, vectors, [dict(c.metadata) for c in batch], chunk_ids(batch))
+                if not put(write_queue, item):
+                    return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            for _ in range(upsert_workers):
+                put(write_queue, _DONE)
+
+    upsert_lock = threading.Lock()
+
+    def upsert():
+        try:
+            while True:
+                item = get(write_queue)
+                if item is _DONE:
+                    return
+                started = time.perf_counter()
+                upsert_embeddings(vectorstore, *item)
+                with upsert_lock:
+                    stats.upsert.add(len(item[0]), time.perf_counter() - started)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=produce, name="ingest-load", daemon=True),
+               threading.Thread(target=embed, name="ingest-embed", daemon=True)]
+    threads += [threading.Thread(target=upsert, name=f"ingest-upsert-{i}", daemon=True)
+                for i in range(upsert_workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats.finished = time.perf_counter()
+    if errors:
+        raise errors[0]
+    if cancel_event.is_set():
+        raise IngestCancelled("Ingestion was cancelled")
+    return stats
@@ -0,0 +1,202 @@
+# ingest/symbol_index.py
+
+import ast
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+
+SYMBOL_INDEX_PATH = os.getenv("SYMBOL_INDEX_PATH", "./chroma_db_codebase/symbols.json")
+
+_IDENT_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_.]*")
+_DOC_CHARS = 300
+
+
+def _signature(node, lines):
+    """The definition line(s) up to the colon, e.g. 'def f(a, b=1) -> str'."""
+    if node.body:
+        header = "".join(lines[node.lineno - 1:node.body[0].lineno - 1])
+    else:
+        header = lines[node.lineno - 1]
+    header = " ".join(line.strip() for line in header.splitlines())
+    return header.split('"""')[0].split("'''")[0].rstrip(": ").strip() or header.strip()
+
+
+def _called_name(call):
+    func = call.func
+    if isinstance(func, ast.Name):
+        return func.id
+    if isinstance(func, ast.Attribute):
+        return func.attr
+    return None
+
+
+def extract_symbols(source, file_path):
+    """
+    (symbols, calls) for one Python file. Symbols are functions, classes and
+    methods with their line span, signature and docstring; calls are
+    (callee name, caller qualname, line) for every call made inside them.
+    Returns ([], []) when the file does not parse.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return [], []
+    lines = source.splitlines(keepends=True)
+    symbols, calls = [], []
+
+    def visit(nodes, prefix, in_class):
+        for node in nodes:
+            if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                continue
+            qualname = f"{prefix}.{node.name}" if prefix else node.name
+            if isinstance(node, ast.ClassDef):
+                kind = "class"
+            else:
+                kind = "method" if in_class else "function"
+            decorators = [d.lineno for d in node.decorator_list]
+            docstring = ast.get_docstring(node) or ""
+            symbols.append({
+                "name": node.name, "qualname": qualname, "kind": kind, "file": file_path,
+                "start_line": min([node.lineno] + decorators), "end_line": node.end_lineno,
+                "signature": _signature(node, lines),
+                "docstring": docstring[:_DOC_CHARS],
+            })
+            if kind != "class":
+                for child in ast.walk(node):
+                    if isinstance(child, ast.Call):
+                        callee = _called_name(child)
+                        if callee:
+                            calls.append([callee, qualname, child.lineno])
+            visit(node.body, qualname, kind == "class")
+
+    visit(tree.body, "", False)
+    # Calls made at module level (scripts, registrations)
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        for child in ast.walk(node):
+            if isinstance(child, ast.Call) and _called_name(child):
+                calls.append([_called_name(child), "<module>", child.lineno])
+    return symbols, calls
+
+
+class SymbolIndex:
+    """
+    Persistent name -> definition / callers table for the codebase, stored
+    as one JSON file next to the vector store. Entries are kept per file
+    with the file's sha256, so only changed files are re-parsed.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or SYMBOL_INDEX_PATH
+        self.files = {}
+        self._lock = threading.Lock()
+        self._by_name = None
+        self._callers = None
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self.files = json.load(f).get("files", {})
+            except (OSError, ValueError) as e:
+                print(f"[WARN] Ignoring unreadable symbol index {self.path}: {e}")
+
+    # -- maintenance ---------------------------------------------------------
+
+    def file_hash(self, file_path):
+        entry = self.files.get(file_path)
+        return entry["sha256"] if entry else None
+
+    def update_file(self, file_path, source, sha256):
+        symbols, calls = extract_symbols(source, file_path)
+        with self._lock:
+            self.files[file_path] = {"sha256": sha256, "symbols": symbols, "calls": calls}
+            self._by_name = self._callers = None
+
+    def remove_file(self, file_path):
+        with self._lock:
+            if self.files.pop(file_path, None) is not None:
+                self._by_name = self._callers = None
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with self._lock, open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files}, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    # -- queries -------------------------------------------------------------
+
+    def _tables(self):
+        with self._lock:
+            if self._by_name is None:
+                by_name, callers = {}, {}
+                for entry in self.files.values():
+                    for symbol in entry["symbols"]:
+                        by_name.setdefault(symbol["name"], []).append(symbol)
+                        if symbol["qualname"] != symbol["name"]:
+                            by_name.setdefault(symbol["qualname"], []).append(symbol)
+                for file_path, entry in self.files.items():
+                    for callee, caller, line in entry["calls"]:
+                        callers.setdefault(callee, []).append(
+                            {"caller": caller, "file": file_path, "line": line})
+                self._by_name, self._callers = by_name, callers
+            return self._by_name, self._callers
+
+    def __len__(self):
+        return sum(len(entry["symbols"]) for entry in self.files.values())
+
+    def lookup(self, name):
+        """Definitions named `name` (a plain or a dotted qualified name)."""
+        by_name, _ = self._tables()
+        return list(by_name.get(name, []))
+
+    def callers(self, name):
+        """Call sites of `name` (matched by the called name, e.g. obj.name())."""
+        _, callers = self._tables()
+        return list(callers.get(name.rsplit(".", 1)[-1], []))
+
+    def find_in_text(self, text):
+        """Known symbols mentioned in `text`, most specific (longest) first."""
+        by_name, _ = self._tables()
+        found = []
+        for token in sorted(set(_IDENT_RE.findall(text)), key=len, reverse=True):
+            token = token.strip(".")
+            for candidate in (token, token.rsplit(".", 1)[-1]):
+                if candidate in by_name and candidate not in found:
+                    found.append(candidate)
+                    break
+        return found
+
+    def source_of(self, symbol):
+        """
+        Source text of a definition, read from its file, or None if the file
+        is gone or has changed since it was indexed (the line span would
+        point at other code).
+        """
+        try:
+            with open(symbol["file"], "rb") as f:
+                raw = f.read()
+        except OSError:
+            return None
+        entry = self.files.get(symbol["file"])
+        if entry is None or hashlib.sha256(raw).hexdigest() != entry["sha256"]:
+            return None
+        # Universal newlines, so lines are counted the way ast counted them
+        lines = io.StringIO(raw.decode("utf-8", errors="replace"), newline=None).readlines()
+        return "".join(lines[symbol["start_line"] - 1:symbol["end_line"]])
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_symbol_index():
+    """The on-disk symbol index, loaded once per process."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SymbolIndex()
+        return _index
@@ -1,10 +1,51 @@
 # ingest_codebase.py
 
+import argparse
+import hashlib
+import json
 import os
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain_community.document_loaders import TextLoader, PythonLoader
+from agent.embeddings import get_embeddings
+from agent.vectorstore import open_vectorstore
+from ingest.code_chunker import chunk_python
+from ingest.pipeline import run_pipeline
+from ingest.symbol_index import SymbolIndex
+from ingest.discovery import (IgnoreMatcher, LOADERS as _ALL_LOADERS, iter_documents, load_file as _load_file,
+                              parallel_map, walk_files)
+
+PERSIST_DIR = "./chroma_db_codebase"
+MANIFEST_PATH = os.path.join(PERSIST_DIR, "ingest_manifest.json")
+SYMBOLS_PATH = os.path.join(PERSIST_DIR, "symbols.json")
+# Bumped whenever chunking changes, so files chunked the old way are redone
+CHUNKER_VERSION = "ast-1"
+
+# We will ignore the virtual environment, pycache, git history, and our own DB
+IGNORE_PATTERNS = [
+    "venv/",
+    "__pycache__/",
+    ".git/",
+    "chroma_db_codebase/",
+    "node_modules/",
+    "__init__.py",  # Often not useful for context
+    ".env",
+    "docs/"
+]
+
+# Compiled once; gitignore semantics (unanchored names match at any depth)
+IGNORE = IgnoreMatcher(IGNORE_PATTERNS)
+LOADERS = {ext: _ALL_LOADERS[ext] for ext in (".py", ".md", ".txt")}
+
+
+def discover_files():
+    """
+    Yields the path of every .py/.md/.txt file under the current directory,
+    respecting the ignore list.
+    """
+    return walk_files(".", tuple(LOADERS), IGNORE)
+
+
+def load_file(file_path):
+    return _load_file(file_path, LOADERS)
 
 
 def load_and_process_files():
@@ -12,70 +53,221 @@ def load_and_process_files():
     Finds, loads, and processes all relevant files in the current directory,
     respecting a defined ignore list.
     """
-    # 1. Define patterns to ignore
-    # We will ignore the virtual environment, pycache, git history, and our own DB
-    ignore_patterns = [
-        "venv/",
-        "__pycache__/",
-        ".git/",
-        "chroma_db_codebase/",
-        "node_modules/",
-        "__init__.py",  # Often not useful for context
-        ".env",
-        "docs/"
-    ]
-
-    all_documents = []
     print("[INFO] Starting file discovery...")
+    all_documents = list(iter_documents(".", ignore=IGNORE, loaders=LOADERS))
+    print(f"[INFO] Loaded {len(all_documents)} relevant documents.")
+    return all_documents
 
-    # 2. Walk through the directory tree
-    for root, dirs, files in os.walk("."):
-        # Check if the current directory should be ignored
-        # We modify dirs in-place to prevent os.walk from descending into them
-        dirs[:] = [d for d in dirs if not any(os.path.join(root, d).startswith(
-            p) for p in [os.path.normpath(pat) for pat in ignore_patterns])]
 
-        for file in files:
-            file_path = os.path.join(root, file)
+# --- Manifest helpers ---
 
-            # Skip if the file path matches any ignore pattern
-            if any(os.path.normpath(file_path).startswith(p) for p in [os.path.normpath(pat) for pat in ignore_patterns]):
-                continue
+def _hash_file(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
-            # 3. Load the file based on its extension
-            try:
-                if file.endswith(".py"):
-                    loader = PythonLoader(file_path)
-                    all_documents.extend(loader.load())
-                elif file.endswith(".md") or file.endswith(".txt"):
-                    loader = TextLoader(file_path, encoding='utf-8')
-                    all_documents.extend(loader.load())
-            except Exception as e:
-                print(f"[WARN] Error loading file {file_path}: {e}")
 
-    print(f"[INFO] Loaded {len(all_documents)} relevant documents.")
-    return all_documents
+def chunk_id(file_path, index, text):
+    """Stable ID: the same chunk of the same file always maps to the same vector."""
+    text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    return hashlib.sha1(f"{file_path}:{index}:{text_hash}".encode()).hexdigest()
+
+
+def chunk_keys(chunks):
+    """
+    Position-independent keys for chunk_id: the symbol's qualified name (and
+    part), so adding a function does not change the IDs of the ones after it
+    and only edited symbols get re-embedded. Text-split chunks keep their
+    index.
+    """
+    keys, seen = [], {}
+    for index, chunk in enumerate(chunks):
+        qualname = chunk.metadata.get("qualname")
+        if qualname is None:
+            keys.append(index)
+            continue
+        key = f"{qualname}#{chunk.metadata.get('part', 0)}"
+        seen[key] = seen.get(key, 0) + 1
+        keys.append(key if seen[key] == 1 else f"{key}~{seen[key]}")
+    return keys
+
+
+def split_file(file_path, splitter):
+    """AST chunks for Python files that parse, text splits for everything else."""
+    documents = load_file(file_path)
+    if file_path.endswith(".py") and len(documents) == 1:
+        chunks = chunk_python(documents[0].page_content, file_path)
+        if chunks is not None:
+            return chunks
+    return splitter.split_documents(documents)
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_manifest(manifest):
+    os.makedirs(PERSIST_DIR, exist_ok=True)
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def sync_symbol_index(manifest):
+    """
+    Brings the symbol table (name -> definition, signature, callers) in line
+    with the manifest: Python files whose content hash changed are re-parsed,
+    files no longer ingested are dropped. Returns the number of files parsed.
+    """
+    index = SymbolIndex(SYMBOLS_PATH)
+    for file_path in set(index.files) - set(manifest):
+        index.remove_file(file_path)
+
+    stale = [file_path for file_path, entry in manifest.items()
+             if file_path.endswith(".py") and index.file_hash(file_path) != entry["sha256"]]
+
+    def parse(file_path):
+        with open(file_path, encoding="utf-8", errors="replace") as f:
+            index.update_file(file_path, f.read(), manifest[file_path]["sha256"])
+
+    for file_path, _, error in parallel_map(parse, stale):
+        if error is not None:
+            print(f"[WARN] Could not index symbols of {file_path}: {error}")
+    index.save()
+    print(f"[INFO] Symbol index: {len(index)} symbols, {len(stale)} files re-parsed.")
+    return len(stale)
+
 
 # --- Main Ingestion Logic ---
 
+def ingest_codebase(full=False):
+    """
+    Incrementally syncs ./chroma_db_codebase with the working tree.
+
+    A manifest records (mtime, size, sha256, chunk IDs) for every ingested
+    file. Files whose mtime/size are unchanged are skipped without being read,
+    files whose content hash is unchanged are skipped without being re-split,
+    and only new or modified files are chunked, embedded and upserted. Vectors
+    belonging to modified or deleted files are removed, so the store never
+    accumulates duplicates. Returns a dict of counters.
+    """
+    embeddings = get_embeddings(cached=True)
+    splitter = RecursiveCharacterTextSplitter.from_language(
+        language="python", chunk_size=1000, chunk_overlap=100
+    )
+    db = open_vectorstore(PERSIST_DIR, embeddings)
+
+    manifest = None if full else load_manifest()
+    if manifest is None:
+        # No manifest (first run, or stores written before incremental
+        # ingestion existed): start from an empty collection.
+        print("[INFO] Full rebuild: clearing existing codebase collection...")
+        db.delete_collection()
+        db = open_vectorstore(PERSIST_DIR, embeddings)
+        manifest = {}
+
+    counts = {"skipped": 0, "added": 0, "updated": 0, "deleted": 0,
+              "failed": 0, "chunks_upserted": 0, "chunks_unchanged": 0,
+              "chunks_deleted": 0}
+    seen = set()
+
+    def scan(file_path):
+        """Runs on the thread pool: decides whether the file changed and,
+        if it did, reads and splits it."""
+        entry = manifest.get(file_path)
+        if entry and entry.get("chunker") != CHUNKER_VERSION:
+            entry = None
+        stat = os.stat(file_path)
+        if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+            return stat, None, None
+
+        content_hash = _hash_file(file_path)
+        if entry and entry["sha256"] == content_hash:
+            return stat, content_hash, None
+        return stat, content_hash, split_file(file_path, splitter)
+
+    def changed_chunks():
+        """Yields the chunks of new/modified files, tagged with their stable
+        IDs, and updates the manifest as it goes."""
+        for file_path, result, error in parallel_map(scan, discover_files()):
+            seen.add(file_path)
+            if error is not None:
+                print(f"[WARN] Error loading file {file_path}: {error}")
+                counts["failed"] += 1
+                continue
+
+            stat, content_hash, chunks = result
+            entry = manifest.get(file_path)
+            if chunks is None:
+                if content_hash is not None:
+                    # Touched but not changed: remember the new mtime only
+                    entry.update(mtime=stat.st_mtime, size=stat.st_size)
+                counts["skipped"] += 1
+                continue
+
+            ids = [chunk_id(file_path, key, chunk.page_content)
+                   for key, chunk in zip(chunk_keys(chunks), chunks)]
+            stored = set()
+            if entry:
+                current = set(ids)
+                stale = [old for old in entry["chunk_ids"] if old not in current]
+                if stale:
+                    db.delete(ids=stale)
+                    counts["chunks_deleted"] += len(stale)
+                if entry.get("chunker") == CHUNKER_VERSION:
+                    # Unchanged symbols are already in the store
+                    stored = set(entry["chunk_ids"])
+                counts["updated"] += 1
+            else:
+                counts["added"] += 1
+
+            manifest[file_path] = {"mtime": stat.st_mtime, "size": stat.st_size,
+                                   "sha256": content_hash, "chunk_ids": ids,
+                                   "chunker": CHUNKER_VERSION}
+            for chunk, cid in zip(chunks, ids):
+                if cid in stored:
+                    counts["chunks_unchanged"] += 1
+                    continue
+                chunk.metadata["chunk_id"] = cid
+                yield chunk
+
+    print("[INFO] Starting file discovery...")
+    stats = run_pipeline(changed_chunks(), embeddings, db)
+    counts["chunks_upserted"] = stats.upsert.items
 
-# 1. Load all relevant documents using our new function
-documents = load_and_process_files()
+    for file_path in sorted(set(manifest) - seen):
+        stale = manifest.pop(file_path)["chunk_ids"]
+        if stale:
+            db.delete(ids=stale)
+            counts["chunks_deleted"] += len(stale)
+        counts["deleted"] += 1
 
-# 2. Split documents into smaller chunks
-print("[INFO] Splitting documents into chunks...")
-python_splitter = RecursiveCharacterTextSplitter.from_language(
-    language="python", chunk_size=1000, chunk_overlap=100
-)
-chunks = python_splitter.split_documents(documents)
-print(f"[INFO] Created {len(chunks)} chunks.")
+    save_manifest(manifest)
+    counts["symbol_files_parsed"] = sync_symbol_index(manifest)
 
-# 3. Embed and Store
-print("[INFO] Generating embeddings and storing in ChromaDB...")
-embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-persist_dir = "./chroma_db_codebase"
+    print(f"[INFO] Files: {counts['skipped']} skipped, {counts['added']} added, "
+          f"{counts['updated']} updated, {counts['deleted']} deleted, "
+          f"{counts['failed']} failed.")
+    print(f"[INFO] Chunks: {counts['chunks_upserted']} upserted, "
+          f"{counts['chunks_unchanged']} unchanged, {counts['chunks_deleted']} deleted.")
+    print(f"[INFO] Pipeline stats: {stats.as_dict()}")
+    if hasattr(embeddings, "stats"):
+        print(f"[INFO] Embedding cache: {embeddings.stats()}")
+    print(f"[✅] Successfully ingested codebase into {PERSIST_DIR}")
+    return counts
 
-db = Chroma.from_documents(chunks, embeddings, persist_directory=persist_dir)
-db.persist()
 
-print(f"[✅] Successfully ingested codebase into {persist_dir}")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Ingest the codebase into ./chroma_db_codebase")
+    parser.add_argument("--full", action="store_true",
+                        help="ignore the manifest and rebuild the whole store")
+    args = parser.parse_args()
+    ingest_codebase(full=args.full)
@@ -0,0 +1,54 @@
+# test_llm_cache.py
+# Offline checks that streamed answers share response cache entries with invoke().
+
+import asyncio
+import os
+import tempfile
+
+from langchain_core.prompts import PromptTemplate
+
+from agent.llm_cache import (ResponseCache, alookup_cached, lookup_cached,
+                             update_cached)
+from agent.router import SimulatedChatModel
+
+prompt = PromptTemplate.from_template("Question: {question}\nHelpful Answer:")
+
+
+class CountingModel(SimulatedChatModel):
+    calls: int = 0
+
+    def _generate(self, *args, **kwargs):
+        self.calls += 1
+        return super()._generate(*args, **kwargs)
+
+
+def _model(workdir):
+    cache = ResponseCache(path=os.path.join(workdir, "responses.sqlite"), semantic=False)
+    return CountingModel(latency_ms=0, jitter_ms=0, cache=cache)
+
+
+def test_invoke_then_stream_hits_cache():
+    with tempfile.TemporaryDirectory() as workdir:
+        model = _model(workdir)
+        prompt_value = prompt.invoke({"question": "what is BM25?"})
+        answer = model.invoke(prompt_value).content
+        assert lookup_cached(model, prompt_value) == answer
+        assert asyncio.run(alookup_cached(model, prompt_value)) == answer
+        assert lookup_cached(model, prompt.invoke({"question": "other"})) is None
+        assert model.calls == 1
+
+
+def test_stream_then_invoke_hits_cache():
+    with tempfile.TemporaryDirectory() as workdir:
+        model = _model(workdir)
+        prompt_value = prompt.invoke({"question": "what is RRF?"})
+        streamed = "".join(chunk.content for chunk in model.stream(prompt_value))
+        update_cached(model, prompt_value, streamed)
+        assert model.invoke(prompt_value).content == streamed
+        assert model.calls == 0
+
+
+if __name__ == "__main__":
+    for test in (test_invoke_then_stream_hits_cache, test_stream_then_invoke_hits_cache):
+        test()
+        print(f"✅ {test.__name__}")
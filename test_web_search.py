@@ -0,0 +1,62 @@
+# test_web_search.py
+# Offline checks for tools/web_search.py against the stub backend (no network).
+
+import os
+import tempfile
+import time
+
+import pytest
+
+from tools import web_search
+from tools.web_search import SearchCache, expand_query, merge_results, search
+
+
+@pytest.fixture(autouse=True)
+def no_stub_latency(monkeypatch):
+    monkeypatch.setattr(web_search, "STUB_SEARCH_LATENCY_MS", 0)
+
+
+def test_expand_query():
+    queries = expand_query("What is the difference between AI and Machine Learning?")
+    assert queries[0] == "What is the difference between AI and Machine Learning?"
+    assert "what is AI" in queries and "what is Machine Learning" in queries
+    assert expand_query("python vs java")[1:3] == ["what is python", "what is java"]
+    assert len(expand_query("a? b? c? d? e?", max_queries=2)) == 2
+
+
+def test_merge_results():
+    first = [{"title": "A", "body": "x", "href": "https://www.example.com/a?utm_source=s"},
+             {"title": "B", "body": "y", "href": "https://example.com/b"}]
+    second = [{"title": "A2", "body": "z", "href": "https://example.com/a/"},
+              {"title": "B", "body": "y", "href": "https://mirror.org/b"},
+              {"title": "C", "body": "w", "href": ""}]
+    merged = merge_results([first, second], max_results=10)
+    # Same URL (tracking params, www. and trailing slash aside) and same
+    # title + snippet are duplicates; round-robin keeps the first query first
+    assert [r["title"] for r in merged] == ["A", "B", "C"]
+    assert len(merge_results([first, second], max_results=2)) == 2
+
+
+def test_search_cache_and_ttl(monkeypatch):
+    with tempfile.TemporaryDirectory() as workdir:
+        cache = SearchCache(path=os.path.join(workdir, "search.sqlite"), ttl=0.2)
+        monkeypatch.setattr(web_search, "get_search_cache", lambda: cache)
+        results = search("rust borrow checker", max_results=4, expand=True, backend="stub")
+        assert len(results) == 4
+        assert len({r["href"] for r in results}) == 4
+        misses = cache.counters["misses"]
+        assert search("Rust  borrow checker?", max_results=4, expand=True, backend="stub") == results
+        assert cache.counters["misses"] == misses  # normalized queries hit the cache
+
+        time.sleep(0.3)
+        search("rust borrow checker", max_results=4, expand=True, backend="stub")
+        assert cache.counters["expired"] > 0
+
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(web_search, "STUB_SEARCH_LATENCY_MS", 0)
+        test_expand_query()
+        test_merge_results()
+        test_search_cache_and_ttl(monkeypatch)
+    print("✅ web search tests passed")
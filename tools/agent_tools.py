@@ -2,15 +2,12 @@
 
 import os
 import re
-from langchain import hub
-# New agent constructor
-from langchain.agents import create_tool_calling_agent, AgentExecutor
+import threading
+from typing import Optional
 from langchain.tools import tool
-from langchain_community.vectorstores import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain.tools.retriever import create_retriever_tool
 from pydantic.v1 import BaseModel, Field
-from agent.llm_manager import get_llm
+from tools.file_access import LIST_MAX_DEPTH, LIST_MAX_ENTRIES, list_tree, read_session, read_text
+from tools.file_editor import apply_patch as apply_unified_diff, replace_in_file, undo_last_edit, write_text
 
 # ==============================================================================
 #  TOOL DEFINITIONS
@@ -24,23 +21,43 @@ def _clean_path(path: str) -> str:
     return path
 
 
-@tool
-def list_files(directory: str = ".") -> str:
-    """Lists all files and directories in a given directory."""
+class ListFilesInput(BaseModel):
+    directory: str = Field(default=".", description="The directory to list.")
+    depth: int = Field(default=LIST_MAX_DEPTH,
+                       description="How many directory levels to descend (1 = only this directory).")
+    max_entries: int = Field(default=LIST_MAX_ENTRIES, description="Maximum number of entries to return.")
+
+
+@tool(args_schema=ListFilesInput)
+def list_files(directory: str = ".", depth: int = LIST_MAX_DEPTH,
+               max_entries: int = LIST_MAX_ENTRIES) -> str:
+    """Lists the files and directories in a directory (directories end with '/'),
+    optionally recursing `depth` levels. Long listings are cut off at `max_entries`."""
     cleaned_directory = _clean_path(directory)
     try:
-        return "\n".join(os.listdir(cleaned_directory))
+        return list_tree(cleaned_directory, depth=depth, max_entries=max_entries)
     except Exception as e:
         return f"Error listing files: {e}"
 
 
-@tool
-def read_file(file_path: str) -> str:
-    """Reads the entire content of a specified file."""
+class ReadFileInput(BaseModel):
+    file_path: str = Field(description="The path of the file to read.")
+    start_line: Optional[int] = Field(default=None, description="First line to read (1-based).")
+    end_line: Optional[int] = Field(default=None, description="Last line to read (inclusive).")
+    byte_offset: Optional[int] = Field(default=None, description="Read from this byte offset instead of by lines.")
+    byte_length: Optional[int] = Field(default=None, description="Number of bytes to read from byte_offset.")
+
+
+@tool(args_schema=ReadFileInput)
+def read_file(file_path: str, start_line: Optional[int] = None, end_line: Optional[int] = None,
+              byte_offset: Optional[int] = None, byte_length: Optional[int] = None) -> str:
+    """Reads a file, or a line or byte range of it. The first line of the result
+    names the range returned and the file's line count; large files are cut off
+    with a note saying which start_line to read next."""
     cleaned_path = _clean_path(file_path)
     try:
-        with open(cleaned_path, 'r', encoding='utf-8') as f:
-            return f.read()
+        return read_text(cleaned_path, start_line=start_line, end_line=end_line,
+                         byte_offset=byte_offset, byte_length=byte_length)
     except Exception as e:
         return f"Error reading file: {e}"
 
@@ -52,39 +69,112 @@ class WriteFileInput(BaseModel):
 
 @tool(args_schema=WriteFileInput)
 def write_file(file_path: str, content: str) -> str:
-    """Writes or overwrites the content of a specified file."""
+    """Writes or overwrites the content of a specified file. Use it for new files;
+    to change an existing file use edit_file or apply_patch instead."""
     cleaned_path = _clean_path(file_path)
     try:
-        with open(cleaned_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        write_text(cleaned_path, content)
         return f"Successfully wrote to {cleaned_path}."
     except Exception as e:
         return f"Error writing to file: {e}"
 
+
+class EditFileInput(BaseModel):
+    file_path: str = Field(description="The path of the file to edit.")
+    search: str = Field(description="The exact text to replace, copied from the file, "
+                                    "with enough lines to be unique.")
+    replace: str = Field(description="The text to put in its place.")
+    replace_all: bool = Field(default=False, description="Replace every occurrence instead of exactly one.")
+
+
+@tool(args_schema=EditFileInput)
+def edit_file(file_path: str, search: str, replace: str, replace_all: bool = False) -> str:
+    """Replaces one exact piece of text in a file with new text, without
+    resending the rest of the file. Fails without writing if the text is not
+    found or matches more than once."""
+    cleaned_path = _clean_path(file_path)
+    try:
+        count = replace_in_file(cleaned_path, search, replace, replace_all=replace_all)
+        return f"Edited {cleaned_path} ({count} replacement{'s' if count != 1 else ''})."
+    except Exception as e:
+        return f"Error editing file: {e}"
+
+
+class ApplyPatchInput(BaseModel):
+    diff: str = Field(description="A unified diff with '--- a/path' / '+++ b/path' headers "
+                                  "and '@@' hunks with a few context lines.")
+
+
+@tool(args_schema=ApplyPatchInput)
+def apply_patch(diff: str) -> str:
+    """Applies a unified diff to one or more files. Hunks are matched by their
+    context lines; if any hunk does not match, no file is changed."""
+    try:
+        summary = apply_unified_diff(diff)
+        return "Patched " + ", ".join(f"{path} (+{added} -{removed})"
+                                      for path, (added, removed) in summary.items()) + "."
+    except Exception as e:
+        return f"Error applying patch: {e}"
+
+
+@tool
+def undo_edit(file_path: str = "") -> str:
+    """Reverts the most recent edit, write or patch of a file (of any file if no path is given)."""
+    try:
+        restored = undo_last_edit(_clean_path(file_path) or None)
+        return f"Reverted the last edit of {restored}."
+    except Exception as e:
+        return f"Error undoing edit: {e}"
+
 # ==============================================================================
 #  AGENT SETUP (UPGRADED)
 # ==============================================================================
 
 
-# 1. Initialize the LLM
-llm = get_llm(temperature=0)
+# The tools above are plain functions and cheap to import; the LLM client,
+# hub prompt and executor are only built when the agent is first used.
+tools = [list_files, read_file, write_file, edit_file, apply_patch, undo_edit]
+
+_executor_lock = threading.Lock()
+_agent_executor = None
+
+
+def get_agent_executor():
+    global _agent_executor
+    with _executor_lock:
+        if _agent_executor is None:
+            # New agent constructor
+            from langchain.agents import create_tool_calling_agent, AgentExecutor
+            from langchain_core.tools import render_text_description
+            from agent.hub_prompts import get_hub_prompt
+            from agent.llm_manager import get_llm
+
+            # 1. Initialize the LLM
+            llm = get_llm(temperature=0, code=True)
+
+            # 2. Get the prompt template for tool calling (vendored copy, no
+            # network access needed)
+            prompt = get_hub_prompt("hwchase17/xml-agent-convo").partial(
+                tools=render_text_description(tools))
+
+            # 3. Create the agent using the new constructor
+            agent = create_tool_calling_agent(llm, tools, prompt)
 
-# 2. Define the list of all available tools
-# We will add the retriever tool separately for some models
-tools = [list_files, read_file, write_file]
+            # 4. Create the AgentExecutor
+            _agent_executor = AgentExecutor(
+                agent=agent,
+                tools=tools,
+                verbose=True
+            )
+        return _agent_executor
 
-# 3. Get the modern prompt template for tool calling
-prompt = hub.pull("hwchase17/xml-agent-convo")
 
-# 4. Create the agent using the new constructor
-agent = create_tool_calling_agent(llm, tools, prompt)
+def __getattr__(name):
+    # Keeps `from tools.agent_tools import agent_executor` working
+    if name == "agent_executor":
+        return get_agent_executor()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# 5. Create the AgentExecutor
-agent_executor = AgentExecutor(
-    agent=agent,
-    tools=tools,
-    verbose=True
-)
 
 # ==============================================================================
 #  INTERACTIVE CHAT
@@ -101,8 +191,9 @@ if __name__ == "__main__":
                 break
 
             print("\n🤖 Assistant:")
-            result = agent_executor.invoke(
-                {"input": query, "chat_history": []})
+            with read_session():
+                result = get_agent_executor().invoke(
+                    {"input": query, "chat_history": []})
             print(result.get('output'))
             print("\n")
 
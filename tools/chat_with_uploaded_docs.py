@@ -1,21 +1,134 @@
 # tools/chat_with_uploaded_docs.py
-from langchain.chains import RetrievalQA
+import os
+import time
+from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import RunnablePassthrough
+from langchain_core.output_parsers import StrOutputParser
+from agent.llm_cache import alookup_cached, aupdate_cached, lookup_cached, update_cached
 from agent.llm_manager import get_llm
-from langchain_community.vectorstores import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
+from agent.embeddings import get_embeddings
+from agent.handle_cache import HandleCache
+from agent.prompt_builder import build_context
+from agent.retriever import build_retriever
+from agent.vectorstore import open_vectorstore
+from agent.scheduler import scheduled
 
+# Open stores/retrievers/chains per user, so follow-up questions in a chat
+# session skip the sqlite open and chain construction.
+DOC_SESSION_CACHE_SIZE = int(os.getenv("DOC_SESSION_CACHE_SIZE", "64"))
+DOC_SESSION_IDLE_SECONDS = float(os.getenv("DOC_SESSION_IDLE_SECONDS", "900"))
 
-def ask_question_from_uploaded_doc(query, user_id="user_001"):
+_sessions = HandleCache("doc_sessions", max_size=DOC_SESSION_CACHE_SIZE,
+                        idle_timeout=DOC_SESSION_IDLE_SECONDS)
+
+# Same instructions RetrievalQA's "stuff" chain used, as a streamable LCEL chain
+template = """Use the following pieces of context to answer the question at the end. If you don't know the answer, just say that you don't know, don't try to make up an answer.
+
+{context}
+
+Question: {question}
+Helpful Answer:"""
+prompt = PromptTemplate.from_template(template)
+
+
+def _open_session(user_id):
     persist_dir = f"./chroma_db/{user_id}"
-    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    # Chroma, or the shared memory-mapped store with VECTOR_STORE=mmap
+    vectorstore = open_vectorstore(persist_dir, get_embeddings())
+
+    retriever = build_retriever(vectorstore, persist_dir, k=4)
+    # Doc answers are factual lookups, so identical questions may reuse them,
+    # but only within this user's store
+    model = get_llm(use_cache=True, cache_namespace=persist_dir)
+    llm = scheduled(model)
+
+    # Overlapping chunks merged, packed into the model's token budget
+    prepare = {"context": retriever | build_context, "question": RunnablePassthrough()} | prompt
+    qa_chain = prepare | llm | StrOutputParser()
+    return {"vectorstore": vectorstore, "retriever": retriever, "prepare": prepare,
+            "model": model, "llm": llm, "chain": qa_chain}
+
+
+def invalidate_user_session(user_id):
+    """Drops the cached handles for a user (called after new chunks are ingested)."""
+    _sessions.invalidate(user_id)
+
+
+def session_cache_stats():
+    return _sessions.stats()
+
+
+def _session(user_id):
+    return _sessions.get_or_create(user_id, lambda: _open_session(user_id))
+
+
+def get_doc_chain(user_id="user_001"):
+    """The (cached) LCEL Q&A chain over a user's uploaded documents: str in, str out."""
+    return _session(user_id)["chain"]
+
+
+def _token_text(chunk):
+    return chunk.content if hasattr(chunk, "content") else chunk
+
+
+def _log_stream(user_id, started, first_token, cached=False):
+    total = time.perf_counter() - started
+    print(f"[⏱️] Doc answer for {user_id}{' (cached)' if cached else ''}: first token "
+          f"{first_token if first_token is not None else total:.2f}s, total {total:.2f}s")
+
+
+def _stream_answer(query, user_id):
+    started = time.perf_counter()
+    session = _session(user_id)
+    prompt_value = session["prepare"].invoke(query)
+    # .stream() bypasses the model's response cache; share its entries by hand
+    hit = lookup_cached(session["model"], prompt_value)
+    if hit:
+        # Replayed as one chunk
+        yield hit
+        _log_stream(user_id, started, None, cached=True)
+        return
+
+    first_token, parts = None, []
+    for chunk in session["llm"].stream(prompt_value):
+        if first_token is None:
+            first_token = time.perf_counter() - started
+        parts.append(_token_text(chunk))
+        yield parts[-1]
+    update_cached(session["model"], prompt_value, "".join(parts))
+    _log_stream(user_id, started, first_token)
+
+
+async def astream_answer(query, user_id="user_001"):
+    """Async token stream of the answer (the HTTP API), sharing the response cache."""
+    started = time.perf_counter()
+    session = _session(user_id)
+    prompt_value = await session["prepare"].ainvoke(query)
+    hit = await alookup_cached(session["model"], prompt_value)
+    if hit:
+        yield hit
+        _log_stream(user_id, started, None, cached=True)
+        return
 
-    vectorstore = Chroma(persist_directory=persist_dir,
-                         embedding_function=embeddings)
+    first_token, parts = None, []
+    async for chunk in session["llm"].astream(prompt_value):
+        if first_token is None:
+            first_token = time.perf_counter() - started
+        parts.append(_token_text(chunk))
+        yield parts[-1]
+    await aupdate_cached(session["model"], prompt_value, "".join(parts))
+    _log_stream(user_id, started, first_token)
 
-    retriever = vectorstore.as_retriever()
-    llm = get_llm()
 
-    qa_chain = RetrievalQA.from_chain_type(llm=llm, retriever=retriever)
-    result = qa_chain.invoke({"query": query})
+def ask_question_from_uploaded_doc(query, user_id="user_001", stream=False):
+    """
+    Answers `query` from the user's uploaded documents. With stream=True this
+    returns a generator of answer tokens instead of the full string.
+    """
+    if stream:
+        return _stream_answer(query, user_id)
 
-    return result["result"]
+    started = time.perf_counter()
+    answer = get_doc_chain(user_id).invoke(query)
+    print(f"[⏱️] Doc answer for {user_id}: total {time.perf_counter() - started:.2f}s")
+    return answer
@@ -0,0 +1,211 @@
+# tools/file_access.py
+
+import contextvars
+import mmap
+import os
+import threading
+from contextlib import contextmanager
+
+from agent.handle_cache import HandleCache
+
+# A single read_file result is capped so one large file cannot fill the
+# agent's context window; the agent asks for further line ranges instead.
+FILE_READ_MAX_CHARS = int(os.getenv("FILE_READ_MAX_CHARS", "12000"))
+# Files at least this big are memory-mapped and only the requested range is
+# decoded
+FILE_MMAP_MIN_BYTES = int(os.getenv("FILE_MMAP_MIN_BYTES", str(1 << 20)))
+FILE_CACHE_SIZE = int(os.getenv("FILE_CACHE_SIZE", "64"))
+LIST_MAX_ENTRIES = int(os.getenv("LIST_MAX_ENTRIES", "200"))
+LIST_MAX_DEPTH = int(os.getenv("LIST_MAX_DEPTH", "1"))
+LIST_IGNORE = [".git/", "__pycache__/", "venv/", ".venv/", "node_modules/",
+               "chroma_db/", "chroma_db_codebase/", ".cache/"]
+
+
+class _Content:
+    """Line-addressable view of one version of a file. Lines end at b"\n"
+    only, and byte offsets are offsets into the file as stored on disk."""
+
+    def __init__(self, path, size):
+        self.size = size
+        self._mmap = None
+        with open(path, "rb") as f:
+            if size >= FILE_MMAP_MIN_BYTES:
+                import numpy as np
+
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._data = self._mmap
+                newlines = (np.flatnonzero(np.frombuffer(self._mmap, dtype=np.uint8) == 10) + 1).tolist()
+            else:
+                self._data = f.read()
+                newlines, i = [], self._data.find(b"\n")
+                while i != -1:
+                    newlines.append(i + 1)
+                    i = self._data.find(b"\n", i + 1)
+        # Byte offset at which each line starts, plus the end of the file
+        self._starts = [0] + newlines
+        if self._starts[-1] != len(self._data):
+            self._starts.append(len(self._data))
+        self.line_count = len(self._starts) - 1
+
+    def lines(self, start, end):
+        """Text of lines start..end (1-based, inclusive)."""
+        raw = self._data[self._starts[start - 1]:self._starts[end]]
+        return raw.decode("utf-8", errors="replace")
+
+    def bytes(self, offset, length):
+        return self._data[offset:offset + length].decode("utf-8", errors="replace")
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+
+
+# Keyed by (path, mtime, size): an edited file is simply a new key, and the
+# old version ages out of the LRU
+_contents = HandleCache("file_contents", max_size=FILE_CACHE_SIZE,
+                        on_evict=lambda content: content.close())
+
+
+class ReadSession:
+    """Token accounting and repeat detection for the file tools in one agent task."""
+
+    def __init__(self):
+        self.seen = set()
+        self.stats = {"reads": 0, "repeats": 0, "listings": 0, "chars": 0, "tokens": 0}
+        self._lock = threading.Lock()
+
+    def record(self, kind, text):
+        from agent.prompt_builder import estimate_tokens
+        with self._lock:
+            self.stats[kind] += 1
+            self.stats["chars"] += len(text)
+            self.stats["tokens"] += estimate_tokens(text)
+        return text
+
+
+_session = contextvars.ContextVar("file_read_session", default=None)
+
+
+@contextmanager
+def read_session(label="File tools"):
+    """
+    Scope for one agent task: repeated identical reads of an unchanged file
+    return a short note instead of the content again, and the tokens the
+    file tools returned are printed at the end.
+    """
+    session = ReadSession()
+    token = _session.set(session)
+    try:
+        yield session
+    finally:
+        _session.reset(token)
+        stats = session.stats
+        print(f"[📊] {label}: {stats['reads']} reads, {stats['repeats']} repeats skipped, "
+              f"{stats['listings']} listings, ~{stats['tokens']} tokens returned")
+
+
+def _record(kind, text):
+    session = _session.get()
+    return session.record(kind, text) if session is not None else text
+
+
+def _open(path):
+    stat = os.stat(path)
+    key = (os.path.realpath(path), stat.st_mtime_ns, stat.st_size)
+    return key, _contents.get_or_create(key, lambda: _Content(path, stat.st_size))
+
+
+def read_text(path, start_line=None, end_line=None, byte_offset=None, byte_length=None,
+              max_chars=None):
+    """
+    Reads part of a file for an LLM: a line range (1-based, inclusive), a
+    byte range, or the whole file, capped at `max_chars` with a marker that
+    says how to continue. The result starts with a one-line header naming
+    the range returned.
+    """
+    max_chars = max_chars or FILE_READ_MAX_CHARS
+    key, content = _open(path)
+    request = (key, start_line, end_line, byte_offset, byte_length, max_chars)
+    session = _session.get()
+    if session is not None:
+        with session._lock:
+            repeat = request in session.seen
+            session.seen.add(request)
+        if repeat:
+            return _record("repeats", f"[{path}: unchanged since you read this range earlier "
+                                      f"in this task; content omitted]")
+
+    if byte_offset is not None or byte_length is not None:
+        offset = max(0, byte_offset or 0)
+        length = min(byte_length or max_chars, max_chars)
+        text = content.bytes(offset, length)
+        end = min(content.size, offset + length)
+        return _record("reads", f"[{path} bytes {offset}-{end} of {content.size}]\n{text}")
+
+    total = content.line_count
+    if total == 0:
+        return _record("reads", f"[{path} is empty]")
+    start = min(max(1, start_line or 1), total)
+    end = min(max(start, end_line or total), total)
+
+    text = content.lines(start, end)
+    truncated = len(text) > max_chars
+    if truncated:
+        # Cut at the last whole line that fits
+        cut = text.rfind("\n", 0, max_chars)
+        if cut >= 0:
+            text = text[:cut + 1]
+            end = start + text.count("\n") - 1
+        else:
+            text, end = text[:max_chars], start
+    header = f"[{path} lines {start}-{end} of {total}]"
+    if truncated:
+        text += (f"\n… [truncated at {max_chars} chars; call read_file with "
+                 f"start_line={end + 1} to continue]")
+    return _record("reads", f"{header}\n{text}")
+
+
+def list_tree(directory=".", depth=None, max_entries=None):
+    """
+    Lists `directory` down to `depth` levels (1 = just its entries), at most
+    `max_entries` lines, directories first and marked with a trailing '/'.
+    VCS, cache and virtualenv directories are skipped.
+    """
+    from ingest.discovery import IgnoreMatcher
+
+    depth = depth or LIST_MAX_DEPTH
+    max_entries = max_entries or LIST_MAX_ENTRIES
+    ignore = IgnoreMatcher(LIST_IGNORE)
+    lines, truncated = [], False
+
+    def walk(rel_dir, level):
+        nonlocal truncated
+        try:
+            with os.scandir(os.path.join(directory, rel_dir) if rel_dir else directory) as it:
+                entries = sorted(it, key=lambda e: (not e.is_dir(follow_symlinks=False), e.name))
+        except OSError as e:
+            lines.append(f"{'  ' * level}[cannot list: {e.strerror}]")
+            return
+        for entry in entries:
+            if len(lines) >= max_entries:
+                truncated = True
+                return
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if ignore.matches(rel_path, is_dir):
+                continue
+            lines.append(f"{'  ' * level}{entry.name}{'/' if is_dir else ''}")
+            if is_dir and level + 1 < depth:
+                walk(rel_path, level + 1)
+
+    if not os.path.isdir(directory):
+        raise NotADirectoryError(f"{directory} is not a directory")
+    walk("", 0)
+    if truncated:
+        lines.append(f"… [listing stopped at {max_entries} entries; list a subdirectory "
+                     f"or use a smaller depth]")
+    return _record("listings", "\n".join(lines))
+
+
+def cache_stats():
+    return _contents.stats()
@@ -0,0 +1,309 @@
+# tools/file_editor.py
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+# Every edit records the previous content here so it can be undone
+EDIT_JOURNAL_DIR = os.getenv("EDIT_JOURNAL_DIR", "./.cache/edit_journal")
+EDIT_JOURNAL_MAX = int(os.getenv("EDIT_JOURNAL_MAX", "100"))
+
+_HUNK_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+# git's extended header lines between files; they end the previous hunk
+_GIT_HEADER_RE = re.compile(r"^(diff --git |index |(new|deleted) file mode |(old|new) mode |"
+                            r"(dis)?similarity index |rename (from|to) |copy (from|to) |Binary files )")
+# Only these end a line: str.splitlines() also splits on \x0c, \x1c-\x1e,
+# \x85, \u2028 and \u2029, which would turn them into newlines on write
+_NEWLINE_RE = re.compile(r"(\r\n|\n|\r)")
+_lock = threading.Lock()
+
+
+class EditError(ValueError):
+    """An edit that cannot be applied as given (text not found, ambiguous
+    match, hunk does not fit the file). Nothing was written."""
+
+
+def _sha(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest() if text is not None else None
+
+
+def _read(path):
+    try:
+        with open(path, encoding="utf-8", newline="") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def atomic_write(path, text):
+    """Writes via a temp file in the same directory and rename, so readers
+    never see a half-written file. Keeps the original file's permissions."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".edit-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(path):
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# --- Undo journal ---
+
+def _journal(path, before, after):
+    """Records an edit; returns the journal entry's path."""
+    os.makedirs(EDIT_JOURNAL_DIR, exist_ok=True)
+    entries = sorted(os.listdir(EDIT_JOURNAL_DIR))
+    sequence = int(entries[-1].split(".")[0]) + 1 if entries else 1
+    entry = {"path": os.path.abspath(path), "before": before,
+             "after_sha256": _sha(after), "time": time.time()}
+    entry_path = os.path.join(EDIT_JOURNAL_DIR, f"{sequence:08d}.json")
+    with open(entry_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    for name in entries[:max(0, len(entries) + 1 - EDIT_JOURNAL_MAX)]:
+        os.remove(os.path.join(EDIT_JOURNAL_DIR, name))
+    return entry_path
+
+
+def _commit(changes):
+    """
+    Writes {path: (before, after)}, journalling each file first. If a write
+    fails, the files already written are put back, so a multi-file patch is
+    applied completely or not at all.
+    """
+    done = []
+    try:
+        for path, (before, after) in changes.items():
+            entry_path = _journal(path, before, after)
+            done.append((path, before, entry_path))
+            atomic_write(path, after)
+    except BaseException:
+        for path, before, entry_path in reversed(done):
+            if before is None:
+                if os.path.exists(path):
+                    os.remove(path)
+            else:
+                atomic_write(path, before)
+            os.remove(entry_path)
+        raise
+
+
+def undo_last_edit(path=None):
+    """
+    Restores the content a file had before its most recent edit (the most
+    recent edit of any file if `path` is None). Refuses when the file was
+    changed again since, so undo never throws away someone else's work.
+    """
+    with _lock:
+        entries = sorted(os.listdir(EDIT_JOURNAL_DIR)) if os.path.isdir(EDIT_JOURNAL_DIR) else []
+        target = os.path.abspath(path) if path else None
+        for name in reversed(entries):
+            entry_path = os.path.join(EDIT_JOURNAL_DIR, name)
+            with open(entry_path, encoding="utf-8") as f:
+                entry = json.load(f)
+            if target and entry["path"] != target:
+                continue
+            if _sha(_read(entry["path"])) != entry["after_sha256"]:
+                raise EditError(f"{entry['path']} was modified after the last edit; not undoing")
+            if entry["before"] is None:
+                os.remove(entry["path"])
+            else:
+                atomic_write(entry["path"], entry["before"])
+            os.remove(entry_path)
+            return entry["path"]
+    raise EditError(f"No edit to undo{f' for {path}' if path else ''}")
+
+
+def write_text(path, text):
+    """Creates or overwrites a file atomically, journalled like any edit."""
+    with _lock:
+        _commit({path: (_read(path), text)})
+
+
+# --- Search / replace ---
+
+def replace_in_file(path, search, replace, replace_all=False):
+    """
+    Replaces the exact text `search` with `replace`. The search text must
+    occur exactly once unless `replace_all` is set; on no match or an
+    ambiguous match nothing is written. Returns the number of replacements.
+    """
+    with _lock:
+        before = _read(path)
+        if before is None:
+            raise EditError(f"{path} does not exist")
+        if not search:
+            raise EditError("search text is empty")
+        count = before.count(search)
+        if count == 0:
+            # The LLM often drops the file's \r\n line endings
+            if "\r\n" in before and search.replace("\r\n", "\n").replace("\n", "\r\n") in before:
+                search = search.replace("\r\n", "\n").replace("\n", "\r\n")
+                replace = replace.replace("\r\n", "\n").replace("\n", "\r\n")
+                count = before.count(search)
+            else:
+                raise EditError(f"search text not found in {path}; read the file again "
+                                f"and copy the text exactly")
+        if count > 1 and not replace_all:
+            raise EditError(f"search text matches {count} places in {path}; include more "
+                            f"surrounding lines or set replace_all")
+        after = before.replace(search, replace)
+        _commit({path: (before, after)})
+        return count
+
+
+# --- Unified diffs ---
+
+class _Hunk:
+    def __init__(self, old_start, header):
+        self.old_start = old_start
+        self.header = header
+        self.old, self.new = [], []  # lines without line endings
+        self.added = self.removed = 0
+        self.no_newline_at_end = False  # "\ No newline at end of file" on the new side
+
+
+def _diff_path(field):
+    path = field.split("\t")[0].strip()
+    if path == "/dev/null":
+        return None
+    return path[2:] if path[:2] in ("a/", "b/") else path
+
+
+def _split_lines(text):
+    """(lines, endings) of `text`; the last ending is "" when the text does
+    not end with a newline."""
+    parts = _NEWLINE_RE.split(text)
+    lines, endings = parts[0::2], parts[1::2]
+    if lines[-1] == "":
+        lines.pop()
+    else:
+        endings.append("")
+    return lines, endings
+
+
+def parse_unified_diff(diff):
+    """
+    {path: {"created": bool, "hunks": [...]}} from a unified diff. Hunk line
+    counts in the "@@" headers are not trusted (LLMs get them wrong); each
+    hunk simply runs until the next header.
+    """
+    files, current, hunk, old_path = {}, None, None, None
+    lines, _ = _split_lines(diff)
+    for number, line in enumerate(lines):
+        following = lines[number + 1] if number + 1 < len(lines) else ""
+        if line.startswith("--- ") and following.startswith("+++ "):
+            old_path, hunk = _diff_path(line[4:]), None
+            continue
+        if line.startswith("+++ ") and hunk is None:
+            new_path = _diff_path(line[4:])
+            if new_path is None:
+                raise EditError("deleting files with a patch is not supported")
+            current = files.setdefault(new_path, {"created": old_path is None, "hunks": []})
+            continue
+        if line.startswith("@@"):
+            if current is None:
+                raise EditError("hunk before any '--- a/file' / '+++ b/file' header")
+            # A bare "@@" (no line numbers) is located by its context alone
+            match = _HUNK_RE.match(line)
+            hunk = _Hunk(int(match.group(1)) if match else 1, line.strip())
+            current["hunks"].append(hunk)
+            last_tag = None
+            continue
+        if _GIT_HEADER_RE.match(line):
+            hunk = None
+            continue
+        if hunk is None:
+            continue
+        if line.startswith("\\"):
+            if last_tag in (" ", "+"):
+                hunk.no_newline_at_end = True
+            continue
+        # Blank context lines sometimes lose their leading space
+        tag, text = (line[0], line[1:]) if line[:1] in (" ", "+", "-") else (" ", line)
+        if tag in " -":
+            hunk.old.append(text)
+        if tag in " +":
+            hunk.new.append(text)
+        hunk.removed += tag == "-"
+        hunk.added += tag == "+"
+        last_tag = tag
+    return files
+
+
+def _find(lines, block, expected):
+    """Position of `block` in `lines` closest to `expected`; trailing
+    whitespace is ignored if there is no exact match."""
+    for normalize in (lambda s: s, lambda s: s.rstrip()):
+        wanted = [normalize(s) for s in block]
+        size = len(wanted)
+        candidates = [i for i in range(len(lines) - size + 1)
+                      if normalize(lines[i]) == wanted[0]
+                      and [normalize(s) for s in lines[i:i + size]] == wanted]
+        if candidates:
+            return min(candidates, key=lambda i: abs(i - expected))
+    return None
+
+
+def _apply_hunks(path, text, hunks):
+    newline = "\r\n" if "\r\n" in text else "\n"
+    lines, endings = _split_lines(text)
+    offset = 0
+    for hunk in hunks:
+        expected = max(0, hunk.old_start - 1 + offset)
+        if hunk.old:
+            position = _find(lines, hunk.old, expected)
+        else:
+            position = min(hunk.old_start + offset, len(lines))  # pure insertion
+        if position is None:
+            raise EditError(f"{path}: hunk {hunk.header} does not match the file (it has "
+                            f"changed, or the context lines are wrong); nothing was written")
+        # Changed lines keep the endings of the lines they replace
+        old_endings = endings[position:position + len(hunk.old)]
+        new_endings = [old_endings[i] if i < len(old_endings) and old_endings[i] else newline
+                       for i in range(len(hunk.new))]
+        if new_endings and position + len(hunk.old) == len(lines):
+            new_endings[-1] = "" if hunk.no_newline_at_end else new_endings[-1]
+        lines[position:position + len(hunk.old)] = hunk.new
+        endings[position:position + len(hunk.old)] = new_endings
+        offset += len(hunk.new) - len(hunk.old)
+    # Only the last line may lack a line ending
+    endings[:-1] = [ending or newline for ending in endings[:-1]]
+    return "".join(line + ending for line, ending in zip(lines, endings))
+
+
+def apply_patch(diff, root="."):
+    """
+    Applies a unified diff to one or more files under `root`. Each hunk is
+    located by its context lines, so shifted line numbers are tolerated; if
+    any hunk of any file does not match, nothing is written. Returns
+    {path: (lines added, lines removed)}.
+    """
+    parsed = parse_unified_diff(diff)
+    if not parsed:
+        raise EditError("no file headers ('--- a/file' / '+++ b/file') found in the patch")
+    with _lock:
+        changes, summary = {}, {}
+        for rel_path, entry in parsed.items():
+            path = os.path.join(root, rel_path)
+            before = _read(path)
+            if before is None and not entry["created"]:
+                raise EditError(f"{rel_path} does not exist")
+            if before is not None and entry["created"]:
+                raise EditError(f"{rel_path} already exists")
+            changes[path] = (before, _apply_hunks(rel_path, before or "", entry["hunks"]))
+            summary[rel_path] = (sum(h.added for h in entry["hunks"]),
+                                 sum(h.removed for h in entry["hunks"]))
+        _commit(changes)
+    return summary
@@ -1,12 +1,28 @@
 # tools/refine_with_llm.py
 
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from agent.llm_manager import get_llm
+from agent.prompt_builder import context_budget, estimate_tokens
+from agent.scheduler import BATCH, scheduled
 
+# Inputs that fit the provider's context budget (agent/prompt_builder.py) go
+# to the LLM in one prompt, as before; larger ones are summarized map-reduce
+# style in chunks of half that size. Either can be set explicitly.
+SUMMARY_STUFF_TOKENS = os.getenv("SUMMARY_STUFF_TOKENS")
+SUMMARY_CHUNK_TOKENS = os.getenv("SUMMARY_CHUNK_TOKENS")
+# Map / intermediate reduce calls in flight at once
+SUMMARY_MAX_CONCURRENCY = int(os.getenv("SUMMARY_MAX_CONCURRENCY", "4"))
+SUMMARY_MAX_DEPTH = int(os.getenv("SUMMARY_MAX_DEPTH", "4"))
+
+_pool = ThreadPoolExecutor(max_workers=SUMMARY_MAX_CONCURRENCY, thread_name_prefix="summarize")
 
-def summarize_search_results(search_results: str, query: str) -> str:
-    llm = get_llm(temperature=0.7)
 
-    prompt = f"""
+def build_summary_prompt(search_results: str, query: str) -> str:
+    return f"""
 You are a helpful AI assistant.
 
 Here are some web search results about: "{query}".
@@ -20,6 +36,174 @@ Based on this, provide a concise and clear explanation in simple terms:
 Your answer:
 """
 
-    print("[🧠] Summarizing via Mistral...")
-    response = llm.invoke(prompt)
+
+# Partial summaries do not depend on the question, so a search result that
+# shows up again for a different question is answered from the LLM response cache.
+def build_map_prompt(chunk: str) -> str:
+    return f"""
+Summarize the key facts in the following web search results as short bullet
+points. Keep names, numbers and URLs. Do not add anything that is not in the text.
+
+-----------------
+{chunk}
+-----------------
+
+Key facts:
+"""
+
+
+def build_combine_prompt(summaries: str) -> str:
+    return f"""
+Merge the following notes into one list of short bullet points. Remove
+repetition but keep every distinct fact, name, number and URL.
+
+-----------------
+{summaries}
+-----------------
+
+Merged notes:
+"""
+
+
+def _text(response):
     return response.content if hasattr(response, "content") else response
+
+
+# --- Map-reduce ---
+
+def summary_budgets():
+    """(tokens sent in one prompt, tokens per map chunk) for the current provider."""
+    stuff = int(SUMMARY_STUFF_TOKENS) if SUMMARY_STUFF_TOKENS else context_budget()
+    chunk = int(SUMMARY_CHUNK_TOKENS) if SUMMARY_CHUNK_TOKENS else stuff // 2
+    return stuff, max(1, min(chunk, stuff))
+
+
+def split_into_results(text, max_tokens=None):
+    """
+    The search results in `text` (separated by blank lines), each as its own
+    piece; only a result bigger than `max_tokens` is cut further, between
+    lines.
+    """
+    max_tokens = max_tokens or summary_budgets()[1]
+    pieces = []
+    for block in text.split("\n\n"):
+        if estimate_tokens(block) <= max_tokens:
+            pieces.append(block)
+            continue
+        line_piece, size = [], 0
+        for line in block.splitlines():
+            cost = estimate_tokens(line)
+            if line_piece and size + cost > max_tokens:
+                pieces.append("\n".join(line_piece))
+                line_piece, size = [], 0
+            line_piece.append(line)
+            size += cost
+        pieces.append("\n".join(line_piece))
+    return [p for p in pieces if p.strip()]
+
+
+def split_into_chunks(text, max_tokens=None):
+    """
+    Token-bounded chunks of `text`, cut between search results (blank
+    lines) where possible, then between lines, so a result is only split
+    when it alone is bigger than a chunk.
+    """
+    max_tokens = max_tokens or summary_budgets()[1]
+    chunks, current, size = [], [], 0
+    for piece in split_into_results(text, max_tokens):
+        cost = estimate_tokens(piece)
+        if current and size + cost > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += cost
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def _summarize_all(llm, prompts):
+    """Runs `prompts` concurrently (at most SUMMARY_MAX_CONCURRENCY at once),
+    each distinct prompt once. Repeats across calls are answered by the
+    LLM's response cache (get_llm(use_cache=True))."""
+    futures = {}
+    for prompt in prompts:
+        if prompt not in futures:
+            futures[prompt] = _pool.submit(lambda p: _text(llm.invoke(p)).strip(), prompt)
+    return [futures[prompt].result() for prompt in prompts]
+
+
+def reduce_to_notes(search_results, llm=None, stats=None):
+    """
+    Shrinks `search_results` until it fits one prompt: map (summarize each
+    search result concurrently), then combine the partial summaries in
+    chunks, recursively, while they are still too big. Input that already
+    fits is returned as is.
+
+    Mapping result by result keeps each partial summary keyed on that one
+    result, so it is reused from the response cache whenever the result
+    comes back, whatever else was found alongside it.
+    """
+    stats = stats if stats is not None else {}
+    stuff_tokens, chunk_tokens = summary_budgets()
+    text, depth = search_results, 0
+    while estimate_tokens(text) > stuff_tokens:
+        if llm is None:
+            # Exact matches only: map prompts share one long template
+            llm = scheduled(get_llm(temperature=0.2, use_cache=True, semantic=False),
+                            priority=BATCH)
+        if depth >= SUMMARY_MAX_DEPTH:
+            print(f"[WARN] Summaries still too long after {depth} rounds; truncating")
+            text = split_into_chunks(text, stuff_tokens)[0]
+            break
+        if depth == 0:
+            chunks = split_into_results(text, chunk_tokens)
+            build = build_map_prompt
+        else:
+            chunks = split_into_chunks(text, chunk_tokens)
+            build = build_combine_prompt
+        summaries = _summarize_all(llm, [build(chunk) for chunk in chunks])
+        stats.setdefault("rounds", []).append(len(chunks))
+        merged = "\n\n".join(summaries)
+        if estimate_tokens(merged) >= estimate_tokens(text):
+            print("[WARN] Partial summaries did not shrink the input; truncating")
+            text = split_into_chunks(merged, stuff_tokens)[0]
+            break
+        text, depth = merged, depth + 1
+    return text
+
+
+def _final_llm():
+    # Summaries queue behind interactive chat when the provider is busy. The
+    # sampled answer is not cached: a similar question over similar results
+    # must not get another question's answer.
+    return scheduled(get_llm(temperature=0.7), priority=BATCH)
+
+
+def summarize_search_results(search_results: str, query: str) -> str:
+    stats = {}
+    started = time.perf_counter()
+    notes = reduce_to_notes(search_results, stats=stats)
+    if stats:
+        print(f"[🧠] Map-reduce: {' -> '.join(map(str, stats['rounds']))} chunks in "
+              f"{time.perf_counter() - started:.2f}s")
+
+    print("[🧠] Summarizing via Mistral...")
+    response = _final_llm().invoke(build_summary_prompt(notes, query))
+    return _text(response)
+
+
+def stream_summary(search_results: str, query: str):
+    """Yields the summary token by token; only the final answer is streamed,
+    the map and combine rounds run first."""
+    notes = reduce_to_notes(search_results)
+    for chunk in _final_llm().stream(build_summary_prompt(notes, query)):
+        yield _text(chunk)
+
+
+async def astream_summary(search_results: str, query: str):
+    """Yields the summary token by token (used by the HTTP API)."""
+    loop = asyncio.get_running_loop()
+    notes = await loop.run_in_executor(None, reduce_to_notes, search_results)
+    async for chunk in _final_llm().astream(build_summary_prompt(notes, query)):
+        yield _text(chunk)
@@ -2,11 +2,14 @@
 import os
 from langchain_community.document_loaders import TextLoader, PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
+from agent.embeddings import get_embeddings
+from agent.vectorstore import open_vectorstore
+from ingest.jobs import get_job_queue
+from ingest.pipeline import run_pipeline
+from tools.chat_with_uploaded_docs import invalidate_user_session
 
 
-def ingest_file(file_path, user_id="user_001"):
+def ingest_file(file_path, user_id="user_001", stats=None, cancel_event=None):
     # 1. Load file
     if file_path.endswith(".pdf"):
         loader = PyPDFLoader(file_path)
@@ -15,18 +18,28 @@ def ingest_file(file_path, user_id="user_001"):
     else:
         raise ValueError("Unsupported file type")
 
-    documents = loader.load()
-
-    # 2. Split
+    # 2. Split, 3. Embed + Store -- streamed in bounded batches
     splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-    chunks = splitter.split_documents(documents)
-
-    # 3. Embed + Store
-    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    embeddings = get_embeddings(cached=True)
     persist_dir = f"./chroma_db/{user_id}"  # Isolate user uploads
 
-    db = Chroma.from_documents(
-        chunks, embeddings, persist_directory=persist_dir)
-    db.persist()
-    print(f"[✅] Ingested {len(chunks)} chunks into {persist_dir}")
+    db = open_vectorstore(persist_dir, embeddings)
+    try:
+        stats = run_pipeline(loader.lazy_load(), embeddings, db,
+                             split_fn=splitter.split_documents, stats=stats,
+                             cancel_event=cancel_event)
+    finally:
+        # Questions asked from now on must see the new chunks (even the
+        # partial batches of a cancelled or failed run)
+        invalidate_user_session(user_id)
+    print(f"[✅] Ingested {stats.upsert.items} chunks into {persist_dir}")
     return persist_dir
+
+
+def submit_ingest_file(file_path, user_id="user_001", job_id=None):
+    """
+    Queues ingest_file on the background job pool and returns the IngestJob
+    straight away; poll job.status() for progress or cancel it by id.
+    """
+    return get_job_queue().submit(ingest_file, file_path, user_id, job_id=job_id,
+                                  description=f"{os.path.basename(file_path)} -> {user_id}")
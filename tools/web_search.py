@@ -1,20 +1,226 @@
 # tools/web_search.py
 
-from duckduckgo_search import DDGS
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urlsplit
 
+from agent.kv_store import TTLStore, shared
+
+# Which search engine answers queries ("duckduckgo", or "stub" for an
+# offline stand-in); more can be added with register_backend().
+WEB_SEARCH_BACKEND = os.getenv("WEB_SEARCH_BACKEND", "duckduckgo")
+# Sub-queries of one question run concurrently on this many threads
+WEB_SEARCH_WORKERS = int(os.getenv("WEB_SEARCH_WORKERS", "4"))
+# Also search sub-queries of each question. Off by default for duckduckgo,
+# whose rate limits are quickly hit by several requests per question.
+WEB_SEARCH_EXPAND = os.getenv("WEB_SEARCH_EXPAND")
+WEB_SEARCH_MAX_SUBQUERIES = int(os.getenv("WEB_SEARCH_MAX_SUBQUERIES", "4"))
+WEB_SEARCH_CACHE_PATH = os.getenv("WEB_SEARCH_CACHE_PATH", "./.cache/web_search.sqlite")
+# Seconds a cached result list is reused; 0 disables the cache
+WEB_SEARCH_CACHE_TTL = float(os.getenv("WEB_SEARCH_CACHE_TTL", str(6 * 3600)))
+STUB_SEARCH_LATENCY_MS = float(os.getenv("STUB_SEARCH_LATENCY_MS", "300"))
+
+_STOPWORDS = {"a", "an", "the", "is", "are", "was", "were", "what", "whats", "which", "who",
+              "how", "why", "when", "where", "do", "does", "did", "of", "in", "on", "for",
+              "to", "and", "or", "with", "about", "between", "difference", "can", "i", "you"}
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|ref|fbclid|gclid)$")
+
+_pool = ThreadPoolExecutor(max_workers=WEB_SEARCH_WORKERS, thread_name_prefix="web-search")
+
+
+# --- Backends ---
+# A backend takes (query, max_results) and returns a list of
+# {"title", "body", "href"} dicts, best first.
+
+def _duckduckgo_backend(query, max_results):
+    from duckduckgo_search import DDGS
 
-def duckduckgo_search(query: str, max_results: int = 5) -> str:
-    print(f"[🔎] Searching DuckDuckGo for: {query}")
-    results = []
     with DDGS() as ddgs:
-        for r in ddgs.text(query, max_results=max_results):
-            if r.get("body"):
-                results.append(
-                    f"Title: {r['title']}\nSnippet: {r['body']}\nURL: {r['href']}")
-            else:
-                results.append(f"Title: {r['title']}\nURL: {r['href']}")
+        return list(ddgs.text(query, max_results=max_results))
+
+
+def _stub_backend(query, max_results):
+    """Offline stand-in: deterministic pages per keyword after a simulated
+    network delay, so related sub-queries return overlapping URLs."""
+    time.sleep(STUB_SEARCH_LATENCY_MS / 1000)
+    words = [w for w in re.findall(r"\w+", query.lower()) if w not in _STOPWORDS] or ["web"]
+    results = []
+    for i in range(max_results):
+        word = words[i % len(words)]
+        page = i // len(words)
+        results.append({"title": f"{word.capitalize()} ({page + 1})",
+                        "body": f"Reference page {page + 1} about {word}.",
+                        "href": f"https://example.com/wiki/{word}/{page}"})
+    return results
+
+
+BACKENDS = {"duckduckgo": _duckduckgo_backend, "stub": _stub_backend}
+
+
+def register_backend(name, fn):
+    """Makes `fn(query, max_results)` available as WEB_SEARCH_BACKEND=name."""
+    BACKENDS[name] = fn
+
+
+# --- Result cache ---
+
+def normalize_query(query):
+    return re.sub(r"\s+", " ", query).strip().strip("?!.").lower()
+
+
+class SearchCache(TTLStore):
+    """Result lists on disk, keyed by (backend, normalized query, max_results)
+    and reused for `ttl` seconds."""
+
+    def __init__(self, path=None, ttl=None):
+        super().__init__(path or WEB_SEARCH_CACHE_PATH, table="search_results",
+                         ttl=WEB_SEARCH_CACHE_TTL if ttl is None else ttl)
+
+    @staticmethod
+    def key(backend, query, max_results):
+        text = f"{backend}\0{normalize_query(query)}\0{max_results}"
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_results(self, key):
+        value = self.get(key)
+        return json.loads(value) if value is not None else None
+
+    def put_results(self, key, results):
+        self.put(key, json.dumps(results))
+
+
+def get_search_cache():
+    if WEB_SEARCH_CACHE_TTL <= 0:
+        return None
+    return shared("web_search", SearchCache)
+
+
+# --- Query expansion / merging ---
+
+def expand_query(query, max_queries=None):
+    """
+    The query plus a few sub-queries, built locally (no LLM round trip):
+    each side of a comparison ("difference between X and Y", "X vs Y"), each
+    question of a multi-question input, and a keywords-only form.
+    """
+    max_queries = max_queries or WEB_SEARCH_MAX_SUBQUERIES
+    queries = [query.strip()]
+    comparison = (re.search(r"differences? between (.+?) and (.+?)[?.!]*$", query, re.IGNORECASE)
+                  or re.search(r"^(.+?)\s+(?:vs\.?|versus)\s+(.+?)[?.!]*$", query, re.IGNORECASE))
+    if comparison:
+        queries += [f"what is {side.strip()}" for side in comparison.groups()]
+    parts = [p.strip() for p in re.split(r"[?;]\s+", query) if p.strip()]
+    if len(parts) > 1:
+        queries += parts
+    keywords = " ".join(w for w in re.findall(r"[\w.+#-]+", query) if w.lower() not in _STOPWORDS)
+    if keywords:
+        queries.append(keywords)
+
+    unique, seen = [], set()
+    for q in queries:
+        if normalize_query(q) and normalize_query(q) not in seen:
+            seen.add(normalize_query(q))
+            unique.append(q)
+    return unique[:max_queries]
+
+
+def _url_key(url):
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower().removeprefix("www.")
+    params = urlencode([(k, v) for k, v in parse_qsl(parts.query) if not _TRACKING_PARAMS.match(k)])
+    return f"{host}{parts.path.rstrip('/')}?{params}"
+
+
+def _content_key(result):
+    text = re.sub(r"\W+", " ", f"{result.get('title', '')} {result.get('body', '')}").lower()
+    return hashlib.sha1(text.strip().encode("utf-8")).hexdigest()
+
+
+def merge_results(result_lists, max_results):
+    """Round-robin over the per-query rankings (first query first), dropping
+    results whose URL or title+snippet was already taken."""
+    merged, urls, contents = [], set(), set()
+    for rank in range(max((len(r) for r in result_lists), default=0)):
+        for results in result_lists:
+            if rank >= len(results):
+                continue
+            result = results[rank]
+            url = _url_key(result["href"]) if result.get("href") else None
+            content = _content_key(result)
+            if (url is not None and url in urls) or content in contents:
+                continue
+            urls.add(url)
+            contents.add(content)
+            merged.append(result)
+            if len(merged) >= max_results:
+                return merged
+    return merged
+
+
+# --- Search ---
+
+def search_one(query, max_results=5, backend=None):
+    """One backend query, served from the TTL cache when possible."""
+    backend = backend or WEB_SEARCH_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown WEB_SEARCH_BACKEND '{backend}' (have: {', '.join(BACKENDS)})")
+    cache = get_search_cache()
+    key = SearchCache.key(backend, query, max_results)
+    if cache is not None:
+        cached = cache.get_results(key)
+        if cached is not None:
+            return cached
+    results = [{"title": r.get("title", ""), "body": r.get("body", ""), "href": r.get("href", "")}
+               for r in BACKENDS[backend](query, max_results)]
+    if cache is not None:
+        cache.put_results(key, results)
+    return results
+
+
+def search(query, max_results=5, expand=None, backend=None):
+    """
+    Searches for `query` and, with expansion on, its sub-queries
+    concurrently, returning up to `max_results` distinct results. A failed
+    sub-query is skipped; an error is raised only if every query failed.
+    """
+    backend = backend or WEB_SEARCH_BACKEND
+    if expand is None:
+        expand = (WEB_SEARCH_EXPAND.lower() in ("1", "true", "yes") if WEB_SEARCH_EXPAND
+                  else backend != "duckduckgo")
+    queries = expand_query(query) if expand else [query]
+    futures = [_pool.submit(search_one, q, max_results, backend) for q in queries]
+
+    result_lists, errors = [], []
+    for q, future in zip(queries, futures):
+        try:
+            result_lists.append(future.result())
+        except Exception as e:
+            print(f"[WARN] Search failed for '{q}': {e}")
+            errors.append(e)
+    if errors and not result_lists:
+        raise errors[0]
+    return merge_results(result_lists, max_results)
+
+
+def format_results(results):
+    formatted = []
+    for r in results:
+        if r.get("body"):
+            formatted.append(f"Title: {r['title']}\nSnippet: {r['body']}\nURL: {r['href']}")
+        else:
+            formatted.append(f"Title: {r['title']}\nURL: {r['href']}")
+    return "\n\n".join(formatted)
+
+
+def duckduckgo_search(query: str, max_results: int = 5) -> str:
+    print(f"[🔎] Searching {WEB_SEARCH_BACKEND} for: {query}")
+    results = search(query, max_results)
 
     if not results:
         return "No relevant results found."
 
-    return "\n\n".join(results)
+    return format_results(results)